@@ -10,6 +10,7 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import atexit
 import logging
 
 from appimagebuilder import recipe
@@ -17,6 +18,7 @@ from appimagebuilder.cli.argparse import ArgumentsParser
 from appimagebuilder.modules.generate.command_generate import CommandGenerate
 from appimagebuilder.invoker import Invoker
 from appimagebuilder.orchestrator import Orchestrator
+from appimagebuilder.utils import launcher
 
 
 def __main__():
@@ -24,6 +26,8 @@ def __main__():
     args = parser.parse()
 
     _setup_logging_config(args)
+    if args.profile or args.loglevel.upper() == "DEBUG":
+        atexit.register(launcher.log_stats)
 
     if args.generate:
         generator = CommandGenerate()
@@ -40,7 +44,7 @@ def __main__():
     orchestrator = Orchestrator()
     commands = orchestrator.process(recipe_roamer, args)
 
-    invoker = Invoker()
+    invoker = Invoker(orchestrator.build_state, args.jobs, orchestrator.profiler)
     invoker.execute(commands)
 
 
@@ -0,0 +1,112 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import json
+import logging
+import os
+import pathlib
+
+
+class BuildState:
+    """
+    Record of the commands that produced an AppDir, used to skip the unchanged ones
+
+    Every entry holds the fingerprint of the command inputs, the deploy record
+    items and the other outputs it produced. The AppDir contents snapshot (paths,
+    sizes and mtimes) is stored too, the entries are discarded if the AppDir was
+    modified afterwards.
+
+    The state lives in the build cache dir, keyed by the AppDir path. It survives
+    the AppDir removal and is not bundled into the AppImage.
+    """
+
+    format_version = 2
+
+    def __init__(self, app_dir: pathlib.Path, cache_dir: pathlib.Path):
+        self.app_dir = pathlib.Path(app_dir).absolute()
+        app_dir_key = hashlib.sha256(str(self.app_dir).encode()).hexdigest()[:16]
+        self.path = pathlib.Path(cache_dir) / "build-state" / ("%s.json" % app_dir_key)
+        self.logger = logging.getLogger("BuildState")
+        self._entries = {}
+
+    def load(self):
+        self._entries = {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get("format_version") != self.format_version:
+            return
+
+        if data.get("snapshot") != self.snapshot():
+            self.logger.info("AppDir modified since the last build, rebuilding it")
+            return
+
+        self._entries = data.get("entries", {})
+
+    def get(self, key: str):
+        return self._entries.get(key)
+
+    def set(self, key: str, fingerprint: str, record: dict, outputs=None):
+        if fingerprint:
+            self._entries[key] = {
+                "fingerprint": fingerprint,
+                "record": record,
+                "outputs": outputs,
+            }
+        else:
+            self._entries.pop(key, None)
+
+    def invalidate(self):
+        self._entries = {}
+        if self.path.exists():
+            self.path.unlink()
+
+    def save(self):
+        data = {
+            "format_version": self.format_version,
+            "app_dir": str(self.app_dir),
+            "snapshot": self.snapshot(),
+            "entries": self._entries,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def snapshot(self) -> str:
+        """Cheap hash of the AppDir contents based on the files metadata"""
+        digest = hashlib.sha256()
+        if not self.app_dir.is_dir():
+            return None
+
+        for root, dirs, files in os.walk(self.app_dir):
+            dirs.sort()
+            for name in sorted(dirs + files):
+                path = os.path.join(root, name)
+                stat_result = os.lstat(path)
+                digest.update(
+                    (
+                        "%s\0%o\0%d\0%d\n"
+                        % (
+                            os.path.relpath(path, self.app_dir),
+                            stat_result.st_mode,
+                            stat_result.st_size,
+                            stat_result.st_mtime_ns,
+                        )
+                    ).encode()
+                )
+
+        return digest.hexdigest()
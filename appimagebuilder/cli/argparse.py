@@ -55,6 +55,34 @@ class ArgumentsParser:
             action="store_true",
             help="Skip AppImage generation",
         )
+        self.parser.add_argument(
+            "--no-elf-cache",
+            dest="no_elf_cache",
+            action="store_true",
+            help="Don't reuse ELF files information from previous builds",
+        )
+        self.parser.add_argument(
+            "--incremental",
+            dest="incremental",
+            action="store_true",
+            help="Skip the AppDir building steps whose inputs didn't change since the last "
+            "build. Scripts are only run again when their instructions change",
+        )
+        self.parser.add_argument(
+            "--jobs",
+            dest="jobs",
+            type=int,
+            default=1,
+            help="Max number of independent steps run concurrently (default: 1), "
+            "ignored on incremental builds",
+        )
+        self.parser.add_argument(
+            "--profile",
+            dest="profile",
+            action="store_true",
+            help="Write a Chrome trace-event file of the build steps into the cache dir "
+            "and print the external tools executions statistics",
+        )
         self.parser.add_argument(
             "--generate",
             dest="generate",
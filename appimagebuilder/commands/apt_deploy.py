@@ -9,11 +9,13 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import os
 from pathlib import Path
 
 from appimagebuilder.commands import Command
 from appimagebuilder.context import Context
 from appimagebuilder.modules.deploy.apt import Deploy, Venv
+from appimagebuilder.utils.archive_pool import ArchivePool
 
 
 class AptDeployCommand(Command):
@@ -38,6 +40,33 @@ class AptDeployCommand(Command):
     def id(self):
         return "apt-deploy"
 
+    def reads(self):
+        return {"recipe"}
+
+    def writes(self):
+        return {"appdir:packages", "record:apt", "cache:apt"}
+
+    def fingerprint(self):
+        return self._hash_inputs(
+            self.packages,
+            self._exclude,
+            self._architectures,
+            self._sources,
+            self._keys,
+            self._allow_unauthenticated,
+            self._read_update_stamp(
+                Path(self.context.cache_dir) / "apt" / Venv.update_stamp_name,
+                self._get_update_max_age(),
+            ),
+        )
+
+    @staticmethod
+    def _get_update_max_age():
+        if os.getenv("ABUILDER_APT_SKIP_UPDATE", False):
+            # the indexes are never refreshed
+            return float("inf")
+        return Deploy.get_update_max_age()
+
     def __call__(self, *args, **kwargs):
         apt_venv = self._setup_apt_venv()
 
@@ -63,5 +92,6 @@ class AptDeployCommand(Command):
             self._keys,
             self._architectures,
             apt_options,
+            archive_pool=ArchivePool(),
         )
         return apt_venv
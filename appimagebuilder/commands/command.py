@@ -9,6 +9,10 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import hashlib
+import json
+import time
+
 from appimagebuilder.context import Context
 
 
@@ -24,3 +28,55 @@ class Command:
 
     def __call__(self, *args, **kwargs):
         pass
+
+    def reads(self):
+        """Resources read by the command, used to schedule it
+
+        None means the command may read anything
+        """
+        return None
+
+    def writes(self):
+        """Resources modified by the command, used to schedule it
+
+        None means the command may modify anything, it will not run concurrently
+        with any other command
+        """
+        return None
+
+    def fingerprint(self):
+        """Hash of the command inputs, used to skip it on incremental builds
+
+        Commands returning None are always executed
+        """
+        return None
+
+    def get_outputs(self):
+        """JSON serializable state produced by the command outside the AppDir and
+        the deploy record, it's given to `restore_outputs` when the command is skipped
+        """
+        return None
+
+    def restore_outputs(self, outputs):
+        pass
+
+    @staticmethod
+    def _read_update_stamp(path, max_age: float):
+        """Contents of a package index update stamp, to be used as fingerprint input
+
+        Stamps older than <max_age> are flagged as expired, the command runs again
+        to refresh the index even if its other inputs didn't change.
+        """
+        try:
+            with open(path, "r") as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        stamp["expired"] = time.time() - stamp.get("time", 0) > max_age
+        return stamp
+
+    @staticmethod
+    def _hash_inputs(*inputs):
+        data = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
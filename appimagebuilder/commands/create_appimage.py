@@ -20,7 +20,13 @@ class CreateAppImageCommand(Command):
         self.recipe = recipe
 
     def id(self):
-        super().id()
+        return "create-appimage"
+
+    def reads(self):
+        return {"recipe", "appdir", "test"}
+
+    def writes(self):
+        return {"appimage", "cache:runtime"}
 
     def __call__(self, *args, **kwargs):
         creator = AppImageCreator(self.recipe)
@@ -24,6 +24,15 @@ class WriteDeployRecordCommand(Command):
     def id(self):
         return "write-deploy-record"
 
+    def reads(self):
+        return {"record"}
+
+    def writes(self):
+        return {"appdir"}
+
+    def fingerprint(self):
+        return self._hash_inputs(self.context.record)
+
     def __call__(self, *args, **kwargs):
         path = self.context.app_dir / ".bundle.yml"
         with open(path, "w") as f:
@@ -0,0 +1,92 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import logging
+
+from appimagebuilder.commands.command import Command
+from appimagebuilder.modules.appimage import AppImageCreator
+from appimagebuilder.modules.setup.apprun_binaries_resolver import (
+    AppRunBinariesResolver,
+)
+from appimagebuilder.recipe.roamer import Roamer
+
+# AppImage architectures names to the ones used by the AppRun releases
+APPRUN_ARCHITECTURES = {
+    "x86_64": "x86_64",
+    "i686": "i386",
+    "aarch64": "aarch64",
+    "armhf": "gnueabihf",
+}
+
+
+class FetchAppRunCommand(Command):
+    """
+    Download the AppRun binaries for the AppImage architecture ahead of the runtime
+    setup, so it can happen while the AppDir is being deployed
+
+    Failures are not fatal, the runtime setup will retry the download.
+    """
+
+    def __init__(self, context, recipe: Roamer):
+        super().__init__(context, "AppRun download")
+        self.recipe = recipe
+
+    def id(self):
+        return "fetch-apprun"
+
+    def reads(self):
+        return {"recipe"}
+
+    def writes(self):
+        return {"cache:AppRun"}
+
+    def __call__(self, *args, **kwargs):
+        arch = APPRUN_ARCHITECTURES.get(self.recipe.AppImage.arch())
+        if not arch:
+            return
+
+        resolver = AppRunBinariesResolver(
+            self.recipe.AppDir.runtime.version() or "continuous",
+            self.recipe.AppDir.runtime.debug(),
+        )
+        try:
+            resolver.resolve_executable(arch)
+            if not self.recipe.AppDir.runtime.no_hooks():
+                resolver.resolve_hooks_library(arch)
+        except OSError as err:
+            logging.warning("Unable to download the AppRun binaries: %s" % err)
+
+
+class FetchAppImageRuntimeCommand(Command):
+    """
+    Download the AppImage runtime ahead of the AppImage creation
+
+    Failures are not fatal, the AppImage creation will retry the download.
+    """
+
+    def __init__(self, context, recipe: Roamer):
+        super().__init__(context, "AppImage runtime download")
+        self.recipe = recipe
+
+    def id(self):
+        return "fetch-appimage-runtime"
+
+    def reads(self):
+        return {"recipe"}
+
+    def writes(self):
+        return {"cache:runtime"}
+
+    def __call__(self, *args, **kwargs):
+        try:
+            AppImageCreator(self.recipe).fetch_runtime()
+        except OSError as err:
+            logging.warning("Unable to download the AppImage runtime: %s" % err)
@@ -9,6 +9,8 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import os
+
 from appimagebuilder.commands import Command
 from appimagebuilder.context import Context
 from appimagebuilder.modules.deploy import FileDeploy
@@ -23,6 +25,24 @@ class FileDeployCommand(Command):
     def id(self):
         return "file-deploy"
 
+    def reads(self):
+        return {"recipe"}
+
+    def writes(self):
+        return {"appdir"}
+
+    def fingerprint(self):
+        # deployed files are copied again if they were modified
+        sources = []
+        for path in sorted(FileDeploy.expand_paths(self._paths or [])):
+            try:
+                stat_result = os.stat(path)
+                sources.append((path, stat_result.st_size, stat_result.st_mtime_ns))
+            except OSError:
+                sources.append((path, None, None))
+
+        return self._hash_inputs(self._paths, self._exclude, sources)
+
     def __call__(self, *args, **kwargs):
         helper = FileDeploy(str(self.context.app_dir))
         if self._paths:
@@ -15,6 +15,7 @@ from appimagebuilder.commands import Command
 from appimagebuilder.context import Context
 from appimagebuilder.modules.deploy.pacman.deploy import Deploy
 from appimagebuilder.modules.deploy.pacman.venv import Venv
+from appimagebuilder.utils.archive_pool import ArchivePool
 
 
 class PacmanDeployCommand(Command):
@@ -38,12 +39,32 @@ class PacmanDeployCommand(Command):
     def id(self):
         return "pacman-deploy"
 
+    def reads(self):
+        return {"recipe"}
+
+    def writes(self):
+        return {"appdir:packages", "record:pacman", "cache:pacman"}
+
+    def fingerprint(self):
+        return self._hash_inputs(
+            self._packages,
+            self._exclude,
+            self._architecture,
+            self._repositories,
+            self._options,
+            self._read_update_stamp(
+                Path(self.context.cache_dir) / "pacman" / Venv.update_stamp_name,
+                Deploy.get_update_max_age(),
+            ),
+        )
+
     def __call__(self, *args, **kwargs):
         venv = Venv(
             root=Path(self.context.cache_dir) / "pacman",
             repositories=self._repositories,
             architecture=self._architecture,
             user_options=self._options,
+            archive_pool=ArchivePool(),
         )
 
         pacman_deploy = Deploy(venv)
@@ -17,6 +17,7 @@ import tempfile
 from appimagebuilder.commands.command import Command
 from appimagebuilder.context import Context
 from appimagebuilder.recipe.roamer import Roamer
+from appimagebuilder.utils import launcher
 
 
 class RunShellScriptCommand(Command):
@@ -33,19 +34,41 @@ class RunShellScriptCommand(Command):
         if not env:
             env = {}
         self.env = env
+        # variables written to $BUILDER_ENV by the script
+        self._exported_env = {}
 
     def id(self):
         return "shell"
 
-    def __call__(self, *args, **kwargs):
-        # resolve value
-        self.instructions = self.instructions()
+    def fingerprint(self):
+        # on incremental builds scripts run again only if their instructions change,
+        # the files they read are not tracked
+        return self._hash_inputs(self._get_instructions(), self.env)
 
-        if not self.instructions:
-            return
+    def get_outputs(self):
+        return {"exported_env": self._exported_env}
+
+    def restore_outputs(self, outputs):
+        self._exported_env = (outputs or {}).get("exported_env", {})
+        for key, val in self._exported_env.items():
+            logging.info("Exporting env: %s=%s" % (key, val))
+            os.environ[key] = val
 
-        if isinstance(self.instructions, list):
-            self.instructions = "\n".join(self.instructions)
+    def _get_instructions(self) -> str:
+        instructions = self.instructions
+        if callable(instructions):
+            # resolve value
+            instructions = instructions()
+
+        if isinstance(instructions, list):
+            instructions = "\n".join(instructions)
+        return instructions
+
+    def __call__(self, *args, **kwargs):
+        self._exported_env = {}
+        instructions = self._get_instructions()
+        if not instructions:
+            return
 
         run_env = os.environ.copy()
         for k, v in self.env.items():
@@ -56,10 +79,11 @@ class RunShellScriptCommand(Command):
             run_env["APPDIR"] = str(self.context.app_dir.absolute())
             run_env["RECIPE"] = str(self.context.recipe.absolute())
 
-            _proc = subprocess.Popen(
-                ["bash", "-ve"], stdin=subprocess.PIPE, env=run_env
-            )
-            _proc.communicate(self.instructions.encode())
+            with launcher.track("bash"):
+                _proc = subprocess.Popen(
+                    ["bash", "-ve"], stdin=subprocess.PIPE, env=run_env
+                )
+                _proc.communicate(instructions.encode())
 
             if _proc.returncode != 0:
                 raise RuntimeError("Script exited with code: %s" % _proc.returncode)
@@ -73,3 +97,4 @@ class RunShellScriptCommand(Command):
             logging.info("Exporting env: %s" % line)
             key, val = line.split("=", 1)
             os.environ[key] = val
+            self._exported_env[key] = val
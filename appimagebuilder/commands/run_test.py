@@ -27,6 +27,12 @@ class RunTestCommand(Command):
     def id(self):
         return "test"
 
+    def reads(self):
+        return {"recipe", "appdir"}
+
+    def writes(self):
+        return {"test"}
+
     def __call__(self, *args, **kwargs):
         test_cases = self._load_tests(self.tests_settings())
         try:
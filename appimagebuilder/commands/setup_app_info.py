@@ -24,6 +24,18 @@ class SetupAppInfoCommand(Command):
     def id(self):
         return "app-info-setup"
 
+    def reads(self):
+        # the icon is taken from the deployed packages
+        return {"recipe", "appdir:packages"}
+
+    def writes(self):
+        return {"appdir:app-info"}
+
+    def fingerprint(self):
+        return self._hash_inputs(
+            vars(self.context.app_info), self.context.bundle_info.runtime_arch
+        )
+
     def __call__(self, *args, **kwargs):
         icon_bundler = IconBundler(self.context.app_dir, self.context.app_info.icon)
         icon_bundler.bundle_icon()
@@ -22,6 +22,16 @@ class SetupRuntimeCommand(Command):
     def id(self):
         return "runtime-setup"
 
+    def reads(self):
+        return {"recipe", "appdir:packages"}
+
+    def writes(self):
+        # binaries are patched in place, the desktop entry and icons are not touched
+        return {"appdir:runtime", "appdir:binaries", "cache:AppRun"}
+
+    def fingerprint(self):
+        return self._hash_inputs(self._recipe())
+
     def __call__(self, *args, **kwargs):
         runtime = RuntimeGenerator(self._recipe, self._finder)
         runtime.generate()
@@ -28,6 +28,7 @@ class SetupSymlinksCommand(Command):
             self._finder.base_path / "runtime" / "compat",
         ]
         preserve_paths = recipe.AppDir.runtime.preserve() or []
+        self._preserve_paths = preserve_paths
         for pattern in preserve_paths:
             for base_path in base_paths:
                 for match in base_path.glob(pattern):
@@ -39,11 +40,20 @@ class SetupSymlinksCommand(Command):
     def id(self):
         return "symlinks-setup"
 
+    def reads(self):
+        return {"recipe", "appdir"}
+
+    def writes(self):
+        return {"appdir"}
+
+    def fingerprint(self):
+        return self._hash_inputs(self._preserve_paths)
+
     def __call__(self, *args, **kwargs):
         for link in self._finder.find("*", [Finder.is_symlink]):
             allowed = True
             for preserve_file in self._preserve_files:
-                if preserve_file.samefile(bin):
+                if self._is_same_link(preserve_file, link):
                     allowed = False
                     break
             if allowed:
@@ -54,6 +64,17 @@ class SetupSymlinksCommand(Command):
                 )
                 self._make_symlink_relative(link, relative_root)
 
+        # symlinks targets changed, cached checks results are no longer valid
+        self._finder.invalidate()
+
+    @staticmethod
+    def _is_same_link(path, link) -> bool:
+        # compare the links themselves, their targets may be absolute or missing
+        try:
+            return os.path.samestat(os.lstat(path), os.lstat(link))
+        except OSError:
+            return False
+
     @staticmethod
     def _make_symlink_relative(path, relative_root):
         path = pathlib.Path(path)
@@ -10,20 +10,218 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from appimagebuilder.build_state import BuildState
 from appimagebuilder.commands.command import Command
+from appimagebuilder.utils.profiler import Profiler
 
 
 class Invoker:
     """Execute a given set of tasks"""
 
-    def __init__(self):
+    def __init__(
+        self, build_state: BuildState = None, jobs: int = 1, profiler: Profiler = None
+    ):
         self.logger = logging.getLogger("main")
+        # when set commands with unchanged inputs are skipped
+        self.build_state = build_state
+        # max number of commands executed concurrently
+        self.jobs = jobs
+        # when set the time and resources spent by every command are recorded
+        self.profiler = profiler
 
     def execute(self, commands: [Command] = None):
         if not commands:
             commands = []
 
-        for command in commands:
-            self.logger.info("Running %s", command.description)
+        try:
+            self._execute(commands)
+        finally:
+            if self.profiler:
+                self.profiler.save()
+
+    def _execute(self, commands: [Command]):
+        if not self.build_state:
+            if self.jobs > 1:
+                self._execute_parallel(commands)
+            else:
+                for command in commands:
+                    self._run(command)
+            return
+
+        if self.jobs > 1:
+            self.logger.warning(
+                "Incremental builds run one command at a time, ignoring --jobs"
+            )
+
+        self.build_state.load()
+        try:
+            self._execute_incremental(commands)
+        except BaseException:
+            # the AppDir state is unknown after a failure
+            self.build_state.invalidate()
+            raise
+
+        self.build_state.save()
+
+    def _execute_parallel(self, commands: [Command]):
+        """Run the commands on a pool respecting the order of the conflicting ones"""
+        dependencies = [
+            {
+                previous
+                for previous in range(idx)
+                if _conflicts(commands[previous], command)
+            }
+            for idx, command in enumerate(commands)
+        ]
+
+        log_filter = _CommandLogFilter()
+        handlers = logging.getLogger().handlers
+        for handler in handlers:
+            handler.addFilter(log_filter)
+
+        completed = set()
+        pending = list(range(len(commands)))
+        running = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                while pending or running:
+                    for idx in list(pending):
+                        if dependencies[idx].issubset(completed):
+                            pending.remove(idx)
+                            future = executor.submit(
+                                log_filter.run, commands[idx], self._run
+                            )
+                            running[future] = idx
+
+                    done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        idx = running.pop(future)
+                        try:
+                            future.result()
+                        except BaseException:
+                            # let the running commands finish but don't start new ones
+                            pending.clear()
+                            wait(running.keys())
+                            raise
+                        completed.add(idx)
+        finally:
+            for handler in handlers:
+                handler.removeFilter(log_filter)
+
+    def _execute_incremental(self, commands: [Command]):
+        """Run the commands in order skipping the leading ones whose inputs didn't change
+
+        The AppDir state is only known between consecutive commands, they aren't
+        run concurrently.
+        """
+        # commands can be skipped only while the AppDir matches the one produced
+        # by the previous build
+        up_to_date = True
+        for idx, command in enumerate(commands):
+            key = "%s:%s" % (idx, command.id())
+            fingerprint = command.fingerprint()
+            entry = self.build_state.get(key)
+            if (
+                up_to_date
+                and fingerprint
+                and entry
+                and entry["fingerprint"] == fingerprint
+            ):
+                self.logger.info("Skipping %s, inputs unchanged", command.description)
+                command.context.record.update(entry["record"])
+                command.restore_outputs(entry.get("outputs"))
+                continue
+
+            record = dict(command.context.record)
+            if not fingerprint and up_to_date:
+                # commands without declared inputs are always executed, they don't
+                # invalidate the following ones unless they modify the AppDir
+                snapshot = self.build_state.snapshot()
+                self._run(command)
+                up_to_date = snapshot == self.build_state.snapshot()
+            else:
+                self._run(command)
+                up_to_date = False
+
+            if fingerprint:
+                # the inputs may be refreshed by the command itself (i.e.: package
+                # indexes updates), keep the ones the AppDir was built from
+                fingerprint = command.fingerprint()
+
+            produced_record = {
+                k: v
+                for k, v in command.context.record.items()
+                if k not in record or record[k] is not v
+            }
+            self.build_state.set(
+                key, fingerprint, produced_record, command.get_outputs()
+            )
+
+    def _run(self, command: Command):
+        self.logger.info("Running %s", command.description)
+        if not self.profiler:
             command()
+            return
+
+        with self.profiler.stage(command.description):
+            command()
+
+
+def _conflicts(first: Command, second: Command) -> bool:
+    """Check if the commands access the same resources and one of them modifies it"""
+    first_writes = first.writes()
+    second_writes = second.writes()
+    if first_writes is None or second_writes is None:
+        return True
+
+    first_reads = first.reads()
+    second_reads = second.reads()
+    if first_reads is None or second_reads is None:
+        # commands reading everything only conflict with the ones writing something
+        return bool(first_writes or second_writes)
+
+    return _overlap(first_writes, second_reads | second_writes) or _overlap(
+        second_writes, first_reads
+    )
+
+
+def _overlap(first: {str}, second: {str}) -> bool:
+    """Check if the resource sets share a resource
+
+    Resources are nested using ':' as separator, "appdir" includes "appdir:runtime"
+    """
+    for first_resource in first:
+        for second_resource in second:
+            if (
+                first_resource == second_resource
+                or second_resource.startswith(first_resource + ":")
+                or first_resource.startswith(second_resource + ":")
+            ):
+                return True
+    return False
+
+
+class _CommandLogFilter(logging.Filter):
+    """Prefix the log messages with the id of the command running on the thread"""
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def run(self, command: Command, runner):
+        self._local.command_id = command.id() or command.description
+        try:
+            runner(command)
+        finally:
+            self._local.command_id = None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        command_id = getattr(self._local, "command_id", None)
+        # the same record is filtered once per handler
+        if command_id and not hasattr(record, "command_id"):
+            record.command_id = command_id
+            record.msg = "[%s] %s" % (command_id, record.msg)
+        return True
@@ -17,7 +17,7 @@ import re
 import subprocess
 
 from appimagebuilder.utils.patchelf import PatchElf, PatchElfError
-from appimagebuilder.utils import shell
+from appimagebuilder.utils import launcher, shell
 from appimagebuilder.utils.finder import Finder
 
 DEPENDS_ON = ["strace", "patchelf"]
@@ -71,7 +71,8 @@ class AppRuntimeAnalyser:
             bin=exec_path, args=exec_args, **self._deps, library_paths=library_paths
         )
         self.logger.info(command)
-        _proc = subprocess.run(command, stderr=subprocess.PIPE, shell=True)
+        # the app arguments may rely on the shell expansions
+        _proc = launcher.run(command, tool="strace", stderr=subprocess.PIPE, shell=True)
 
         if _proc.returncode != 0:
             self.logger.warning(
@@ -47,11 +47,16 @@ class AppImageCreator:
     def create(self):
         self._assert_target_architecture()
 
+        runtime_path = self.fetch_runtime()
+
+        self._generate_appimage(runtime_path)
+
+    def fetch_runtime(self):
         runtime_url = self._get_runtime_url()
         runtime_path = self._get_runtime_path()
         self._download_runtime_if_required(runtime_path, runtime_url)
 
-        self._generate_appimage(runtime_path)
+        return runtime_path
 
     def _generate_appimage(self, runtime_path):
         appimage_tool = AppImageToolCommand(self.app_dir, self.target_file)
@@ -74,7 +79,10 @@ class AppImageCreator:
     def _download_runtime_if_required(self, runtime_path, runtime_url):
         if not os.path.exists(runtime_path):
             logging.info("Downloading runtime: %s" % runtime_url)
-            request.urlretrieve(runtime_url, runtime_path)
+            # never leave partial downloads behind, they would be taken as valid files
+            tmp_path = runtime_path + ".part"
+            request.urlretrieve(runtime_url, tmp_path)
+            os.replace(tmp_path, runtime_path)
 
     def _get_runtime_path(self):
         os.makedirs("appimage-builder-cache", exist_ok=True)
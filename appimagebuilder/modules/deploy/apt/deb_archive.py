@@ -0,0 +1,129 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import os
+import tarfile
+from contextlib import contextmanager
+
+from appimagebuilder.modules.deploy import tar_stream
+from appimagebuilder.utils import shell
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+AR_MAGIC = b"!<arch>\n"
+AR_HEADER_SIZE = 60
+
+
+class DebArchiveError(RuntimeError):
+    pass
+
+
+class _MemberReader:
+    """File like object limited to the contents of an ar member"""
+
+    def __init__(self, file, size):
+        self._file = file
+        self._remaining = size
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+
+class DebArchive:
+    """
+    Reads .deb files without dpkg-deb
+
+    The `ar` container is parsed in-process and the `data.tar.*` member is
+    decompressed and extracted as a stream, no intermediate files are written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def extract(self, target) -> [str]:
+        """Extract the package contents into <target>
+
+        :return: paths of the extracted files relative to <target>
+        """
+        os.makedirs(target, exist_ok=True)
+        with self._open_data_tar() as tar:
+            return self._extract_members(tar, str(target))
+
+    @contextmanager
+    def _open_data_tar(self):
+        with open(self.path, "rb") as f:
+            name, size = self._seek_data_member(f)
+            reader = _MemberReader(f, size)
+
+            if name == "data.tar":
+                yield tarfile.open(fileobj=reader, mode="r|")
+            elif name == "data.tar.gz":
+                yield tarfile.open(fileobj=reader, mode="r|gz")
+            elif name == "data.tar.xz":
+                yield tarfile.open(fileobj=reader, mode="r|xz")
+            elif name == "data.tar.bz2":
+                yield tarfile.open(fileobj=reader, mode="r|bz2")
+            elif name == "data.tar.zst" and zstandard:
+                decompressor = zstandard.ZstdDecompressor()
+                with decompressor.stream_reader(reader) as stream:
+                    yield tarfile.open(fileobj=stream, mode="r|")
+            else:
+                # let dpkg-deb handle unsupported compression formats
+                with self._open_dpkg_deb_data_tar() as tar:
+                    yield tar
+
+    @contextmanager
+    def _open_dpkg_deb_data_tar(self):
+        deps = shell.resolve_commands_paths(["dpkg-deb"])
+        command = [deps["dpkg-deb"], "--fsys-tarfile", str(self.path)]
+        try:
+            with tar_stream.open_command_tar(command, self.path) as tar:
+                yield tar
+        except tar_stream.TarStreamError as err:
+            raise DebArchiveError(str(err)) from err
+
+    def _seek_data_member(self, f):
+        if f.read(len(AR_MAGIC)) != AR_MAGIC:
+            raise DebArchiveError("Not a deb file: %s" % self.path)
+
+        while True:
+            header = f.read(AR_HEADER_SIZE)
+            if len(header) < AR_HEADER_SIZE:
+                raise DebArchiveError("Missing data.tar member in: %s" % self.path)
+
+            name = header[0:16].decode().strip().rstrip("/")
+            try:
+                size = int(header[48:58].decode().strip())
+            except ValueError:
+                raise DebArchiveError("Malformed ar header in: %s" % self.path)
+
+            if name.startswith("data.tar"):
+                return name, size
+
+            # members are aligned to even offsets
+            f.seek(size + size % 2, os.SEEK_CUR)
+
+    def _extract_members(self, tar, target):
+        try:
+            return tar_stream.extract_members(tar, target, self.path)
+        except tar_stream.TarStreamError as err:
+            raise DebArchiveError(str(err)) from err
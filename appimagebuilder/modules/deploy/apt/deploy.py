@@ -12,18 +12,34 @@
 import logging
 import os
 import pathlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 from . import listings
+from ..package_manifest import PackageManifest
+from ..util import merge_tree
+from .resolver import Resolver
 from .venv import Venv
 
 
 class Deploy:
     """Deploy deb packages into an AppDir using apt-get to resolve the packages and their dependencies"""
 
+    # seconds the package indexes are reused before running `apt-get update` again
+    default_update_max_age = 60 * 60
+
     def __init__(self, apt_venv: Venv):
         self.apt_venv = apt_venv
         self.logger = logging.getLogger("AptPackageDeploy")
 
+        # in-process resolver, used instead of apt-get and apt-cache when enabled
+        # by setting ABUILDER_APT_RESOLVER=internal
+        self.resolver = None
+        self._installed_packages = []
+
+        # files written by each deployed package, relative to the AppDir
+        self.package_files = {}
+
     def deploy(
         self, include_patterns: [str], appdir_root: pathlib.Path, exclude_patterns=None
     ) -> [str]:
@@ -41,20 +57,62 @@ class Deploy:
         deploy_list = self._resolve_packages_to_deploy(
             include_patterns, exclude_patterns
         )
-        extracted_packages = self._extract_packages(appdir_root, deploy_list)
-        return [str(package) for package in extracted_packages]
+
+        # packages deployed by a previous build are kept if they didn't change
+        manifest = PackageManifest(appdir_root, "apt")
+        manifest.load()
+        manifest.remove_packages_except([str(package) for package in deploy_list])
+        pending_packages = [
+            package for package in deploy_list if not manifest.is_deployed(str(package))
+        ]
+        if len(pending_packages) < len(deploy_list):
+            self.logger.info(
+                "%s packages are already deployed"
+                % (len(deploy_list) - len(pending_packages))
+            )
+
+        self.apt_venv.download_packages(pending_packages)
+        extracted_packages = self._extract_packages(appdir_root, pending_packages)
+        for package in extracted_packages:
+            manifest.set_files(str(package), self.package_files[str(package)])
+        manifest.save()
+
+        return sorted(str(package) for package in deploy_list)
 
     def _prepare_apt_venv(self):
-        if not os.getenv("ABUILDER_APT_SKIP_UPDATE", False):
-            self.apt_venv.update()
-        else:
+        if os.getenv("ABUILDER_APT_SKIP_UPDATE", False):
             self.logger.warning(
                 "Skipping`apt update` execution. Newly added sources will not be available!"
             )
+        elif self.apt_venv.is_update_required(self.get_update_max_age()):
+            self.apt_venv.update()
+        else:
+            self.logger.info(
+                "Skipping `apt update` execution. Package indexes are up to date"
+            )
+
+        if os.getenv("ABUILDER_APT_RESOLVER", "apt") == "internal":
+            self.resolver = Resolver(
+                self.apt_venv.read_package_index(), self.apt_venv.architectures
+            )
+
         # set apt core packages as installed, required for it to properly resolve dependencies
-        apt_core_packages = self.apt_venv.search_packages(listings.apt_core)
+        apt_core_packages = self._search_packages(listings.apt_core)
         apt_core_packages = self._remove_old_packages(apt_core_packages)
-        self.apt_venv.set_installed_packages(apt_core_packages)
+        self._set_installed_packages(apt_core_packages)
+
+    @classmethod
+    def get_update_max_age(cls) -> float:
+        """Seconds the package indexes are reused, set by ABUILDER_APT_UPDATE_MAX_AGE"""
+        max_age = os.getenv("ABUILDER_APT_UPDATE_MAX_AGE", cls.default_update_max_age)
+        try:
+            return float(max_age)
+        except ValueError:
+            logging.getLogger("AptPackageDeploy").warning(
+                "Invalid ABUILDER_APT_UPDATE_MAX_AGE value: %s, using %s seconds"
+                % (max_age, cls.default_update_max_age)
+            )
+            return cls.default_update_max_age
 
     def _resolve_packages_to_deploy(self, include_patterns, exclude_patterns):
         if exclude_patterns is None:
@@ -62,16 +120,33 @@ class Deploy:
 
         # extend user defined exclude listing with the default exclude listing
         exclude_patterns.extend(listings.default_exclude_list)
-        excluded_packages = set(self.apt_venv.search_packages(exclude_patterns))
+        excluded_packages = set(self._search_packages(exclude_patterns))
         # don't exclude explicitly required packages
-        required_packages = set(self.apt_venv.search_packages(include_patterns))
+        required_packages = set(self._search_packages(include_patterns))
         excluded_packages = excluded_packages.difference(required_packages)
-        self.apt_venv.set_installed_packages(excluded_packages)
-        # lists packages to be installed including dependencies
-        deploy_list = set(self.apt_venv.resolve_packages(include_patterns))
+        self._set_installed_packages(excluded_packages)
+        # lists packages to be installed including dependencies, the resolver order
+        # is kept as it defines which package provides the files shipped by many
+        deploy_list = list(dict.fromkeys(self._resolve_packages(include_patterns)))
 
         return deploy_list
 
+    def _search_packages(self, patterns):
+        if self.resolver:
+            return self.resolver.search_packages(patterns)
+        return self.apt_venv.search_packages(patterns)
+
+    def _set_installed_packages(self, packages):
+        if self.resolver:
+            self._installed_packages = list(packages)
+        else:
+            self.apt_venv.set_installed_packages(packages)
+
+    def _resolve_packages(self, patterns):
+        if self.resolver:
+            return self.resolver.resolve_packages(patterns, self._installed_packages)
+        return self.apt_venv.resolve_packages(patterns)
+
     def _extract_packages(self, appdir_root, packages):
         # manually extract downloaded packages to be able to create the runtime/compat partition
         # where the glibc library and other related packages will be placed
@@ -82,15 +157,49 @@ class Deploy:
         libc_root.mkdir(exist_ok=True, parents=True)
         libc_packages = self.list_glibc_related_packages()
 
-        for package in packages:
-            final_target = appdir_root
-            if package in libc_packages:
-                final_target = libc_root
-
-            self.logger.info(
-                "Deploying %s to %s" % (package.get_expected_file_name(), final_target)
-            )
-            self.apt_venv.extract_package(package, final_target)
+        # packages are merged in the order given by the resolver, when more than one
+        # package ships the same file the last one wins as it would with apt-get
+        # packages are extracted in parallel into isolated dirs next to the AppDir and
+        # moved into their final location afterwards
+        with tempfile.TemporaryDirectory(
+            prefix=".%s-extract-" % appdir_root.name, dir=appdir_root.parent
+        ) as staging_dir:
+            staging_dir = pathlib.Path(staging_dir)
+            with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+                futures = []
+                for idx, package in enumerate(packages):
+                    package_dir = staging_dir / str(idx)
+                    futures.append(
+                        executor.submit(
+                            self.apt_venv.extract_package, package, package_dir
+                        )
+                    )
+
+                owners = {}
+                for idx, (package, future) in enumerate(zip(packages, futures)):
+                    final_target = appdir_root
+                    if package in libc_packages:
+                        final_target = libc_root
+
+                    # propagate extraction errors
+                    files = future.result()
+                    prefix = final_target.relative_to(appdir_root)
+                    self.package_files[str(package)] = [
+                        str(prefix / file) for file in files
+                    ]
+
+                    self.logger.info(
+                        "Deploying %s to %s"
+                        % (package.get_expected_file_name(), final_target)
+                    )
+                    merge_tree(
+                        staging_dir / str(idx),
+                        final_target,
+                        package,
+                        owners,
+                        self.logger,
+                        appdir_root,
+                    )
 
         return packages
 
@@ -99,7 +208,7 @@ class Deploy:
         for pkg_name in listings.glibc:
             for arch in self.apt_venv.architectures:
                 initial_libc_packages.append("%s:%s" % (pkg_name, arch))
-        libc_packages = self.apt_venv.resolve_packages(initial_libc_packages)
+        libc_packages = self._resolve_packages(initial_libc_packages)
         return libc_packages
 
     def _remove_old_packages(self, apt_core_packages):
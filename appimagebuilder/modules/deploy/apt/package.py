@@ -10,11 +10,10 @@
 #   The above copyright notice and this permission notice shall be included in
 #   all copies or substantial portions of the Software.
 import re
+import string
 import urllib
 from pathlib import Path
 
-from packaging import version
-
 
 class Package:
     def __init__(self, name, version, arch):
@@ -76,7 +75,78 @@ class Package:
 
     def __gt__(self, other):
         if isinstance(other, Package):
-            return version.parse(self.version) > version.parse(other.version)
+            return compare_versions(self.version, other.version) > 0
 
     def __hash__(self):
         return self.__str__().__hash__()
+
+
+def compare_versions(a: str, b: str) -> int:
+    """Compare two debian packages versions following the dpkg algorithm
+
+    https://www.debian.org/doc/debian-policy/ch-controlfields.html#version
+    :return: negative if a < b, 0 if a == b or positive if a > b
+    """
+    a_epoch, a_upstream, a_revision = _split_version(a)
+    b_epoch, b_upstream, b_revision = _split_version(b)
+    if a_epoch != b_epoch:
+        return a_epoch - b_epoch
+
+    result = _compare_version_part(a_upstream, b_upstream)
+    if result:
+        return result
+
+    return _compare_version_part(a_revision, b_revision)
+
+
+def _split_version(value: str):
+    epoch = 0
+    if ":" in value:
+        epoch_str, value = value.split(":", 1)
+        epoch = int(epoch_str) if epoch_str.isdigit() else 0
+
+    revision = ""
+    if "-" in value:
+        value, revision = value.rsplit("-", 1)
+
+    return epoch, value, revision
+
+
+def _version_char_order(c: str) -> int:
+    if not c or c in string.digits:
+        return 0
+    if c in string.ascii_letters:
+        return ord(c)
+    if c == "~":
+        return -1
+    return ord(c) + 256
+
+
+def _compare_version_part(a: str, b: str) -> int:
+    i, j = 0, 0
+    while i < len(a) or j < len(b):
+        # compare the non digits prefix char by char
+        while (i < len(a) and a[i] not in string.digits) or (
+            j < len(b) and b[j] not in string.digits
+        ):
+            a_order = _version_char_order(a[i] if i < len(a) else "")
+            b_order = _version_char_order(b[j] if j < len(b) else "")
+            if a_order != b_order:
+                return a_order - b_order
+            i += 1
+            j += 1
+
+        # compare the digits prefix as numbers
+        a_start = i
+        while i < len(a) and a[i] in string.digits:
+            i += 1
+        b_start = j
+        while j < len(b) and b[j] in string.digits:
+            j += 1
+
+        a_number = int(a[a_start:i] or 0)
+        b_number = int(b[b_start:j] or 0)
+        if a_number != b_number:
+            return a_number - b_number
+
+    return 0
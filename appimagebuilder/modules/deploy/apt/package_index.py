@@ -0,0 +1,327 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import fnmatch
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sys
+from pathlib import Path
+
+from .package import compare_versions
+
+# binary packages fields required to resolve dependencies
+INDEXED_FIELDS = {
+    "Package",
+    "Version",
+    "Architecture",
+    "Multi-Arch",
+    "Pre-Depends",
+    "Depends",
+    "Provides",
+    "SHA256",
+}
+
+RELATION_REGEX = re.compile(
+    r"^\s*(?P<name>[^\s:(]+)(?::(?P<arch>[^\s(]+))?"
+    r"\s*(?:\(\s*(?P<op><<|<=|=|>=|>>|<|>)\s*(?P<version>[^)\s]+)\s*\))?"
+)
+
+
+class Relation:
+    """Single item of a package relationship field (i.e.: `libc6:any (>= 2.31)`)"""
+
+    def __init__(self, name, arch=None, op=None, version=None):
+        self.name = name
+        self.arch = arch
+        self.op = op
+        self.version = version
+
+    def is_satisfied_by(self, version: str) -> bool:
+        if not self.op:
+            return True
+        if version is None:
+            return False
+
+        result = compare_versions(version, self.version)
+        if self.op == "<<" or self.op == "<":
+            return result < 0
+        if self.op == "<=":
+            return result <= 0
+        if self.op == "=":
+            return result == 0
+        if self.op == ">=":
+            return result >= 0
+        return result > 0
+
+    def __str__(self):
+        output = self.name
+        if self.arch:
+            output += ":" + self.arch
+        if self.op:
+            output += " (%s %s)" % (self.op, self.version)
+        return output
+
+
+def parse_relations(value: str) -> [[Relation]]:
+    """Parse a relationship field into a list of alternatives groups"""
+    groups = []
+    if not value:
+        return groups
+
+    for group_str in value.split(","):
+        group = []
+        for item in group_str.split("|"):
+            match = RELATION_REGEX.match(item)
+            if match:
+                group.append(Relation(**match.groupdict()))
+        if group:
+            groups.append(group)
+    return groups
+
+
+class PackageRecord:
+    """Binary package entry of an apt `Packages` index"""
+
+    __slots__ = (
+        "name",
+        "version",
+        "arch",
+        "multi_arch",
+        "pre_depends",
+        "depends",
+        "provides",
+        "sha256",
+    )
+
+    def __init__(
+        self,
+        name,
+        version,
+        arch,
+        multi_arch=None,
+        pre_depends=None,
+        depends=None,
+        provides=None,
+        sha256=None,
+    ):
+        self.name = name
+        self.version = version
+        self.arch = arch
+        self.multi_arch = multi_arch
+        self.pre_depends = pre_depends
+        self.depends = depends
+        self.provides = provides
+        self.sha256 = sha256
+
+    @staticmethod
+    def from_fields(fields: {str: str}):
+        return PackageRecord(
+            sys.intern(fields["Package"]),
+            fields["Version"],
+            sys.intern(fields.get("Architecture", "")),
+            fields.get("Multi-Arch"),
+            fields.get("Pre-Depends"),
+            fields.get("Depends"),
+            fields.get("Provides"),
+            fields.get("SHA256"),
+        )
+
+    def to_tuple(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def get_dependencies(self) -> [[Relation]]:
+        return parse_relations(self.pre_depends) + parse_relations(self.depends)
+
+    def get_provides(self) -> [Relation]:
+        return [group[0] for group in parse_relations(self.provides)]
+
+
+class PackageIndex:
+    """In-memory database of the packages listed in the apt venv `lists` dir"""
+
+    # bump when the records layout changes to discard old caches
+    format_version = 2
+
+    def __init__(self, records: [PackageRecord] = None):
+        self.logger = logging.getLogger("AptPackageIndex")
+        self._records = []
+        self._by_name = {}
+        # virtual packages map, built on the first lookup
+        self._providers = None
+        for record in records or []:
+            self.add(record)
+
+    def add(self, record: PackageRecord):
+        self._records.append(record)
+        self._by_name.setdefault(record.name, []).append(record)
+        self._providers = None
+
+    @staticmethod
+    def from_lists(paths: [Path]):
+        index = PackageIndex()
+        for path in paths:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for fields in PackageIndex._parse_paragraphs(f.read()):
+                    if "Package" in fields and "Version" in fields:
+                        index.add(PackageRecord.from_fields(fields))
+
+        index.logger.debug("Loaded %s package names" % len(index._by_name))
+        return index
+
+    @staticmethod
+    def load(paths: [Path], cache_path: Path):
+        """Load the index from <cache_path> if the lists didn't change, parse them otherwise
+
+        The cache is keyed by the lists contents hashes and rewritten on every miss
+        """
+        key = PackageIndex._get_lists_key(paths)
+        records = PackageIndex._read_cache(cache_path, key)
+        if records is not None:
+            index = PackageIndex([PackageRecord(*record) for record in records])
+            index.logger.debug("Loaded %s package names from cache" % len(records))
+            return index
+
+        index = PackageIndex.from_lists(paths)
+        index._write_cache(cache_path, key)
+        return index
+
+    @staticmethod
+    def _get_lists_key(paths: [Path]) -> str:
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(path.name.encode())
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _read_cache(cache_path: Path, key: str):
+        try:
+            with open(cache_path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+
+        if (
+            not isinstance(data, dict)
+            or data.get("format_version") != PackageIndex.format_version
+            or data.get("key") != key
+        ):
+            return None
+
+        return data.get("records")
+
+    def _write_cache(self, cache_path: Path, key: str):
+        data = {
+            "format_version": self.format_version,
+            "key": key,
+            "records": [record.to_tuple() for record in self._records],
+        }
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as err:
+            self.logger.warning("Unable to write packages index cache: %s" % err)
+
+    @staticmethod
+    def _parse_paragraphs(content: str):
+        fields = {}
+        key = None
+        for line in content.splitlines():
+            if not line:
+                # empty lines indicate the end of a package description block
+                if fields:
+                    yield fields
+                    fields = {}
+                key = None
+                continue
+
+            if line[0] in " \t":
+                # continuation line
+                if key:
+                    fields[key] += " " + line.strip()
+                continue
+
+            key, sep, value = line.partition(":")
+            if not sep or key not in INDEXED_FIELDS:
+                key = None
+                continue
+            fields[key] = value.strip()
+
+        if fields:
+            yield fields
+
+    def __len__(self):
+        return len(self._records)
+
+    def names(self):
+        return self._by_name.keys()
+
+    def get(self, name: str) -> [PackageRecord]:
+        return self._by_name.get(name, [])
+
+    def find(self, name: str, version: str, arch: str) -> PackageRecord:
+        for record in self.get(name):
+            if record.version == version and record.arch == arch:
+                return record
+        return None
+
+    def get_providers(self, name: str) -> [(PackageRecord, Relation)]:
+        if self._providers is None:
+            self._providers = {}
+            for record in self._records:
+                if record.provides:
+                    for relation in record.get_provides():
+                        self._providers.setdefault(relation.name, []).append(
+                            (record, relation)
+                        )
+
+        return self._providers.get(name, [])
+
+    def search_names(self, patterns: [str]) -> [str]:
+        names = []
+        for pattern in patterns:
+            if pattern in self._by_name:
+                names.append(pattern)
+            elif _has_wildcards(pattern):
+                names.extend(fnmatch.filter(self._by_name.keys(), pattern))
+        return names
+
+    def search_packages(self, patterns: [str], architectures: [str]):
+        """List every available version of the packages matching the patterns as `apt-cache show` does
+
+        Patterns follow the apt notation `<name>[:<arch>][=<version>]` where name can be a glob pattern
+        """
+        records = []
+        for pattern in patterns:
+            name, _, version = pattern.partition("=")
+            name, _, arch = name.partition(":")
+            for pkg_name in self.search_names([name]):
+                for record in self._by_name[pkg_name]:
+                    if arch and record.arch not in (arch, "all"):
+                        continue
+                    if record.arch != "all" and record.arch not in architectures:
+                        continue
+                    if version and record.version != version:
+                        continue
+                    records.append(record)
+
+        return records
+
+
+def _has_wildcards(pattern: str) -> bool:
+    return any(c in pattern for c in "*?[")
@@ -0,0 +1,235 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import logging
+
+from .errors import AptDeployError
+from .package import Package, compare_versions
+from .package_index import PackageIndex, PackageRecord, Relation
+
+
+class Resolver:
+    """Resolve packages dependencies in-process using a single package index load
+
+    Only Pre-Depends and Depends are taken into account, Recommends and Suggests
+    are ignored as apt is configured to do. Conflicts and Breaks are not checked,
+    the newest candidate of every dependency is picked.
+    """
+
+    def __init__(self, index: PackageIndex, architectures: [str]):
+        self.index = index
+        self.architectures = architectures
+        self.native_arch = architectures[0]
+        self.logger = logging.getLogger("AptResolver")
+
+    def search_packages(self, patterns: [str]) -> [Package]:
+        """List every available version of the packages matching the patterns as `apt-cache show` does"""
+        records = self.index.search_packages(patterns, self.architectures)
+        return [self._to_package(record) for record in records]
+
+    def resolve_packages(self, patterns: [str], installed: [Package] = None):
+        """List the packages required to install <patterns> excluding the <installed> ones"""
+        installed_records = {}
+        for package in installed or []:
+            installed_records.setdefault(package.name, []).append(package)
+
+        selected = _Selection()
+        queue = []
+        for pattern in patterns:
+            for record in self._find_requested_records(pattern):
+                if self._select(record, selected, installed_records):
+                    queue.append(record)
+
+        while queue:
+            record = queue.pop(0)
+            for group in record.get_dependencies():
+                dependency = self._resolve_group(
+                    record, group, selected, installed_records
+                )
+                if dependency:
+                    queue.append(dependency)
+
+        return [self._to_package(record) for record in selected.records.values()]
+
+    def _find_requested_records(self, pattern: str) -> [PackageRecord]:
+        name, arch, version = self._split_pattern(pattern)
+        if not arch:
+            arch = self.native_arch
+
+        records = []
+        for pkg_name in self.index.search_names([name]):
+            candidates = [
+                record
+                for record in self.index.get(pkg_name)
+                if record.arch in (arch, "all")
+                and (not version or record.version == version)
+            ]
+            if candidates:
+                records.append(self._newest(candidates))
+
+        if not records:
+            raise AptDeployError("Unable to locate package %s" % pattern)
+
+        return records
+
+    def _resolve_group(self, parent, group: [Relation], selected, installed):
+        """Pick a candidate for a group of alternatives
+
+        :return: the newly selected record or None if the group was already satisfied
+        """
+        # alternatives already satisfied are preferred
+        for relation in group:
+            if self._is_satisfied(parent, relation, selected, installed):
+                return None
+
+        for relation in group:
+            candidates = self._find_candidates(parent, relation)
+            if candidates:
+                record = self._newest(candidates)
+                self._select(record, selected, installed)
+                return record
+
+        raise AptDeployError(
+            "Unable to satisfy %s dependency: %s"
+            % (parent.name, " | ".join(str(relation) for relation in group))
+        )
+
+    def _is_satisfied(self, parent, relation: Relation, selected, installed):
+        for package in installed.get(relation.name, []):
+            if self._is_arch_allowed(
+                parent, relation, package.arch, "foreign"
+            ) and relation.is_satisfied_by(package.version):
+                return True
+
+        for record in selected.by_name.get(relation.name, []):
+            if self._matches_package(parent, relation, record):
+                return True
+
+        for record, provided in selected.by_provided_name.get(relation.name, []):
+            # packages providing their own name are matched by name only
+            if (
+                record.name != relation.name
+                and self._is_provided(relation, provided)
+                and self._is_arch_allowed(
+                    parent, relation, record.arch, record.multi_arch
+                )
+            ):
+                return True
+
+        return False
+
+    def _find_candidates(self, parent, relation: Relation) -> [PackageRecord]:
+        candidates = [
+            record
+            for record in self.index.get(relation.name)
+            if self._matches_package(parent, relation, record)
+        ]
+        if candidates:
+            return candidates
+
+        # virtual packages
+        return [
+            record
+            for record in self._get_providers(relation)
+            if self._is_arch_allowed(parent, relation, record.arch, record.multi_arch)
+        ]
+
+    def _matches_package(self, parent, relation: Relation, record: PackageRecord):
+        return self._is_arch_allowed(
+            parent, relation, record.arch, record.multi_arch
+        ) and relation.is_satisfied_by(record.version)
+
+    def _get_providers(self, relation: Relation) -> [PackageRecord]:
+        return [
+            record
+            for record, provided in self.index.get_providers(relation.name)
+            if self._is_provided(relation, provided)
+        ]
+
+    @staticmethod
+    def _is_provided(relation: Relation, provided: Relation) -> bool:
+        # unversioned provides never satisfy versioned dependencies
+        return not relation.op or (
+            provided.op == "=" and relation.is_satisfied_by(provided.version)
+        )
+
+    def _is_arch_allowed(self, parent, relation: Relation, arch, multi_arch) -> bool:
+        if arch == "all":
+            return True
+
+        if arch not in self.architectures:
+            return False
+
+        if relation.arch and relation.arch not in ("any", "native"):
+            return arch == relation.arch
+
+        parent_arch = parent.arch
+        if parent_arch == "all" or relation.arch == "native":
+            parent_arch = self.native_arch
+
+        if arch == parent_arch:
+            return True
+
+        if relation.arch == "any":
+            return multi_arch in ("allowed", "foreign")
+
+        return multi_arch == "foreign"
+
+    @staticmethod
+    def _select(record: PackageRecord, selected, installed) -> bool:
+        if (record.name, record.arch) in selected.records:
+            return False
+
+        for package in installed.get(record.name, []):
+            if package.arch == record.arch:
+                return False
+
+        selected.add(record)
+        return True
+
+    @staticmethod
+    def _newest(records: [PackageRecord]) -> PackageRecord:
+        newest = records[0]
+        for record in records[1:]:
+            if compare_versions(record.version, newest.version) > 0:
+                newest = record
+        return newest
+
+    @staticmethod
+    def _split_pattern(pattern: str):
+        """Split apt packages notation `<name>[:<arch>][=<version>]`"""
+        name, _, version = pattern.partition("=")
+        name, _, arch = name.partition(":")
+        return name, arch or None, version or None
+
+    @staticmethod
+    def _to_package(record: PackageRecord) -> Package:
+        return Package(record.name, record.version, record.arch)
+
+
+class _Selection:
+    """Records picked by the resolver, indexed by name and by provided name"""
+
+    def __init__(self):
+        # (name, arch) -> record, in selection order
+        self.records = {}
+        self.by_name = {}
+        # provided name -> [(record, provided relation)]
+        self.by_provided_name = {}
+
+    def add(self, record: PackageRecord):
+        self.records[(record.name, record.arch)] = record
+        self.by_name.setdefault(record.name, []).append(record)
+        if record.provides:
+            for relation in record.get_provides():
+                self.by_provided_name.setdefault(relation.name, []).append(
+                    (record, relation)
+                )
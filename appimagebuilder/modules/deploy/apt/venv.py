@@ -11,21 +11,29 @@
 #   all copies or substantial portions of the Software.
 
 
-import fnmatch
 import hashlib
+import json
 import logging
 import os
 import subprocess
+import tempfile
+import time
 from pathlib import Path
 from urllib import request
 
-from appimagebuilder.utils import shell
+from appimagebuilder.utils import launcher, shell
+from appimagebuilder.utils.archive_pool import ArchiveDownload, ArchivePool
+from .deb_archive import DebArchive
 from .package import Package
+from .package_index import PackageIndex
 
-DEPENDS_ON = ["dpkg-deb", "apt-get", "apt-key", "fakeroot", "apt-cache"]
+DEPENDS_ON = ["dpkg-deb", "apt-get", "apt-key", "fakeroot"]
 
 
 class Venv:
+    # written after every successful `apt-get update`
+    update_stamp_name = "update.stamp"
+
     def __init__(
         self,
         base_path: str,
@@ -33,6 +41,7 @@ class Venv:
         keys: [str],
         architectures: [],
         user_options: {} = None,
+        archive_pool: ArchivePool = None,
     ):
         self.logger = logging.getLogger("apt")
         self._deps = shell.resolve_commands_paths(DEPENDS_ON)
@@ -41,6 +50,11 @@ class Venv:
         self.keys = keys
         self.architectures = architectures
         self.user_options = user_options
+        self.archive_pool = archive_pool
+
+        self._package_index = None
+        # archives locations reported by apt, by file name
+        self._archive_downloads = {}
 
         self._generate_paths(base_path)
         self._write_apt_conf(user_options, architectures)
@@ -59,6 +73,9 @@ class Venv:
         self._dpkg_path = self._base_path / "dpkg"
         self._dpkg_status_path = self._dpkg_path / "status"
         self._apt_archives_path = self._base_path / "archives"
+        self._apt_lists_path = self._base_path / "lists"
+        self._update_stamp_path = self._base_path / self.update_stamp_name
+        self._package_index_cache_path = self._base_path / "packages.cache"
 
         self._base_path.mkdir(parents=True, exist_ok=True)
         self._apt_conf_parts_path.mkdir(parents=True, exist_ok=True)
@@ -138,74 +155,183 @@ class Venv:
                     "\n" % (package.name, package.version, package.arch)
                 )
 
-    def _run_apt_cache_show(self, package_names: [str]):
-        if not package_names:
-            return None
+    def update(self) -> None:
+        # a failed update must not leave a valid stamp behind
+        if self._update_stamp_path.exists():
+            self._update_stamp_path.unlink()
 
-        command = "{apt-cache} show %s" % " ".join(package_names)
-        command = command.format(**self._deps)
-        self.logger.debug(command)
+        command = [self._deps["apt-get"], "update"]
+        self.logger.info(" ".join(command))
 
-        _proc = subprocess.run(
-            command, stdout=subprocess.PIPE, shell=True, env=self._get_environment()
-        )
+        _proc = launcher.run(command, env=self._get_environment())
         shell.assert_successful_result(_proc)
-        return _proc
+        self._package_index = None
 
-    def update(self) -> None:
-        command = "apt-get update"
-        self.logger.info(command)
+        with open(self._update_stamp_path, "w") as f:
+            json.dump({"fingerprint": self._get_fingerprint(), "time": time.time()}, f)
 
-        _proc = subprocess.run(command, shell=True, env=self._get_environment())
-        shell.assert_successful_result(_proc)
+    def is_update_required(self, max_age: float) -> bool:
+        """Check if the package indexes are missing, outdated or belong to other sources
 
-    def search_names(self, patterns: [str]):
-        output = self._run_apt_cache_pkgnames()
-        packages = output.stdout.decode("utf-8").splitlines()
+        :param max_age: seconds after which the indexes are considered outdated
+        """
+        try:
+            with open(self._update_stamp_path, "r") as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return True
 
-        filtered_packages = []
-        for pattern in patterns:
-            filtered_packages.extend(fnmatch.filter(packages, pattern))
+        if stamp.get("fingerprint") != self._get_fingerprint():
+            self.logger.info("Apt sources changed since the last update")
+            return True
 
-        return filtered_packages
+        if time.time() - stamp.get("time", 0) > max_age:
+            return True
 
-    def _run_apt_cache_pkgnames(self):
-        command = "{apt-cache} pkgnames".format(**self._deps)
-        self.logger.debug(command)
-        proc = subprocess.run(
-            command, stdout=subprocess.PIPE, shell=True, env=self._get_environment()
-        )
-        shell.assert_successful_result(proc)
-        return proc
+        # apt keeps a Release or InRelease file per source
+        release_files = list(self._apt_lists_path.glob("*Release"))
+        if self.sources and not release_files:
+            return True
 
-    def resolve_packages(self, packages: [Package]) -> [Package]:
-        packages_str = [str(package) for package in packages]
-        output = self._run_apt_get_install_download_only(packages_str)
+        return False
 
-        stdout_str = output.stderr.decode("utf-8")
-        installed_packages = []
-        for line in stdout_str.splitlines():
-            if line.startswith("Dequeuing") and line.endswith(".deb"):
-                file_path = Path(line.split(" ")[1])
-                installed_packages.append(Package.from_file_path(file_path))
+    def _get_fingerprint(self):
+        """Hash of everything that influences the package indexes contents"""
+        digest = hashlib.sha256()
+        for path in [self._apt_conf_path, self._apt_sources_list_path]:
+            with open(path, "rb") as f:
+                digest.update(f.read())
 
-        return installed_packages
+        for path in sorted(self._apt_key_parts_path.iterdir()):
+            digest.update(path.name.encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
 
-    def _run_apt_get_install_download_only(self, packages: [str]):
-        command = (
-            "{apt-get} install -y --no-install-recommends --download-only -o Debug::pkgAcquire=1 "
-            "{packages}".format(**self._deps, packages=" ".join(packages))
+        return digest.hexdigest()
+
+    def search_names(self, patterns: [str]):
+        return self.read_package_index().search_names(patterns)
+
+    def resolve_packages(self, packages: [Package]) -> [Package]:
+        packages_str = [str(package) for package in packages]
+        downloads = self._run_apt_get_print_uris(
+            "install -y --no-install-recommends", packages_str
         )
-        self.logger.debug(command)
-        command = subprocess.run(
-            command,
-            stderr=subprocess.PIPE,
-            shell=True,
-            env=self._get_environment(),
+
+        return [Package.from_file_path(download.file_name) for download in downloads]
+
+    def _run_apt_get_print_uris(self, action: str, packages: [str]):
+        """List the archives apt would fetch to perform <action>, nothing is downloaded"""
+        # an empty archives dir makes apt list every required archive
+        with tempfile.TemporaryDirectory() as archives_dir:
+            os.mkdir(os.path.join(archives_dir, "partial"))
+            command = [
+                self._deps["apt-get"],
+                *action.split(),
+                "--print-uris",
+                "-qq",
+                "-o",
+                "Dir::Cache::archives=%s" % archives_dir,
+                *packages,
+            ]
+            self.logger.debug(" ".join(command))
+            _proc = launcher.run(
+                command,
+                stdout=subprocess.PIPE,
+                cwd=archives_dir,
+                env=self._get_environment(),
+            )
+            shell.assert_successful_result(_proc)
+
+        downloads = []
+        for line in _proc.stdout.decode("utf-8").splitlines():
+            # format: '<url>' <file name> <size> <hash type>:<hash>
+            if not line.startswith("'"):
+                continue
+
+            parts = line.split()
+            url = parts[0].strip("'")
+            if url.startswith("copy:"):
+                url = "file:" + url[len("copy:") :]
+            checksum = self._get_index_checksum(parts[1])
+            if not checksum and len(parts) > 3:
+                checksum = parts[3]
+            download = ArchiveDownload(url, parts[1], int(parts[2]), checksum)
+            self._archive_downloads[download.file_name] = download
+            downloads.append(download)
+
+        return downloads
+
+    def read_package_index(self) -> PackageIndex:
+        """Load the packages listed in the indexes fetched by the last update"""
+        if not self._package_index:
+            self._package_index = PackageIndex.load(
+                sorted(self._apt_lists_path.glob("*_Packages")),
+                self._package_index_cache_path,
+            )
+
+        return self._package_index
+
+    def _get_index_checksum(self, file_name: str):
+        # `apt-get install --print-uris` reports MD5 sums, prefer the index SHA256
+        package = Package.from_file_path(file_name)
+        record = self.read_package_index().find(
+            package.name, package.version, package.arch
         )
+        if record and record.sha256:
+            return "SHA256:%s" % record.sha256
+        return None
+
+    def download_packages(self, packages: [Package]):
+        """Fetch the given packages versions into the archives dir, skipping the existing ones
+
+        Archives are taken from the host wide pool when one is set.
+        """
+        self._apt_archives_path.mkdir(parents=True, exist_ok=True)
+        missing = [
+            package
+            for package in packages
+            if not (self._apt_archives_path / package.get_expected_file_name()).exists()
+        ]
+        if not missing:
+            return
 
-        shell.assert_successful_result(command)
-        return command
+        unknown = [
+            package.get_apt_install_string()
+            for package in missing
+            if package.get_expected_file_name() not in self._archive_downloads
+        ]
+        if unknown:
+            self._run_apt_get_print_uris("download", unknown)
+
+        pooled = []
+        not_pooled = []
+        for package in missing:
+            download = self._archive_downloads.get(package.get_expected_file_name())
+            if self.archive_pool and download and self._is_poolable(download):
+                pooled.append(download)
+            else:
+                not_pooled.append(package.get_apt_install_string())
+
+        if pooled:
+            self.archive_pool.fetch(pooled, self._apt_archives_path)
+
+        if not_pooled:
+            self._run_apt_get_download(not_pooled)
+
+    @staticmethod
+    def _is_poolable(download: ArchiveDownload) -> bool:
+        scheme = download.url.partition(":")[0]
+        return bool(download.checksum) and scheme in ("http", "https", "ftp", "file")
+
+    def _run_apt_get_download(self, packages: [str]):
+        command = [self._deps["apt-get"], "download", *packages]
+        self.logger.debug(" ".join(command))
+
+        _proc = launcher.run(
+            command, cwd=self._apt_archives_path, env=self._get_environment()
+        )
+        shell.assert_successful_result(_proc)
 
     def resolve_archive_paths(self, packages: [Package]):
         paths = [
@@ -213,15 +339,15 @@ class Venv:
         ]
         return paths
 
-    def extract_package(self, package, target):
+    def extract_package(self, package, target) -> [str]:
+        """Extract the package contents into <target>
+
+        :return: extracted files paths relative to <target>
+        """
         path = self._apt_archives_path / package.get_expected_file_name()
+        self.logger.debug("Extracting %s to %s" % (path, target))
 
-        command = "{dpkg-deb} -x {archive} {directory}".format(
-            **self._deps, archive=path, directory=target
-        )
-        self.logger.debug(command)
-        output = subprocess.run(command, shell=True, env=self._get_environment())
-        shell.assert_successful_result(output)
+        return DebArchive(path).extract(target)
 
     def _write_dpkg_arch(self, architectures: [str]):
         with open(self._dpkg_path / "arch", "w") as f:
@@ -229,32 +355,5 @@ class Venv:
                 f.write("%s\n" % arch)
 
     def search_packages(self, names):
-        packages = []
-
-        pkg_name = None
-        pkg_version = None
-        pkg_arch = None
-
-        output = self._run_apt_cache_show(names)
-        for line in output.stdout.decode("utf-8").splitlines():
-            if line.startswith("Package:"):
-                pkg_name = line.split(" ", maxsplit=2)[1]
-
-            if line.startswith("Architecture"):
-                pkg_arch = line.split(" ", maxsplit=2)[1]
-
-            if line.startswith("Version:"):
-                pkg_version = line.split(" ", maxsplit=2)[1]
-
-            # empty lines indicate the end of a package description block
-            if not line and pkg_name:
-                packages.append(Package(pkg_name, pkg_version, pkg_arch))
-                pkg_name = None
-                pkg_arch = None
-                pkg_version = None
-
-        # empty lines indicate the end of a package description block
-        if pkg_name:
-            packages.append(Package(pkg_name, pkg_version, pkg_arch))
-
-        return packages
+        records = self.read_package_index().search_packages(names, self.architectures)
+        return [Package(record.name, record.version, record.arch) for record in records]
@@ -11,11 +11,15 @@
 #  all copies or substantial portions of the Software.
 
 import fnmatch
-import glob
 import logging
 import os
 import pathlib
+import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from appimagebuilder.utils import file_utils
+from . import paths_expander
 
 
 class FileDeploy:
@@ -105,37 +109,41 @@ class FileDeploy:
         self.app_dir = os.path.abspath(app_dir)
         self.logger = logging.getLogger("FileDeploy")
 
+        self._glibc_regex = _compile_patterns(self.listings["glibc"])
+        self._graphics_regex = _compile_patterns(self.listings["graphics"])
+
     def deploy(self, paths: [str]):
-        expanded_list = set()
-        for path in paths:
-            expanded_list = expanded_list.union(glob.glob(path, recursive=True))
+        # dirs are created upfront, files are copied in parallel afterwards
+        files = []
+        for path in sorted(self.expand_paths(paths)):
+            deploy_path = self._resolve_deploy_prefix(path) + path.lstrip("/")
 
-        for path in expanded_list:
-            self._deploy_path(path)
+            self.logger.info("deploying %s" % path)
+            if os.path.isfile(path):
+                files.append((path, deploy_path))
+            elif os.path.isdir(path):
+                os.makedirs(deploy_path, exist_ok=True)
+            # special files (devices, sockets, etc.) get ignored here
 
-    def _deploy_path(self, path):
-        deploy_prefix = self._resolve_deploy_prefix(path)
-        deploy_path = deploy_prefix + path.lstrip("/")
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            # propagate copy errors
+            list(executor.map(lambda item: self._deploy_file(*item), files))
 
-        self.logger.info("deploying %s" % path)
-        if os.path.isfile(path):
-            os.makedirs(os.path.dirname(deploy_path), exist_ok=True)
-            shutil.copy2(path, deploy_path)
-        elif os.path.isdir(path):
-            os.makedirs(deploy_path, exist_ok=True)
-        # special files (devices, sockets, etc.) get ignored here
+    @staticmethod
+    def expand_paths(paths: [str]) -> {str}:
+        return paths_expander.expand_paths(paths)
 
-    def _is_a_graphic_library(self, path):
-        for pattern in self.listings["graphics"]:
-            if fnmatch.fnmatch(path, pattern):
-                return True
+    @staticmethod
+    def _deploy_file(path, deploy_path):
+        os.makedirs(os.path.dirname(deploy_path), exist_ok=True)
+        file_utils.copy_file(path, deploy_path)
 
-        return False
+    def _is_a_graphic_library(self, path):
+        return bool(self._graphics_regex.match(path))
 
     def _resolve_deploy_prefix(self, path: str):
-        for pattern in self.listings["glibc"]:
-            if fnmatch.fnmatch(path, pattern):
-                return self.app_dir.rstrip("/") + "/runtime/compat/"
+        if self._glibc_regex.match(path):
+            return self.app_dir.rstrip("/") + "/runtime/compat/"
 
         return self.app_dir.rstrip("/") + "/"
 
@@ -158,3 +166,11 @@ class FileDeploy:
                 except FileNotFoundError:
                     # it's ok to ignore files that were already deleted
                     pass
+
+
+def _compile_patterns(patterns: [str]):
+    """Compile a list of fnmatch patterns into a single regex"""
+    unique_patterns = dict.fromkeys(patterns)
+    return re.compile(
+        "|".join("(?:%s)" % fnmatch.translate(pattern) for pattern in unique_patterns)
+    )
@@ -0,0 +1,208 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import fnmatch
+import glob
+import os
+import re
+import stat
+
+# regex of `**` components, zero or more dirs followed by a separator
+ANY_DIRS_REGEX = "(?:[^/]+/)*"
+
+
+def expand_paths(patterns: [str]) -> {str}:
+    """Expand glob patterns as `glob.glob(pattern, recursive=True)` does
+
+    Recursive patterns (`**`) under the same base dir are compiled into a single
+    regex and matched against the entries listed in one walk of that dir, instead
+    of walking it once per pattern. The remaining patterns are expanded with `glob`.
+    """
+    expanded = set()
+    recursive_patterns = {}
+    for pattern in patterns:
+        split = _split_recursive_pattern(pattern)
+        if split:
+            base_dir, regex = split
+            recursive_patterns.setdefault(base_dir, []).append(regex)
+        else:
+            expanded.update(glob.glob(pattern, recursive=True))
+
+    for base_dir, regexes in recursive_patterns.items():
+        entry_regexes = []
+        dir_regexes = []
+        for regex in regexes:
+            if regex.endswith(ANY_DIRS_REGEX):
+                # a trailing `**` matching no components lists the dir before it
+                # with a trailing separator, as glob does
+                regex = regex[: -len(ANY_DIRS_REGEX)]
+                entry_regexes.append(regex + "(?:[^/]+/)+")
+                dir_regexes.append(regex)
+            else:
+                entry_regexes.append(regex)
+
+        matcher = _compile_matcher(entry_regexes)
+        dir_matcher = _compile_matcher(dir_regexes)
+        for parts, is_dir in _walk(base_dir):
+            # every component is followed by a separator, as in the regexes
+            path = "".join(part + "/" for part in parts)
+            if parts and matcher(path):
+                expanded.add(os.path.join(base_dir, *parts))
+
+            if is_dir and dir_matcher(path):
+                dir_path = os.path.join(base_dir, *parts, "")
+                if dir_path:
+                    expanded.add(dir_path)
+
+    return expanded
+
+
+def _split_recursive_pattern(pattern: str):
+    """Split <pattern> into its literal base dir and a regex for the remaining components
+
+    :return: None if the pattern is not handled by the shared walk
+    """
+    if "**" not in pattern or pattern.endswith(os.sep):
+        return None
+
+    components = pattern.split(os.sep)
+    base_components = []
+    while components and not glob.has_magic(components[0]):
+        base_components.append(components.pop(0))
+
+    regex = ""
+    for component in components:
+        # hidden entries are not listed by the walk
+        if component.startswith(".") or not component:
+            return None
+
+        if component == "**":
+            # consecutive `**` are redundant
+            if not regex.endswith(ANY_DIRS_REGEX):
+                regex += ANY_DIRS_REGEX
+        else:
+            regex += _translate_component(component) + "/"
+
+    base_dir = os.sep.join(base_components)
+    if pattern.startswith(os.sep) and not base_dir:
+        base_dir = os.sep
+    return base_dir, regex
+
+
+def _compile_matcher(regexes: [str]):
+    """Compile the patterns regexes of a base dir into a single matcher
+
+    Leading `**` are replaced by a search of the rest of the pattern at the start of
+    any component, backtracking over the dirs once per pattern is too slow.
+    """
+    anchored = []
+    unanchored = []
+    for regex in regexes:
+        if regex.startswith(ANY_DIRS_REGEX):
+            unanchored.append(regex[len(ANY_DIRS_REGEX) :])
+        else:
+            anchored.append(regex)
+
+    anchored_regex = re.compile("|".join("(?:%s)" % regex for regex in anchored))
+    unanchored_regex = re.compile(
+        r"(?:\A|(?<=/))(?:%s)\Z" % "|".join("(?:%s)" % regex for regex in unanchored)
+    )
+
+    def matcher(path: str) -> bool:
+        return bool(
+            (anchored and anchored_regex.fullmatch(path))
+            or (unanchored and unanchored_regex.search(path))
+        )
+
+    return matcher
+
+
+def _translate_component(component: str) -> str:
+    """Translate a path component pattern into a regex, wildcards never match separators"""
+    regex = ""
+    idx = 0
+    while idx < len(component):
+        char = component[idx]
+        idx += 1
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = idx
+            if end < len(component) and component[end] == "!":
+                end += 1
+            if end < len(component) and component[end] == "]":
+                end += 1
+            end = component.find("]", end)
+            if end < 0:
+                regex += re.escape(char)
+                continue
+
+            chars = component[idx:end].replace("\\", "\\\\")
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            elif chars.startswith("^"):
+                chars = "\\" + chars
+            regex += "(?!/)[%s]" % chars
+            idx = end + 1
+        else:
+            regex += re.escape(char)
+    return regex
+
+
+def _walk(base_dir: str):
+    """List the non hidden entries under <base_dir> as tuples of path components
+
+    The base dir itself is listed as an empty tuple. Symlinks to dirs are followed
+    as glob does, except when they point to one of their parent dirs.
+
+    :return: pairs of components tuples and whether the entry is a dir
+    """
+    try:
+        stat_result = os.stat(base_dir or os.curdir)
+    except OSError:
+        return
+
+    # glob lists an existing base dir even if it's a file (i.e.: `file/**` -> `file/`)
+    yield (), True
+    if not stat.S_ISDIR(stat_result.st_mode):
+        return
+
+    stack = [((), base_dir, {(stat_result.st_dev, stat_result.st_ino)})]
+    while stack:
+        parts, path, ancestors = stack.pop()
+        try:
+            with os.scandir(path or os.curdir) as it:
+                entries = [entry for entry in it if not entry.name.startswith(".")]
+        except OSError:
+            continue
+
+        for entry in entries:
+            entry_parts = parts + (entry.name,)
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            yield entry_parts, is_dir
+            if not is_dir:
+                continue
+
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+
+            key = (stat_result.st_dev, stat_result.st_ino)
+            if key not in ancestors:
+                entry_path = os.path.join(path, entry.name)
+                stack.append((entry_parts, entry_path, ancestors | {key}))
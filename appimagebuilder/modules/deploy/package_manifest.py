@@ -0,0 +1,104 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import json
+import logging
+import os
+import pathlib
+
+
+class PackageManifest:
+    """
+    Files written into the AppDir by each deployed package
+
+    Stored next to the .bundle.yml file, it allows to update only the packages that
+    changed between builds. Paths are relative to the AppDir.
+    """
+
+    format_version = 1
+
+    def __init__(self, app_dir: pathlib.Path, name: str):
+        self.app_dir = pathlib.Path(app_dir)
+        self.path = self.app_dir / (".bundle-%s-files.json" % name)
+        self.logger = logging.getLogger("PackageManifest")
+        self.packages = {}
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.packages = {}
+            return
+
+        if data.get("format_version") == self.format_version:
+            self.packages = data.get("packages", {})
+        else:
+            self.packages = {}
+
+    def save(self):
+        self.app_dir.mkdir(parents=True, exist_ok=True)
+        data = {"format_version": self.format_version, "packages": self.packages}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def set_files(self, package_id: str, files: [str]):
+        self.packages[package_id] = files
+
+    def is_deployed(self, package_id: str) -> bool:
+        """Check if the package was deployed and its files are still in place"""
+        if package_id not in self.packages:
+            return False
+
+        for file in self.packages[package_id]:
+            if not os.path.lexists(self.app_dir / file):
+                return False
+
+        return True
+
+    def remove_packages_except(self, package_ids: [str]):
+        """Remove the files of the packages not listed in <package_ids>
+
+        Files also shipped by a kept package are left in place
+        """
+        package_ids = set(package_ids)
+        kept_files = set()
+        for package_id, files in self.packages.items():
+            if package_id in package_ids:
+                kept_files.update(files)
+
+        for package_id in list(self.packages.keys()):
+            if package_id in package_ids:
+                continue
+
+            self.logger.info("Removing %s files" % package_id)
+            self._remove_files(
+                [file for file in self.packages[package_id] if file not in kept_files]
+            )
+            del self.packages[package_id]
+
+    def _remove_files(self, files: [str]):
+        dirs = set()
+        for file in files:
+            path = self.app_dir / file
+            if os.path.lexists(path) and not (path.is_dir() and not path.is_symlink()):
+                path.unlink()
+            dirs.update(path.parents)
+
+        # remove the dirs that became empty, deepest first
+        dirs = [path for path in dirs if self.app_dir in path.parents]
+        for path in sorted(dirs, key=lambda item: len(item.parts), reverse=True):
+            try:
+                path.rmdir()
+            except OSError:
+                pass
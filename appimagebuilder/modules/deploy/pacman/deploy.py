@@ -11,8 +11,12 @@
 #   all copies or substantial portions of the Software.
 import logging
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from ..package_manifest import PackageManifest
+from ..util import merge_tree
 from .venv import Venv
 
 
@@ -47,12 +51,20 @@ class Deploy:
         ],
     }
 
+    # seconds after which the sync databases are refreshed
+    default_update_max_age = 60 * 60
+
     def __init__(self, venv: Venv):
         self.pacman_venv = venv
         self.logger = logging.getLogger("PacmanPackageDeploy")
 
     def deploy(self, packages: [str], appdir_root: str, exclude: [str] = None):
-        self.pacman_venv.update()
+        if self.pacman_venv.is_update_required(self.get_update_max_age()):
+            self.pacman_venv.update()
+        else:
+            self.logger.info(
+                "Skipping `pacman -Sy` execution. Sync databases are up to date"
+            )
 
         appdir_root = Path(appdir_root)
         if not exclude:
@@ -70,9 +82,23 @@ class Deploy:
         package_files = self.pacman_venv.retrieve(packages, exclude)
         self.logger.debug("Candidate packages: %s" % " ".join(package_files))
 
+        # packages deployed by a previous build are kept if they didn't change
+        manifest = PackageManifest(appdir_root, "pacman")
+        manifest.load()
+        manifest.remove_packages_except(
+            [os.path.basename(file) for file in package_files]
+        )
+
         deployed_packages = []
+        pending = []
         for file in package_files:
             name, version = self.pacman_venv.read_package_data(file)
+            deployed_packages.append("%s=%s" % (name, version))
+            package_id = os.path.basename(file)
+            if manifest.is_deployed(package_id):
+                self.logger.info("%s=%s is already deployed" % (name, version))
+                continue
+
             target = (
                 appdir_root / "runtime" / "compat"
                 if name in self.listings["glibc"]
@@ -80,21 +106,76 @@ class Deploy:
             )
 
             self.logger.info("Deploying %s=%s to %s" % (name, version, target))
-            self.pacman_venv.extract(file, target)
-            deployed_packages.append("%s=%s" % (name, version))
+            pending.append((file, package_id, target))
+
+        appdir_root.mkdir(parents=True, exist_ok=True)
+        # packages are extracted in parallel into isolated dirs next to the AppDir and
+        # merged into their targets afterwards in the transaction order. pacman doesn't
+        # check for conflicting files anymore, the merge reports them
+        with tempfile.TemporaryDirectory(
+            prefix=".%s-extract-" % appdir_root.name, dir=appdir_root.parent
+        ) as staging_dir:
+            staging_dir = Path(staging_dir)
+            with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+                futures = [
+                    executor.submit(
+                        self.pacman_venv.extract, file, staging_dir / str(idx)
+                    )
+                    for idx, (file, _, _) in enumerate(pending)
+                ]
+
+                owners = {}
+                for idx, ((file, package_id, target), future) in enumerate(
+                    zip(pending, futures)
+                ):
+                    # propagate extraction errors
+                    files = future.result()
+                    prefix = target.relative_to(appdir_root)
+                    manifest.set_files(
+                        package_id, [str(prefix / file) for file in files]
+                    )
+
+                    target.mkdir(parents=True, exist_ok=True)
+                    merge_tree(
+                        staging_dir / str(idx),
+                        target,
+                        package_id,
+                        owners,
+                        self.logger,
+                        appdir_root,
+                    )
+
+        manifest.save()
 
         # create symlinks existent in a regular archlinux system
-        os.symlink("usr/bin", appdir_root / "bin")
-        os.symlink("usr/bin", appdir_root / "sbin")
-        os.symlink("usr/lib", appdir_root / "lib")
-        os.symlink("usr/lib", appdir_root / "lib64")
-        os.symlink("lib", appdir_root / "usr" / "lib64")
-        os.symlink("bin", appdir_root / "usr" / "sbin")
-
-        os.symlink("usr/bin", appdir_root / "runtime" / "compat" / "bin")
-        os.symlink("usr/bin", appdir_root / "runtime" / "compat" / "sbin")
-        os.symlink("usr/lib", appdir_root / "runtime" / "compat" / "lib")
-        os.symlink("usr/lib", appdir_root / "runtime" / "compat" / "lib64")
-        os.symlink("lib", appdir_root / "runtime" / "compat" / "usr" / "lib64")
-        os.symlink("bin", appdir_root / "runtime" / "compat" / "usr" / "sbin")
+        for root in [appdir_root, appdir_root / "runtime" / "compat"]:
+            self._make_symlink("usr/bin", root / "bin")
+            self._make_symlink("usr/bin", root / "sbin")
+            self._make_symlink("usr/lib", root / "lib")
+            self._make_symlink("usr/lib", root / "lib64")
+            self._make_symlink("lib", root / "usr" / "lib64")
+            self._make_symlink("bin", root / "usr" / "sbin")
+
         return deployed_packages
+
+    @classmethod
+    def get_update_max_age(cls) -> float:
+        """Seconds the sync databases are reused, set by ABUILDER_PACMAN_UPDATE_MAX_AGE"""
+        max_age = os.getenv(
+            "ABUILDER_PACMAN_UPDATE_MAX_AGE", cls.default_update_max_age
+        )
+        try:
+            return float(max_age)
+        except ValueError:
+            logging.getLogger("PacmanPackageDeploy").warning(
+                "Invalid ABUILDER_PACMAN_UPDATE_MAX_AGE value: %s, using %s seconds"
+                % (max_age, cls.default_update_max_age)
+            )
+            return cls.default_update_max_age
+
+    @staticmethod
+    def _make_symlink(target, link: Path):
+        # links are kept from previous builds
+        if not os.path.lexists(link):
+            link.parent.mkdir(parents=True, exist_ok=True)
+            os.symlink(target, link)
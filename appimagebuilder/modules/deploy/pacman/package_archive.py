@@ -0,0 +1,81 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import os
+from contextlib import contextmanager
+
+from appimagebuilder.modules.deploy import tar_stream
+
+# pacman database files included in the packages
+PACKAGE_METADATA_FILES = [".BUILDINFO", ".MTREE", ".PKGINFO", ".INSTALL"]
+
+
+class PackageArchiveError(RuntimeError):
+    pass
+
+
+class PackageArchive:
+    """
+    Reads pacman packages without bsdtar or pacman
+
+    The package is decompressed and extracted as a stream. The `.PKGINFO` file is
+    the first member of the archive, the package metadata is read without going
+    through the payload.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def read_info(self) -> (str, str):
+        """Read the package name and version from the `.PKGINFO` file"""
+        with self._open_tar() as tar:
+            for member in tar:
+                name = tar_stream.normalize_member_name(member.name, self.path)
+                if name == ".PKGINFO":
+                    return self._parse_info(tar.extractfile(member).read())
+
+        raise PackageArchiveError("Unable to read package info from: '%s'" % self.path)
+
+    def extract(self, target) -> [str]:
+        """Extract the package contents into <target>, metadata files are skipped
+
+        :return: paths of the extracted files relative to <target>
+        """
+        os.makedirs(target, exist_ok=True)
+        try:
+            with self._open_tar() as tar:
+                return tar_stream.extract_members(
+                    tar, str(target), self.path, PACKAGE_METADATA_FILES
+                )
+        except tar_stream.TarStreamError as err:
+            raise PackageArchiveError(str(err)) from err
+
+    def _parse_info(self, data: bytes):
+        values = {}
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            key, sep, value = line.partition(" = ")
+            if sep and not key.startswith("#"):
+                values.setdefault(key.strip(), value.strip())
+
+        if "pkgname" not in values or "pkgver" not in values:
+            raise PackageArchiveError(
+                "Unable to read package info from: '%s'" % self.path
+            )
+
+        return values["pkgname"], values["pkgver"]
+
+    @contextmanager
+    def _open_tar(self):
+        try:
+            with tar_stream.open_file_tar(self.path) as tar:
+                yield tar
+        except tar_stream.TarStreamError as err:
+            raise PackageArchiveError(str(err)) from err
@@ -0,0 +1,86 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import os
+import subprocess
+import tempfile
+
+from appimagebuilder.utils import launcher
+
+# gpg status keywords of a signature made by a key trusted through the keyring
+TRUSTED_VALIDITIES = ["TRUST_MARGINAL", "TRUST_FULLY", "TRUST_ULTIMATE"]
+
+# gpg status keywords of signatures pacman rejects even if the key is trusted
+REJECTED_STATUSES = ["BADSIG", "ERRSIG", "EXPSIG", "EXPKEYSIG", "REVKEYSIG"]
+
+
+class PackageSignatureError(RuntimeError):
+    pass
+
+
+class PackageSignatureVerifier:
+    """
+    Checks the detached signatures of pacman packages against a pacman-key keyring
+
+    As pacman with `SigLevel = Required TrustedOnly`, a signature is accepted
+    only if it's valid and made by a key with at least marginal trust.
+    """
+
+    def __init__(self, gpg_dir, gpg: str = "gpg"):
+        self.gpg_dir = gpg_dir
+        self.gpg = gpg
+
+    def verify(self, path, signature: bytes):
+        """Raise PackageSignatureError unless <signature> is a trusted signature of <path>"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            signature_path = os.path.join(temp_dir, os.path.basename(path) + ".sig")
+            with open(signature_path, "wb") as f:
+                f.write(signature)
+
+            result = launcher.run(
+                [
+                    self.gpg,
+                    "--homedir",
+                    str(self.gpg_dir),
+                    "--batch",
+                    "--no-tty",
+                    "--status-fd",
+                    "1",
+                    "--verify",
+                    signature_path,
+                    str(path),
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+
+        statuses = self._parse_statuses(result.stdout.decode("utf-8", "replace"))
+        rejected = [status for status in REJECTED_STATUSES if status in statuses]
+        if result.returncode != 0 or rejected or "VALIDSIG" not in statuses:
+            raise PackageSignatureError(
+                "Invalid signature of %s: %s"
+                % (path, result.stderr.decode("utf-8", "replace").strip())
+            )
+
+        if not any(validity in statuses for validity in TRUSTED_VALIDITIES):
+            raise PackageSignatureError(
+                "%s is signed by an untrusted key: %s"
+                % (path, " ".join(statuses["VALIDSIG"][:1]))
+            )
+
+    @staticmethod
+    def _parse_statuses(output: str) -> {str: [str]}:
+        statuses = {}
+        for line in output.splitlines():
+            if line.startswith("[GNUPG:] "):
+                keyword, *args = line[len("[GNUPG:] ") :].split()
+                statuses[keyword] = args
+        return statuses
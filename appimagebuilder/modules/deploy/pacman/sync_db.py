@@ -0,0 +1,456 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sys
+from pathlib import Path
+
+from appimagebuilder.modules.deploy import tar_stream
+
+RELATION_REGEX = re.compile(
+    r"^\s*(?P<name>[^<>=:\s]+)\s*(?:(?P<op><=|>=|=|<|>)\s*(?P<version>[^:\s]+))?"
+)
+
+VERSION_SEGMENT_REGEX = re.compile(r"[0-9]+|[a-zA-Z]+")
+
+
+class SyncDbError(RuntimeError):
+    pass
+
+
+def compare_versions(a: str, b: str) -> int:
+    """Compare two package versions (`[epoch:]version[-release]`) as pacman `vercmp` does"""
+    if a == b:
+        return 0
+
+    a_epoch, a_version, a_release = _split_version(a)
+    b_epoch, b_version, b_release = _split_version(b)
+
+    result = _compare_numbers(a_epoch, b_epoch)
+    if result == 0:
+        result = _compare_segments(a_version, b_version)
+    if result == 0 and a_release and b_release:
+        result = _compare_segments(a_release, b_release)
+    return result
+
+
+def _split_version(version: str):
+    epoch, sep, rest = version.partition(":")
+    if not sep or not epoch.isdigit():
+        epoch, rest = "0", version
+
+    version, _, release = rest.rpartition("-")
+    if not version:
+        version, release = release, None
+    return int(epoch), version, release
+
+
+def _compare_numbers(a, b) -> int:
+    return (a > b) - (a < b)
+
+
+def _compare_segments(a: str, b: str) -> int:
+    a_segments = VERSION_SEGMENT_REGEX.findall(a)
+    b_segments = VERSION_SEGMENT_REGEX.findall(b)
+    for a_segment, b_segment in zip(a_segments, b_segments):
+        a_is_number = a_segment.isdigit()
+        if a_is_number != b_segment.isdigit():
+            # numeric segments are newer than alphabetic ones
+            return 1 if a_is_number else -1
+
+        if a_is_number:
+            result = _compare_numbers(int(a_segment), int(b_segment))
+        else:
+            result = _compare_numbers(a_segment, b_segment)
+        if result:
+            return result
+
+    if len(a_segments) == len(b_segments):
+        return 0
+
+    # an extra alphabetic segment marks a pre-release (i.e.: 1.0alpha < 1.0)
+    if len(a_segments) > len(b_segments):
+        return -1 if a_segments[len(b_segments)].isalpha() else 1
+    return 1 if b_segments[len(a_segments)].isalpha() else -1
+
+
+class Relation:
+    """Package dependency or provision (i.e.: `glibc>=2.35` or `sh`)"""
+
+    def __init__(self, name, op=None, version=None):
+        self.name = name
+        self.op = op
+        self.version = version
+
+    @staticmethod
+    def parse(value: str):
+        match = RELATION_REGEX.match(value)
+        if not match:
+            raise SyncDbError("Malformed package relation: %s" % value)
+        return Relation(**match.groupdict())
+
+    def is_satisfied_by(self, version: str) -> bool:
+        if not self.op:
+            return True
+        if version is None:
+            return False
+
+        # versions without release match every release (i.e.: glibc=2.35)
+        if "-" not in self.version and "-" in version:
+            version = version.rpartition("-")[0]
+
+        result = compare_versions(version, self.version)
+        if self.op == "<":
+            return result < 0
+        if self.op == "<=":
+            return result <= 0
+        if self.op == "=":
+            return result == 0
+        if self.op == ">=":
+            return result >= 0
+        return result > 0
+
+    def __str__(self):
+        if self.op:
+            return "%s%s%s" % (self.name, self.op, self.version)
+        return self.name
+
+
+class PackageRecord:
+    """Package entry of a pacman sync database"""
+
+    __slots__ = (
+        "name",
+        "version",
+        "repository",
+        "file_name",
+        "size",
+        "sha256",
+        "depends",
+        "provides",
+        "groups",
+        "pgpsig",
+    )
+
+    def __init__(
+        self,
+        name,
+        version,
+        repository,
+        file_name,
+        size=0,
+        sha256=None,
+        depends=(),
+        provides=(),
+        groups=(),
+        pgpsig=None,
+    ):
+        self.name = name
+        self.version = version
+        self.repository = repository
+        self.file_name = file_name
+        self.size = size
+        self.sha256 = sha256
+        self.depends = tuple(depends)
+        self.provides = tuple(provides)
+        self.groups = tuple(groups)
+        # base64 detached signature of the package file
+        self.pgpsig = pgpsig
+
+    @staticmethod
+    def from_desc(repository: str, fields: {str: [str]}):
+        try:
+            return PackageRecord(
+                sys.intern(fields["NAME"][0]),
+                fields["VERSION"][0],
+                sys.intern(repository),
+                fields["FILENAME"][0],
+                int(fields.get("CSIZE", ["0"])[0]),
+                fields.get("SHA256SUM", [None])[0],
+                fields.get("DEPENDS", []),
+                fields.get("PROVIDES", []),
+                fields.get("GROUPS", []),
+                fields.get("PGPSIG", [None])[0],
+            )
+        except (KeyError, IndexError, ValueError):
+            raise SyncDbError("Malformed package description in %s" % repository)
+
+    def to_tuple(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def get_dependencies(self) -> [Relation]:
+        return [Relation.parse(value) for value in self.depends]
+
+    def get_provides(self) -> [Relation]:
+        return [Relation.parse(value) for value in self.provides]
+
+    def __str__(self):
+        return "%s=%s" % (self.name, self.version)
+
+
+class SyncDatabase:
+    """In-memory index of the packages listed in the pacman sync databases
+
+    Repositories are kept in the pacman.conf order, the first one listing a package
+    name takes precedence as in pacman.
+    """
+
+    # bump when the records layout changes to discard old caches
+    format_version = 2
+
+    def __init__(self, records: [PackageRecord] = None):
+        self.logger = logging.getLogger("PacmanSyncDb")
+        self._records = []
+        self._by_name = {}
+        self._by_repository = {}
+        # virtual packages and groups maps, built on the first lookup
+        self._providers = None
+        self._groups = None
+        for record in records or []:
+            self.add(record)
+
+    def add(self, record: PackageRecord):
+        self._records.append(record)
+        self._by_name.setdefault(record.name, []).append(record)
+        self._by_repository.setdefault(record.repository, {})[record.name] = record
+        self._providers = None
+        self._groups = None
+
+    @staticmethod
+    def from_files(paths: [Path]):
+        """Parse the `<repository>.db` files, the repository name is taken from the file name"""
+        database = SyncDatabase()
+        for path in paths:
+            repository = Path(path).name.rsplit(".db", 1)[0]
+            for fields in SyncDatabase._read_descriptions(path):
+                database.add(PackageRecord.from_desc(repository, fields))
+
+        database.logger.debug("Loaded %s packages" % len(database))
+        return database
+
+    @staticmethod
+    def load(paths: [Path], cache_path: Path):
+        """Load the index from <cache_path> if the databases didn't change, parse them otherwise
+
+        The cache is keyed by the databases contents hashes and rewritten on every miss
+        """
+        key = SyncDatabase._get_files_key(paths)
+        records = SyncDatabase._read_cache(cache_path, key)
+        if records is not None:
+            database = SyncDatabase([PackageRecord(*record) for record in records])
+            database.logger.debug("Loaded %s packages from cache" % len(records))
+            return database
+
+        database = SyncDatabase.from_files(paths)
+        database._write_cache(cache_path, key)
+        return database
+
+    @staticmethod
+    def _read_descriptions(path):
+        try:
+            with tar_stream.open_file_tar(path) as tar:
+                for member in tar:
+                    if member.isfile() and member.name.endswith("/desc"):
+                        content = tar.extractfile(member).read().decode("utf-8")
+                        yield SyncDatabase._parse_desc(content)
+        except tar_stream.TarStreamError as err:
+            raise SyncDbError(str(err)) from err
+
+    @staticmethod
+    def _parse_desc(content: str) -> {str: [str]}:
+        fields = {}
+        values = None
+        for line in content.splitlines():
+            if line.startswith("%") and line.endswith("%") and len(line) > 2:
+                values = fields.setdefault(line[1:-1], [])
+            elif line and values is not None:
+                values.append(line)
+            else:
+                # empty lines indicate the end of a field
+                values = None
+        return fields
+
+    @staticmethod
+    def _get_files_key(paths: [Path]) -> str:
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(Path(path).name.encode())
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _read_cache(cache_path: Path, key: str):
+        try:
+            with open(cache_path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+
+        if (
+            not isinstance(data, dict)
+            or data.get("format_version") != SyncDatabase.format_version
+            or data.get("key") != key
+        ):
+            return None
+
+        return data.get("records")
+
+    def _write_cache(self, cache_path: Path, key: str):
+        data = {
+            "format_version": self.format_version,
+            "key": key,
+            "records": [record.to_tuple() for record in self._records],
+        }
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as err:
+            self.logger.warning("Unable to write sync database cache: %s" % err)
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, name: str, repository: str = None) -> PackageRecord:
+        """Find a package by name in the given repository or in the first one listing it"""
+        if repository:
+            return self._by_repository.get(repository, {}).get(name)
+
+        records = self._by_name.get(name)
+        return records[0] if records else None
+
+    def get_all(self, name: str) -> [PackageRecord]:
+        """List the packages named <name> in repositories order"""
+        return self._by_name.get(name, [])
+
+    def get_providers(self, name: str) -> [(PackageRecord, Relation)]:
+        if self._providers is None:
+            self._providers = {}
+            for record in self._records:
+                for relation in record.get_provides():
+                    self._providers.setdefault(relation.name, []).append(
+                        (record, relation)
+                    )
+
+        return self._providers.get(name, [])
+
+    def get_group(self, name: str) -> [PackageRecord]:
+        if self._groups is None:
+            self._groups = {}
+            for record in self._records:
+                for group in record.groups:
+                    members = self._groups.setdefault(group, {})
+                    # the first repository listing a package wins
+                    members.setdefault(record.name, record)
+
+        return list(self._groups.get(name, {}).values())
+
+
+class Resolver:
+    """Compute a pacman sync transaction in-process
+
+    Dependencies are satisfied by name first and by virtual packages (provides)
+    afterwards, the first candidate in repositories order is picked as pacman does
+    with `--noconfirm`. Conflicts are not checked. Dependencies satisfied by an
+    excluded package are considered installed, as `--assume-installed` does.
+    """
+
+    def __init__(self, database: SyncDatabase):
+        self.database = database
+
+    def resolve(self, targets: [str], excluded: [str] = None) -> [PackageRecord]:
+        """List the packages required to install <targets> in the order they were selected"""
+        excluded = set(excluded or [])
+        selected = {}
+        queue = []
+        for target in targets:
+            for record in self._find_target_records(target):
+                if record.name not in selected:
+                    selected[record.name] = record
+                    queue.append(record)
+
+        while queue:
+            record = queue.pop(0)
+            for relation in record.get_dependencies():
+                if relation.name in excluded or self._is_satisfied(relation, selected):
+                    continue
+
+                dependency = self._find_candidate(record, relation)
+                if dependency.name in excluded or dependency.name in selected:
+                    continue
+
+                selected[dependency.name] = dependency
+                queue.append(dependency)
+
+        return list(selected.values())
+
+    def _find_target_records(self, target: str) -> [PackageRecord]:
+        repository, _, name = target.rpartition("/")
+        record = self.database.get(name, repository or None)
+        if record:
+            return [record]
+
+        group = self.database.get_group(name)
+        if group and not repository:
+            return group
+
+        providers = self._get_providers(Relation(name))
+        if providers and not repository:
+            return providers[:1]
+
+        raise SyncDbError("Target not found: %s" % target)
+
+    def _is_satisfied(self, relation: Relation, selected) -> bool:
+        record = selected.get(relation.name)
+        if record and relation.is_satisfied_by(record.version):
+            return True
+
+        for record, provided in self.database.get_providers(relation.name):
+            if selected.get(record.name) is record and self._provides(
+                relation, provided
+            ):
+                return True
+
+        return False
+
+    def _find_candidate(self, parent: PackageRecord, relation: Relation):
+        for record in self.database.get_all(relation.name):
+            if relation.is_satisfied_by(record.version):
+                return record
+
+        providers = self._get_providers(relation)
+        if providers:
+            return providers[0]
+
+        raise SyncDbError(
+            "Unable to satisfy dependency '%s' required by %s" % (relation, parent.name)
+        )
+
+    def _get_providers(self, relation: Relation) -> [PackageRecord]:
+        return [
+            record
+            for record, provided in self.database.get_providers(relation.name)
+            if self._provides(relation, provided)
+        ]
+
+    @staticmethod
+    def _provides(relation: Relation, provided: Relation) -> bool:
+        # unversioned provides never satisfy versioned dependencies
+        if not relation.op:
+            return True
+        return provided.op == "=" and relation.is_satisfied_by(provided.version)
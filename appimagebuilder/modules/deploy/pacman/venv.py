@@ -9,19 +9,31 @@
 #
 #   The above copyright notice and this permission notice shall be included in
 #   all copies or substantial portions of the Software.
+import base64
 import glob
+import hashlib
+import json
 import logging
 import os
-import re
 import shlex
 import subprocess
 import sys
+import time
+import urllib.request
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
-from appimagebuilder.utils import shell
+from appimagebuilder.utils import launcher, shell
+from appimagebuilder.utils.archive_pool import (
+    ArchiveDownload,
+    ArchivePool,
+    ArchivePoolError,
+)
+from .package_archive import PackageArchive, PackageArchiveError
+from .package_signature import PackageSignatureError, PackageSignatureVerifier
+from .sync_db import Resolver, SyncDatabase, SyncDbError
 
-DEPENDS_ON = ["bsdtar", "pacman", "pacman-key", "fakeroot", "gpg-agent"]
+DEPENDS_ON = ["pacman", "pacman-key", "fakeroot", "gpg", "gpg-agent"]
 
 
 class PacmanVenvError(RuntimeError):
@@ -30,6 +42,8 @@ class PacmanVenvError(RuntimeError):
 
 class Venv:
     default_options = []
+    # written after every successful `pacman -Sy`
+    update_stamp_name = "update.stamp"
 
     def __init__(
         self,
@@ -37,17 +51,26 @@ class Venv:
         repositories: {str: [str]} = None,
         architecture: str = "auto",
         user_options: {} = None,
+        archive_pool: ArchivePool = None,
     ):
         self._root = Path(root)
         self._config_path = self._root / "pacman.conf"
         self._db_path = self._root / "db"
         self._cache_dir = self._root / "pkg"
         self._gpg_dir = self._root / "gnupg"
+        self._keyrings_path = Path("/usr/share/pacman/keyrings/")
+        self._keyring_stamp_path = self._gpg_dir / "keyring.stamp"
+        self._update_stamp_path = self._root / self.update_stamp_name
         self._repositories = repositories
         self._keyrings = []
         self._architecture = architecture
         self._options = user_options if user_options else {}
         self._deps = dict()
+        self._servers = None
+        # packages are shared between projects when a host wide pool is set
+        self._archive_pool = archive_pool or ArchivePool(self._root / "archives")
+        self._sync_database = None
+        self._sync_db_cache_path = self._root / "sync-db.cache"
 
         self._db_path.mkdir(parents=True, exist_ok=True)
         self._cache_dir.mkdir(parents=True, exist_ok=True)
@@ -65,87 +88,222 @@ class Venv:
             self._gpg_agent_proc.terminate()
 
     def update(self):
+        # a failed update must not leave a valid stamp behind
+        if self._update_stamp_path.exists():
+            self._update_stamp_path.unlink()
+
         self._run_command("{fakeroot} {pacman} --config {config} -Sy --quiet")
+        self._sync_database = None
 
-    def retrieve(self, packages: [str], excluded_packages: [str] = None):
-        initial_install_list = self._run_pacman_list_packages_and_versions(
-            " ".join(packages)
-        )
+        self._write_stamp(self._update_stamp_path, self._get_config_fingerprint())
 
-        exclude_str = ""
-        packages_str = ""
-        for package in initial_install_list:
-            pkg_name, pkg_version = package.split("=", 1)
-            if pkg_name in excluded_packages:
-                exclude_str = exclude_str + "--assume-installed %s " % package
-
-            if pkg_name in packages:
-                packages_str = packages_str + "%s " % package
-
-        self._run_pacman_download_packages(packages_str, exclude_str)
-        files = self._run_pacman_list_package_files(exclude_str, packages_str)
-
-        return files
-
-    def extract(self, file, target):
-        os.makedirs(target, exist_ok=True)
-        command = (
-            "{bsdtar} "
-            "--exclude .BUILDINFO "
-            "--exclude .MTREE "
-            "--exclude .PKGINFO "
-            "--exclude .INSTALL "
-            "-xf {file} -C {target} "
-        )
-        self._run_command(command, file=file, target=target)
+    def is_update_required(self, max_age: float) -> bool:
+        """Check if the sync databases are missing, outdated or belong to other repositories
 
-    def _run_pacman_download_packages(self, packages_str, exclude_str):
-        self._run_command(
-            "{fakeroot} {pacman} --config {config} -Sy --downloadonly "
-            "--noconfirm {exclude} {packages}",
-            exclude=exclude_str,
-            packages=packages_str,
-        )
+        :param max_age: seconds after which the databases are considered outdated
+        """
+        stamp = self._read_stamp(self._update_stamp_path)
+        if not stamp:
+            return True
+
+        if stamp.get("fingerprint") != self._get_config_fingerprint():
+            self._logger.info("Pacman repositories changed since the last update")
+            return True
+
+        if time.time() - stamp.get("time", 0) > max_age:
+            return True
+
+        for repository in self._get_servers():
+            if not (self._db_path / "sync" / ("%s.db" % repository)).exists():
+                return True
+
+        return False
+
+    def _get_config_fingerprint(self):
+        """Hash of everything that influences the sync databases contents"""
+        digest = hashlib.sha256()
+        with open(self._config_path, "rb") as f:
+            digest.update(f.read())
+
+        # servers may come from included files
+        digest.update(json.dumps(self._get_servers(), sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _get_keyring_fingerprint(self):
+        """Hash of the keyrings files imported by `pacman-key --populate`"""
+        digest = hashlib.sha256()
+        for keyring in sorted(self._keyrings):
+            digest.update(keyring.encode())
+            for suffix in [".gpg", "-trusted", "-revoked"]:
+                path = self._keyrings_path / (keyring + suffix)
+                if path.exists():
+                    with open(path, "rb") as f:
+                        digest.update(f.read())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _read_stamp(path: Path) -> {}:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_stamp(path: Path, fingerprint: str):
+        with open(path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "time": time.time()}, f)
 
-    def _run_pacman_list_packages_and_versions(self, packages_str):
-        command = (
-            "{pacman} --config {config} -S "
-            "--print-format '%n=%v' "
-            "--noconfirm {packages}"
-        )
-        output = self._run_command(
-            command, packages=packages_str, stdout=subprocess.PIPE
-        )  # noqa:
+    def retrieve(self, packages: [str], excluded_packages: [str] = None):
+        """Download the packages required to install <packages> into the cache dir
 
-        return output.stdout.read().decode("utf-8").splitlines()  # noqa:
+        The transaction is computed from the sync databases in a single pass, only
+        the missing package files are downloaded.
 
-    def _run_pacman_list_package_files(self, exclude_str, packages_str):
-        command = (
-            "{pacman} --config {config} -S "
-            "--print-format '%%l' "
-            "--noconfirm {exclude} {packages}"
-        )
-        self._logger.debug(command)
-        output = self._run_command(
-            command, packages=packages_str, exclude=exclude_str, stdout=subprocess.PIPE
-        )  # noqa:
-        files = re.findall("file://(.*)", output.stdout.read().decode("utf-8"))
-        return files
+        :return: paths of the package files
+        """
+        resolver = Resolver(self.read_sync_database())
+        try:
+            records = resolver.resolve(packages, excluded_packages)
+        except SyncDbError as err:
+            raise PacmanVenvError(str(err)) from err
+
+        self._download_packages(records)
+        return [str(self._cache_dir / record.file_name) for record in records]
+
+    def read_sync_database(self) -> SyncDatabase:
+        """Load the packages listed in the sync databases fetched by the last update"""
+        if not self._sync_database:
+            paths = []
+            for repository in self._get_servers():
+                path = self._db_path / "sync" / ("%s.db" % repository)
+                if path.exists():
+                    paths.append(path)
+                else:
+                    self._logger.warning("Missing sync database: %s" % path)
+
+            self._sync_database = SyncDatabase.load(paths, self._sync_db_cache_path)
+
+        return self._sync_database
+
+    def _download_packages(self, records):
+        """Fetch the missing package files into the cache dir through the archive pool
+
+        Every repository server is a mirror of the package, files are verified
+        against the sync database checksums and their signatures are checked
+        against the venv keyring before being placed in the cache dir.
+        """
+        verifier = self._get_signature_verifier()
+        downloads = []
+        for record in records:
+            if (self._cache_dir / record.file_name).exists():
+                continue
+
+            if not record.sha256:
+                raise PacmanVenvError("Missing SHA256SUM for %s" % record.file_name)
+
+            urls = [
+                self._get_package_url(server, record)
+                for server in self._get_servers().get(record.repository, [])
+            ]
+            if not urls:
+                raise PacmanVenvError(
+                    "No servers configured for the '%s' repository" % record.repository
+                )
+
+            downloads.append(
+                ArchiveDownload(
+                    urls[0],
+                    record.file_name,
+                    record.size,
+                    "SHA256:%s" % record.sha256,
+                    mirrors=urls[1:],
+                    verify=(
+                        self._create_signature_check(verifier, record, urls)
+                        if verifier
+                        else None
+                    ),
+                )
+            )
 
-    def read_package_data(self, file):
-        output = self._run_command(
-            "{pacman} -Qp {file}", file=file, stdout=subprocess.PIPE  # noqa:
-        )
+        if downloads:
+            try:
+                self._archive_pool.fetch(downloads, self._cache_dir)
+            except ArchivePoolError as err:
+                raise PacmanVenvError(str(err)) from err
+
+    def _get_signature_verifier(self):
+        sig_level = self._options.get("SigLevel", "").split()
+        if "Never" in sig_level or "PackageNever" in sig_level:
+            self._logger.warning("Package signatures verification disabled")
+            return None
+
+        return PackageSignatureVerifier(self._gpg_dir, self._deps["gpg"])
+
+    def _create_signature_check(self, verifier, record, urls):
+        def check(path):
+            signature = self._get_package_signature(record, urls)
+            try:
+                verifier.verify(path, signature)
+            except PackageSignatureError as err:
+                raise PacmanVenvError(str(err)) from err
+
+        return check
+
+    def _get_package_signature(self, record, urls) -> bytes:
+        """Signature from the sync database or the `.sig` file next to the package"""
+        if record.pgpsig:
+            try:
+                return base64.b64decode(record.pgpsig, validate=True)
+            except ValueError as err:
+                raise PacmanVenvError(
+                    "Malformed signature of %s: %s" % (record.file_name, err)
+                )
+
+        for url in urls:
+            try:
+                with urllib.request.urlopen(url + ".sig") as response:
+                    return response.read()
+            except OSError as err:
+                self._logger.warning("Unable to download %s.sig: %s" % (url, err))
+
+        raise PacmanVenvError("Missing signature for %s" % record.file_name)
+
+    def _get_package_url(self, server: str, record) -> str:
+        server = server.replace("$repo", record.repository)
+        server = server.replace("$arch", self._get_architecture())
+        return "%s/%s" % (server.rstrip("/"), record.file_name)
+
+    def _get_architecture(self):
+        if not self._architecture or self._architecture == "auto":
+            return os.uname().machine
+        return self._architecture
+
+    def _get_servers(self) -> {str: [str]}:
+        """Repositories servers in pacman.conf order"""
+        if self._servers is None:
+            if self._repositories:
+                self._servers = {
+                    repository: list(servers)
+                    for repository, servers in self._repositories.items()
+                }
+            else:
+                self._servers = read_config_servers("/etc/pacman.conf")
 
-        lines = output.stdout.read().decode("utf-8").splitlines()  # noqa:
-        if lines:
-            first_line = lines[0]
-            line_parts = first_line.split(" ")
+        return self._servers
 
-            # name, version
-            return line_parts[0], line_parts[1]
+    def extract(self, file, target) -> [str]:
+        """Extract the package contents into <target>
 
-        raise PacmanVenvError("Unable to read package info from: '%s'" % file)
+        :return: extracted files paths relative to <target>
+        """
+        return PackageArchive(file).extract(target)
+
+    def read_package_data(self, file):
+        try:
+            return PackageArchive(file).read_info()
+        except PackageArchiveError as err:
+            raise PacmanVenvError(str(err)) from err
 
     def _generate_config(self):
         with open(self._config_path, "w") as f:
@@ -175,10 +333,18 @@ class Venv:
     def _configure_keyring(self):
         if not self._keyrings:
             self._logger.info("Using system keyrings")
-            default_keyrigns_path = Path("/usr/share/pacman/keyrings/")
-            for x in default_keyrigns_path.glob("*.gpg"):
+            for x in self._keyrings_path.glob("*.gpg"):
                 self._keyrings.append(x.stem)
 
+        # the stamp lives in the gpg dir, it's gone if the keyring is removed
+        fingerprint = self._get_keyring_fingerprint()
+        if self._read_stamp(self._keyring_stamp_path).get("fingerprint") == fingerprint:
+            self._logger.info("Skipping keyring population. Keyrings didn't change")
+            return
+
+        if self._keyring_stamp_path.exists():
+            self._keyring_stamp_path.unlink()
+
         # Ensure the keyring is properly initialized
         self._run_command("{fakeroot} {pacman-key} --config {config} --init")
 
@@ -186,11 +352,12 @@ class Venv:
             "{fakeroot} {pacman-key} --config {config} --populate {keyrings}",
             keyrings=" ".join(self._keyrings),
         )
+        self._write_stamp(self._keyring_stamp_path, fingerprint)
 
     def _start_gpg_agent(self):
         # start gpg-agent if not running
         #   (pkill -0 doesn't kill the process just checks if it's running)
-        if subprocess.call(["pkill", "-0", "gpg-agent"]) != 0:
+        if launcher.run(["pkill", "-0", "gpg-agent"]).returncode != 0:
             self._gpg_agent_proc = self._run_command(
                 "{gpg-agent} --homedir" f" {self._gpg_dir}" " --server",
                 assert_success=False,
@@ -223,12 +390,16 @@ class Venv:
         self._logger.debug(command)
 
         # need to split the command into args
-        _proc = subprocess.Popen(
-            shlex.split(command), stdout=stdout, stdin=sys.stdin, stderr=sys.stderr
-        )
+        args = shlex.split(command)
+        # account the wrapped tool instead of fakeroot
+        tool_args = args[1:] if os.path.basename(args[0]) == "fakeroot" else args
+        with launcher.track(launcher.get_tool_name(tool_args), args):
+            _proc = subprocess.Popen(
+                args, stdout=stdout, stdin=sys.stdin, stderr=sys.stderr
+            )
 
-        if wait_for_completion:
-            _proc.wait(wait_for_completion_timeout)
+            if wait_for_completion:
+                _proc.wait(wait_for_completion_timeout)
 
         if assert_success:
             shell.assert_successful_result(_proc)
@@ -236,3 +407,40 @@ class Venv:
         # return the process instance for future use
         # if necessary
         return _proc
+
+
+def read_config_servers(path) -> {str: [str]}:
+    """Read the repositories servers from a pacman.conf file, includes are followed"""
+    servers = {}
+    _read_config_servers(path, servers, None)
+    return servers
+
+
+def _read_config_servers(path, servers, section):
+    try:
+        with open(path, "r") as f:
+            lines = f.read().splitlines()
+    except OSError as err:
+        logging.getLogger("pacman").warning("Unable to read %s: %s" % (path, err))
+        return section
+
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1]
+            if section != "options":
+                servers.setdefault(section, [])
+            continue
+
+        key, sep, value = line.partition("=")
+        if not sep or section in (None, "options"):
+            continue
+
+        key, value = key.strip(), value.strip()
+        if key == "Server":
+            servers[section].append(value)
+        elif key == "Include":
+            for include in sorted(glob.glob(value)):
+                _read_config_servers(include, servers, section)
+
+    return section
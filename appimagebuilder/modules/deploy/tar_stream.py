@@ -0,0 +1,208 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+from contextlib import contextmanager
+
+from appimagebuilder.utils import launcher
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+GZIP_MAGIC = b"\x1f\x8b"
+BZIP2_MAGIC = b"BZh"
+
+
+class TarStreamError(RuntimeError):
+    pass
+
+
+@contextmanager
+def open_file_tar(path):
+    """Read a tar file as a stream, the compression is detected from the file contents"""
+    with open(path, "rb") as f:
+        magic = f.read(len(XZ_MAGIC))
+        f.seek(0)
+
+        try:
+            if magic.startswith(ZSTD_MAGIC):
+                with _open_zstd_tar(f, path) as tar:
+                    yield tar
+            elif magic.startswith(XZ_MAGIC):
+                yield tarfile.open(fileobj=f, mode="r|xz")
+            elif magic.startswith(GZIP_MAGIC):
+                yield tarfile.open(fileobj=f, mode="r|gz")
+            elif magic.startswith(BZIP2_MAGIC):
+                yield tarfile.open(fileobj=f, mode="r|bz2")
+            else:
+                yield tarfile.open(fileobj=f, mode="r|")
+        except (tarfile.TarError, EOFError) as err:
+            raise TarStreamError("Unable to read %s: %s" % (path, err)) from err
+
+
+@contextmanager
+def _open_zstd_tar(f, path):
+    if zstandard:
+        decompressor = zstandard.ZstdDecompressor()
+        with decompressor.stream_reader(f) as stream:
+            yield tarfile.open(fileobj=stream, mode="r|")
+        return
+
+    # fallback to the zstd or bsdtar binaries when the zstandard module is missing
+    if shutil.which("zstd"):
+        command = [shutil.which("zstd"), "-dcq", str(path)]
+    elif shutil.which("bsdtar"):
+        command = [shutil.which("bsdtar"), "-cf", "-", "@%s" % path]
+    else:
+        raise TarStreamError(
+            "Unable to read %s: zstandard, zstd or bsdtar are required" % path
+        )
+
+    with open_command_tar(command, path) as tar:
+        yield tar
+
+
+@contextmanager
+def open_command_tar(command: [str], source):
+    """Read the tar stream written to stdout by <command>
+
+    The process is stopped if the stream isn't consumed completely.
+    """
+    with launcher.track(os.path.basename(command[0]), command):
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        stopped = False
+        try:
+            yield tarfile.open(fileobj=process.stdout, mode="r|")
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            if process.poll() is None and process.stdout.read(1):
+                # the reader is done before the end of the stream
+                process.kill()
+                stopped = True
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            return_code = process.wait()
+
+    if return_code != 0 and not stopped:
+        raise TarStreamError(
+            "Unable to read %s: %s" % (source, stderr.decode().strip())
+        )
+
+
+def extract_members(tar, target: str, source, excluded_names=()) -> [str]:
+    """Extract the members of a tar stream into <target>
+
+    Existing files and symlinks are replaced, symlinks are never written through
+    and members placed below a symlink are refused.
+
+    :return: paths of the extracted files relative to <target>
+    """
+    files = []
+    # dirs known to be real directories, their components are not checked again
+    checked_dirs = set()
+    for member in tar:
+        rel_path = normalize_member_name(member.name, source)
+        if not rel_path or rel_path in excluded_names:
+            continue
+
+        _check_parent_dirs(target, rel_path, source, checked_dirs)
+        path = os.path.join(target, rel_path)
+        if member.isdir():
+            _make_dir(path, member.mode)
+            checked_dirs.add(rel_path)
+            continue
+
+        if os.path.isdir(path) and not os.path.islink(path):
+            raise TarStreamError(
+                "Unable to replace directory %s with a file from %s" % (path, source)
+            )
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.lexists(path):
+            # never write through existing symlinks
+            os.unlink(path)
+
+        if member.isreg():
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW)
+            with open(fd, "wb") as f:
+                shutil.copyfileobj(tar.extractfile(member), f)
+                f.flush()
+                os.fchmod(f.fileno(), member.mode)
+                os.utime(f.fileno(), (member.mtime, member.mtime))
+        elif member.issym():
+            os.symlink(member.linkname, path)
+        elif member.islnk():
+            link_target = normalize_member_name(member.linkname, source)
+            _check_parent_dirs(target, link_target, source, checked_dirs)
+            os.link(os.path.join(target, link_target), path, follow_symlinks=False)
+        else:
+            # devices and fifos are not extracted
+            continue
+
+        files.append(rel_path)
+
+    return files
+
+
+def normalize_member_name(name, source):
+    parts = [part for part in name.split("/") if part and part != "."]
+    if ".." in parts:
+        raise TarStreamError(
+            "Refusing to extract '%s' from %s outside the target dir" % (name, source)
+        )
+
+    return "/".join(parts)
+
+
+def _check_parent_dirs(target, rel_path, source, checked_dirs):
+    """Refuse paths going through symlinks or files, missing dirs are fine"""
+    parts = rel_path.split("/")[:-1]
+    for idx in range(len(parts)):
+        rel_dir = "/".join(parts[: idx + 1])
+        if rel_dir in checked_dirs:
+            continue
+
+        path = os.path.join(target, rel_dir)
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            # created as real directories by os.makedirs
+            return
+
+        if not stat.S_ISDIR(mode):
+            kind = "symlink" if stat.S_ISLNK(mode) else "file"
+            raise TarStreamError(
+                "Refusing to extract '%s' from %s through the %s '%s'"
+                % (rel_path, source, kind, rel_dir)
+            )
+        checked_dirs.add(rel_dir)
+
+
+def _make_dir(path, mode):
+    # symlinks to directories are replaced, their targets are never modified
+    if os.path.lexists(path) and not stat.S_ISDIR(os.lstat(path).st_mode):
+        os.unlink(path)
+
+    os.makedirs(path, exist_ok=True)
+    os.chmod(path, mode)
@@ -9,7 +9,9 @@
 #
 #   The above copyright notice and this permission notice shall be included in
 #   all copies or substantial portions of the Software.
+import logging
 import os
+import shutil
 from pathlib import Path
 
 
@@ -26,3 +28,72 @@ def make_symlink_relative(path, relative_root):
 
             path.unlink()
             path.symlink_to(new_target)
+
+
+def merge_tree(
+    source: Path,
+    target: Path,
+    package,
+    owners: {Path: object},
+    logger=None,
+    root: Path = None,
+):
+    """Move the contents of <source> into <target> reporting overwritten files
+
+    <owners> maps the moved paths to the package that provided them, it's shared
+    between the calls that merge into the same <target>. Symlinks to directories
+    are only followed if they resolve inside <root>, which defaults to <target>.
+    """
+    logger = logger or logging.getLogger("Deploy")
+    root = Path(root or target).resolve()
+    for entry in os.scandir(source):
+        source_path = Path(entry.path)
+        target_path = target / entry.name
+
+        if entry.is_dir(follow_symlinks=False) and target_path.is_dir():
+            if not target_path.is_symlink() or _is_inside(target_path, root):
+                # merge directories, symlinks to directories are followed as dpkg-deb does
+                merge_tree(source_path, target_path, package, owners, logger, root)
+                continue
+
+            # following the link would place the files outside of the AppDir
+            logger.warning(
+                "%s from %s replaces a symlink pointing outside of the AppDir"
+                % (target_path, package)
+            )
+            target_path.unlink()
+
+        if target_path.is_dir() and not target_path.is_symlink():
+            logger.warning(
+                "%s from %s conflicts with an existing directory, skipping it"
+                % (target_path, package)
+            )
+            continue
+
+        if os.path.lexists(target_path):
+            previous_owner = _find_owner(target_path, owners)
+            logger.warning(
+                "%s from %s overwrites the one from %s"
+                % (target_path, package, previous_owner)
+            )
+            target_path.unlink()
+
+        shutil.move(str(source_path), str(target_path))
+        owners[target_path] = package
+
+
+def _is_inside(link: Path, root: Path):
+    if os.path.isabs(os.readlink(link)):
+        return False
+
+    resolved = link.resolve()
+    return resolved == root or root in resolved.parents
+
+
+def _find_owner(path: Path, owners):
+    # whole directories are moved at once, look for the closest moved parent
+    for candidate in [path, *path.parents]:
+        if candidate in owners:
+            return owners[candidate]
+
+    return "the AppDir"
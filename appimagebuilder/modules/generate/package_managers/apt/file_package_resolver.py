@@ -12,7 +12,7 @@
 import logging
 import subprocess
 
-from appimagebuilder.utils import shell
+from appimagebuilder.utils import launcher, shell
 
 CLI_REQUIRE = ["dpkg-query"]
 
@@ -31,10 +31,9 @@ class FilePackageResolver:
         return results
 
     def _run_dpkg_query_s(self, files):
-        command = "{dpkg-query} -S {files}"
-        command = command.format(**self._cli_tools, files=" ".join(files))
-        self.logger.info(command)
-        _proc = subprocess.run(command, stdout=subprocess.PIPE, shell=True)
+        command = [self._cli_tools["dpkg-query"], "-S", *[str(file) for file in files]]
+        self.logger.info(" ".join(command))
+        _proc = launcher.run(command, stdout=subprocess.PIPE)
         stdout_data = _proc.stdout.decode()
         return stdout_data
 
@@ -15,7 +15,7 @@ import pathlib
 import re
 import subprocess
 
-from appimagebuilder.utils import shell
+from appimagebuilder.utils import launcher, shell
 
 
 class FilePackageResolver:
@@ -36,15 +36,14 @@ class FilePackageResolver:
         # make sure that the files are str
         files = [str(file) for file in files]
 
-        command = "{pacman} -Fy {files}"
+        command = [self._cli_tools["pacman"], "-Fy", *files]
 
         # ensure C locale is used to avoid locales affecting the output format
         env = os.environ.copy()
         env["LC_ALL"] = "C"
 
-        command = command.format(**self._cli_tools, files=" ".join(files))
-        self.logger.info(command)
-        _proc = subprocess.run(command, stdout=subprocess.PIPE, shell=True, env=env)
+        self.logger.info(" ".join(command))
+        _proc = launcher.run(command, stdout=subprocess.PIPE, env=env)
         stdout_data = _proc.stdout.decode()
         return stdout_data
 
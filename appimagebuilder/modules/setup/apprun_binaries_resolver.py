@@ -10,6 +10,7 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 import logging
+import os
 from pathlib import Path
 from urllib import request
 
@@ -56,4 +57,7 @@ class AppRunBinariesResolver:
             asset,
         )
         logging.info("Downloading: %s" % url)
-        request.urlretrieve(url, path)
+        # never leave partial downloads behind, they would be taken as valid files
+        tmp_path = path.with_name(path.name + ".part")
+        request.urlretrieve(url, tmp_path)
+        os.replace(tmp_path, path)
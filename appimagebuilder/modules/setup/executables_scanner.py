@@ -11,6 +11,8 @@
 #  all copies or substantial portions of the Software.
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from appimagebuilder.modules.setup.executables import (
     Executable,
@@ -30,6 +32,16 @@ class ExecutablesScanner:
         self.appdir = appdir
         self.files_cache = files_cache
 
+        # interpreter name -> resolved path, None if missing
+        self._interpreters = {}
+        self._interpreters_lock = threading.Lock()
+
+    def scan_files(self, paths) -> [Executable]:
+        """Scan the files concurrently, the results keep the order of <paths>"""
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            results = executor.map(self.scan_file, paths)
+            return [executable for result in results for executable in result]
+
     def scan_file(self, path) -> [Executable]:
         results = []
         iterations = 0
@@ -73,16 +85,14 @@ class ExecutablesScanner:
             interpreter = shebang[0].strip(" ")
 
         interpreter_name = os.path.basename(interpreter)
-        path = self.files_cache.find_one(
-            interpreter_name, [self.files_cache.is_file, self.files_cache.is_executable]
-        )
-        if not path:
-            raise MissingInterpreterError(
-                "Required interpreter '%s' could not be found in the AppDir"
-                % interpreter_name
-            )
+        # scripts tend to share a few interpreters, look up each one only once
+        with self._interpreters_lock:
+            if interpreter_name not in self._interpreters:
+                self._interpreters[interpreter_name] = self._find_interpreter(
+                    interpreter_name
+                )
+            path = self._interpreters[interpreter_name]
 
-        path = os.path.relpath(path)
         if not path:
             raise MissingInterpreterError(
                 "Required interpreter '%s' could not be found in the AppDir"
@@ -90,6 +100,15 @@ class ExecutablesScanner:
             )
         return path
 
+    def _find_interpreter(self, interpreter_name):
+        path = self.files_cache.find_one(
+            interpreter_name, [self.files_cache.is_file, self.files_cache.is_executable]
+        )
+        if not path:
+            return None
+
+        return os.path.relpath(path)
+
     @staticmethod
     def read_shebang(path) -> [str]:
         with open(path, "rb") as f:
@@ -11,6 +11,7 @@
 #  all copies or substantial portions of the Software.
 
 import logging
+import os
 import random
 import shutil
 import string
@@ -132,13 +133,8 @@ class RuntimeGenerator:
         return embed_archs
 
     def _find_executables(self, scanner):
-        executables = []
         files = self.finder.find("*", [Finder.is_file, Finder.is_executable])
-        for file in files:
-            new_executables = scanner.scan_file(file)
-            executables.extend(new_executables)
-
-        return executables
+        return scanner.scan_files(files)
 
     def _configure_runtime_environment(self):
         bundle_id = "".join(
@@ -261,6 +257,8 @@ class RuntimeGenerator:
 
             runtime_env.append("APPDIR_LIBRARY_PATH", str(dir_path))
 
+        self.finder.invalidate()
+
     def _get_appdir_library_paths(self):
         paths = list(
             self.finder.find_dirs_containing(
@@ -326,5 +324,15 @@ class RuntimeGenerator:
                         % (exec_path, interp_path)
                     )
 
-                compat_path.symlink_to(link_target)
-                default_path.symlink_to(link_target)
+                # links are kept from previous runs on the same AppDir
+                self._make_symlink(compat_path, link_target)
+                self._make_symlink(default_path, link_target)
+
+    @staticmethod
+    def _make_symlink(path: Path, target: str):
+        if path.is_symlink():
+            if os.readlink(path) == target:
+                return
+            path.unlink()
+
+        path.symlink_to(target)
@@ -15,6 +15,7 @@ import re
 import subprocess
 import shutil
 
+from appimagebuilder.utils import launcher
 from appimagebuilder.utils.finder import Finder
 from .base_helper import BaseHelper
 from ..environment import Environment
@@ -44,7 +45,7 @@ class GdkPixbuf(BaseHelper):
             "system modules and the output will be *adapted* to the AppDir."
         )
 
-        proc = subprocess.run(bin_path, stdout=subprocess.PIPE)
+        proc = launcher.run([bin_path], stdout=subprocess.PIPE)
 
         query_output = proc.stdout.decode()
         # remove absolute paths from module names
@@ -10,8 +10,8 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 import shutil
-import subprocess
 
+from appimagebuilder.utils import launcher
 from appimagebuilder.utils.finder import Finder
 from .base_helper import BaseHelper
 from ..environment import Environment
@@ -40,5 +40,5 @@ class GLib(BaseHelper):
             if not bin_path:
                 raise RuntimeError("Missing 'glib-compile-schemas' executable")
 
-            subprocess.run([bin_path, path])
+            launcher.run([bin_path, path])
             env.set("GSETTINGS_SCHEMA_DIR", path)
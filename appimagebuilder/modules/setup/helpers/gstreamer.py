@@ -12,8 +12,8 @@
 import logging
 import os
 import shutil
-import subprocess
 
+from appimagebuilder.utils import launcher
 from appimagebuilder.utils.finder import Finder
 from .base_helper import BaseHelper
 from ..environment import Environment
@@ -60,7 +60,7 @@ class GStreamer(BaseHelper):
             gst_launch_env = self._prepare_gst_launch_env(env)
             # run gst "diagnostic" to force registry generation
             # https://gstreamer.freedesktop.org/documentation/tools/gst-launch.html?gi-language=c#diagnostic
-            proc = subprocess.run(
+            proc = launcher.run(
                 [gst_launch_bin, "fakesrc", "num-buffers=16", "!", "fakesink"],
                 env=gst_launch_env,
             )
@@ -19,7 +19,7 @@ from typing import Optional
 
 from packaging import version
 
-from appimagebuilder.utils.patchelf import PatchElf, PatchElfError
+from appimagebuilder.utils.patchelf import ElfPatch, PatchElf, PatchElfError
 from appimagebuilder.utils.finder import Finder
 from .base_helper import BaseHelper
 from ..environment import Environment
@@ -122,25 +122,36 @@ class LibC(BaseHelper):
                 Finder.is_dynamically_linked_executable,
             ],
         )
+        patches = []
         for bin_path in binaries:
             allowed = True
             for preserve_file in preserve_files:
-                if preserve_file.samefile(bin):
+                if preserve_file.samefile(bin_path):
                     allowed = False
                     break
             if allowed:
-                self._make_interpreter_path_relative(bin_path)
+                try:
+                    interpreter_path = self.patch_elf.get_interpreter(bin_path)
+                except PatchElfError:
+                    continue
+
+                patch = self._get_relative_interpreter_patch(interpreter_path)
+                if patch:
+                    patches.append((bin_path, patch))
+                elif interpreter_path:
+                    # patched on a previous run, i.e.: files kept by an incremental deploy
+                    self.interpreters.add(interpreter_path)
+
+        # the relative paths fit in place, patchelf is rarely required
+        self.patch_elf.log_stderr = False
+        self.patch_elf.log_stdout = False
+        errors = self.patch_elf.apply(patches)
+        for bin_path, patch in patches:
+            if str(bin_path) not in errors:
+                self.interpreters.add(patch.interpreter)
 
-    def _make_interpreter_path_relative(self, bin_path):
-        try:
-            patchelf_command = PatchElf()
-            patchelf_command.log_stderr = False
-            patchelf_command.log_stdout = False
-
-            interpreter_path = patchelf_command.get_interpreter(bin_path)
-            if interpreter_path.startswith("/"):
-                rel_path = interpreter_path.lstrip("/")
-                patchelf_command.set_interpreter(bin_path, rel_path)
-                self.interpreters.add(rel_path)
-        except PatchElfError:
-            pass
+    @staticmethod
+    def _get_relative_interpreter_patch(interpreter_path) -> Optional[ElfPatch]:
+        if interpreter_path.startswith("/"):
+            return ElfPatch(interpreter=interpreter_path.lstrip("/"))
+        return None
@@ -9,13 +9,22 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import atexit
 import os
 import pathlib
 
+from appimagebuilder.build_state import BuildState
+from appimagebuilder.utils import elf, profiler
+from appimagebuilder.utils.elf_cache import ElfCache
 from appimagebuilder.utils.finder import Finder
+from appimagebuilder.utils.profiler import Profiler
 from appimagebuilder.context import AppInfo, Context, BundleInfo
 from appimagebuilder.commands.apt_deploy import AptDeployCommand
 from appimagebuilder.commands.create_appimage import CreateAppImageCommand
+from appimagebuilder.commands.fetch_binaries import (
+    FetchAppImageRuntimeCommand,
+    FetchAppRunCommand,
+)
 from appimagebuilder.commands.file_deploy import FileDeployCommand
 from appimagebuilder.commands.pacman_deploy import PacmanDeployCommand
 from appimagebuilder.commands.run_shell_script import RunShellScriptCommand
@@ -34,6 +43,10 @@ class Orchestrator:
 
     def __init__(self):
         self._cache_dir_name = "appimage-builder-cache"
+        # set on incremental builds
+        self.build_state = None
+        # records the time and resources spent by every command
+        self.profiler = None
 
     def process(self, recipe: Roamer, args):
         if recipe.version() == 1:
@@ -43,11 +56,24 @@ class Orchestrator:
 
     def _prepare_commands_for_recipe_v1(self, args, recipe):
         context = self._extract_v1_recipe_context(args, recipe)
+        if not args.no_elf_cache:
+            self._setup_elf_cache(context)
+        if args.incremental:
+            self.build_state = BuildState(context.app_dir, context.cache_dir)
+        self.profiler = Profiler(context.cache_dir, args.profile)
+        profiler.set_profiler(self.profiler)
+
         commands = []
         if not args.skip_script:
             command = RunShellScriptCommand(context, "main script", recipe.script)
             commands.append(command)
 
+        # binaries downloads don't depend on the AppDir, they run along the deploy
+        if not args.skip_build:
+            commands.append(FetchAppRunCommand(context, recipe))
+        if not args.skip_appimage:
+            commands.append(FetchAppImageRuntimeCommand(context, recipe))
+
         if not args.skip_build:
             commands.extend(self._create_app_dir_commands(context, recipe))
 
@@ -61,6 +87,13 @@ class Orchestrator:
 
         return commands
 
+    @staticmethod
+    def _setup_elf_cache(context):
+        cache = ElfCache(context.cache_dir / "elf-cache.json")
+        elf.set_cache(cache)
+        # persist whatever was learned even if the build fails
+        atexit.register(cache.save)
+
     def _create_app_dir_commands(self, context, recipe):
         commands = []
 
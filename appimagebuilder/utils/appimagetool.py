@@ -20,6 +20,8 @@ from .command import Command
 class AppImageToolCommand(Command):
     def __init__(self, app_dir, target_file):
         super().__init__("appimagetool")
+        # the output is logged, keep only the last lines for the error reports
+        self.max_captured_lines = 1000
 
         self.app_dir = pathlib.Path(app_dir).absolute()
         self.runtime_file = None
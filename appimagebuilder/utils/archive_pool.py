@@ -0,0 +1,325 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import logging
+import os
+import pathlib
+import shutil
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# hash names used by the package indexes
+HASH_ALGORITHMS = {
+    "md5sum": "md5",
+    "md5": "md5",
+    "sha1": "sha1",
+    "sha256": "sha256",
+    "sha512": "sha512",
+}
+
+
+class ArchivePoolError(RuntimeError):
+    pass
+
+
+class ArchiveDownload:
+    """Package archive to be fetched from <url> and verified against <checksum> (i.e.: `SHA256:<hex>`)
+
+    <mirrors> are alternative urls of the same archive, tried in order when <url> fails.
+    <verify> is called with the pooled file path before it's handed out, it must raise
+    if the archive can't be trusted (i.e.: the signature doesn't match).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        file_name: str,
+        size: int,
+        checksum: str,
+        mirrors=None,
+        verify=None,
+    ):
+        self.url = url
+        self.file_name = file_name
+        self.size = size
+        self.checksum = checksum
+        self.mirrors = list(mirrors or [])
+        self.verify = verify
+
+    def get_urls(self) -> [str]:
+        return [self.url] + self.mirrors
+
+    def __str__(self):
+        return self.file_name
+
+
+class ArchivePool:
+    """
+    Host wide store of package archives shared by the projects venvs
+
+    Archives are addressed by their checksum, projects get hard links to the
+    pooled files (or copies when the pool lives in another file system). Missing
+    archives are downloaded concurrently using at most <max_connections>, and at
+    most <max_host_connections> against the same server. Failed downloads are
+    retried on the archive mirrors, servers that failed are tried last afterwards.
+    Pooled archives are checked against their size and checksum before being
+    handed out, damaged ones are downloaded again. The file status of verified
+    archives is recorded next to them, they are only hashed again if it changes.
+    """
+
+    default_max_connections = 4
+    default_max_host_connections = 2
+
+    def __init__(
+        self,
+        root: pathlib.Path = None,
+        max_connections: int = None,
+        max_host_connections: int = None,
+    ):
+        self.root = pathlib.Path(root or self.get_default_root()).absolute()
+        self.max_connections = max_connections or self.get_default_max_connections()
+        self.max_host_connections = (
+            max_host_connections or self.default_max_host_connections
+        )
+        self.logger = logging.getLogger("ArchivePool")
+
+        self._lock = threading.Lock()
+        self._host_semaphores = {}
+        self._failed_hosts = set()
+
+    @staticmethod
+    def get_default_root() -> pathlib.Path:
+        root = os.getenv("ABUILDER_ARCHIVE_POOL")
+        if root:
+            return pathlib.Path(root)
+
+        cache_home = os.getenv("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+        return pathlib.Path(cache_home) / "appimage-builder" / "archives"
+
+    @staticmethod
+    def get_default_max_connections() -> int:
+        value = os.getenv("ABUILDER_DOWNLOAD_CONNECTIONS")
+        try:
+            return max(int(value), 1) if value else ArchivePool.default_max_connections
+        except ValueError:
+            logging.getLogger("ArchivePool").warning(
+                "Invalid ABUILDER_DOWNLOAD_CONNECTIONS value: %s" % value
+            )
+            return ArchivePool.default_max_connections
+
+    def get_path(self, checksum: str) -> pathlib.Path:
+        algorithm, digest = self._split_checksum(checksum)
+        return self.root / algorithm / digest[:2] / digest
+
+    def contains(self, checksum: str) -> bool:
+        return self.get_path(checksum).exists()
+
+    def fetch(self, downloads: [ArchiveDownload], target_dir: pathlib.Path):
+        """Place the archives into <target_dir> downloading to the pool the missing ones"""
+        target_dir = pathlib.Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        unique = {}
+        for download in downloads:
+            # the same archive may be requested more than once
+            unique.setdefault(download.checksum, download)
+
+        missing = [d for d in unique.values() if not self.contains(d.checksum)]
+        if missing:
+            self.logger.info(
+                "Downloading %s archives using %s connections"
+                % (len(missing), self.max_connections)
+            )
+
+        # pooled archives are checked again before being handed out
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            # propagate download and verification errors
+            list(executor.map(self._fetch_archive, unique.values()))
+
+        for download in downloads:
+            self.link(download.checksum, target_dir / download.file_name)
+
+    def link(self, checksum: str, target: pathlib.Path):
+        source = self.get_path(checksum)
+        if os.path.lexists(target):
+            if os.path.samefile(source, target):
+                return
+            os.unlink(target)
+
+        try:
+            os.link(source, target)
+        except OSError:
+            # pool and target are in different file systems
+            shutil.copy2(source, target)
+
+    def _fetch_archive(self, download: ArchiveDownload):
+        if not self._is_pooled(download):
+            self._download(download)
+
+        if download.verify:
+            path = self.get_path(download.checksum)
+            try:
+                download.verify(path)
+            except Exception:
+                # don't keep untrusted archives around
+                self._discard(path)
+                raise
+
+    def _is_pooled(self, download: ArchiveDownload) -> bool:
+        """Check that the pooled archive exists and is intact"""
+        path = self.get_path(download.checksum)
+        try:
+            with open(path, "rb") as f:
+                # the opened file is checked, it may be replaced by other processes
+                file_stat = os.fstat(f.fileno())
+                if self._read_stat_key(path) == self._get_stat_key(file_stat):
+                    return True
+
+                if download.size and file_stat.st_size != download.size:
+                    raise ArchivePoolError(
+                        "Size mismatch, expected %s but got %s"
+                        % (download.size, file_stat.st_size)
+                    )
+
+                algorithm, digest = self._split_checksum(download.checksum)
+                file_hash = hashlib.new(algorithm)
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    file_hash.update(chunk)
+                if file_hash.hexdigest() != digest:
+                    raise ArchivePoolError(
+                        "Checksum mismatch, got %s" % file_hash.hexdigest()
+                    )
+
+            self._write_stat_key(path, file_stat)
+            return True
+        except FileNotFoundError:
+            return False
+        except (ArchivePoolError, OSError) as err:
+            self.logger.warning("Discarding pooled archive %s: %s" % (path, err))
+            self._discard(path)
+            return False
+
+    @staticmethod
+    def _get_stat_key(file_stat: os.stat_result) -> str:
+        return "%s:%s:%s" % (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+
+    @staticmethod
+    def _get_stat_key_path(path: pathlib.Path) -> pathlib.Path:
+        return path.with_name(path.name + ".verified")
+
+    def _read_stat_key(self, path: pathlib.Path):
+        try:
+            return self._get_stat_key_path(path).read_text()
+        except OSError:
+            return None
+
+    def _write_stat_key(self, path: pathlib.Path, file_stat: os.stat_result):
+        key_path = self._get_stat_key_path(path)
+        tmp_path = key_path.with_name(
+            "%s.part-%d-%d" % (key_path.name, os.getpid(), threading.get_ident())
+        )
+        try:
+            tmp_path.write_text(self._get_stat_key(file_stat))
+            os.replace(tmp_path, key_path)
+        except OSError as err:
+            # the archive is hashed again next time
+            self.logger.debug("Unable to record %s status: %s" % (path, err))
+            self._unlink(tmp_path)
+
+    def _discard(self, path: pathlib.Path):
+        # other processes may be discarding the same archive
+        self._unlink(self._get_stat_key_path(path))
+        self._unlink(path)
+
+    @staticmethod
+    def _unlink(path: pathlib.Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _download(self, download: ArchiveDownload):
+        errors = []
+        for url in self._sort_urls(download.get_urls()):
+            host = urllib.parse.urlsplit(url).netloc
+            try:
+                with self._get_host_semaphore(host):
+                    self._download_url(url, download.checksum)
+                return
+            except ArchivePoolError as err:
+                self.logger.warning(str(err))
+                errors.append(str(err))
+                with self._lock:
+                    self._failed_hosts.add(host)
+
+        raise ArchivePoolError(
+            "Unable to download %s: %s" % (download.file_name, "; ".join(errors))
+        )
+
+    def _sort_urls(self, urls: [str]) -> [str]:
+        with self._lock:
+            failed_hosts = set(self._failed_hosts)
+
+        # stable sort, the mirrors order is kept otherwise
+        return sorted(
+            urls, key=lambda url: urllib.parse.urlsplit(url).netloc in failed_hosts
+        )
+
+    def _get_host_semaphore(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(
+                    self.max_host_connections
+                )
+            return self._host_semaphores[host]
+
+    def _download_url(self, url: str, checksum: str):
+        algorithm, digest = self._split_checksum(checksum)
+        path = self.get_path(checksum)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_name(
+            "%s.part-%d-%d" % (digest, os.getpid(), threading.get_ident())
+        )
+        self.logger.info("Download %s" % url)
+        try:
+            file_hash = hashlib.new(algorithm)
+            with urllib.request.urlopen(url) as response, open(tmp_path, "wb") as f:
+                for chunk in iter(lambda: response.read(1024 * 1024), b""):
+                    file_hash.update(chunk)
+                    f.write(chunk)
+
+            if file_hash.hexdigest() != digest:
+                raise ArchivePoolError(
+                    "Checksum mismatch on %s, expected %s but got %s"
+                    % (url, digest, file_hash.hexdigest())
+                )
+
+            # the contents were verified while being downloaded
+            file_stat = os.stat(tmp_path)
+            os.replace(tmp_path, path)
+            self._write_stat_key(path, file_stat)
+        except OSError as err:
+            raise ArchivePoolError("Unable to download %s: %s" % (url, err))
+        finally:
+            self._unlink(tmp_path)
+
+    @staticmethod
+    def _split_checksum(checksum: str):
+        algorithm, _, digest = checksum.partition(":")
+        algorithm = HASH_ALGORITHMS.get(algorithm.lower())
+        if not algorithm or not digest:
+            raise ArchivePoolError("Unsupported checksum: %s" % checksum)
+
+        return algorithm, digest.lower()
@@ -9,16 +9,27 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import codecs
+import collections
 import logging
 import os
+import select
+import selectors
 from shutil import which
 import subprocess
 
+from appimagebuilder.utils import launcher
+
 
 class Command:
     class CommandMissingError(RuntimeError):
         pass
 
+    # bytes read from the output pipes at once
+    read_size = 64 * 1024
+    # longer unterminated lines are split to bound the memory use
+    max_line_length = 1024 * 1024
+
     def __init__(self, runnable, logger=None):
         self.runnable = which(runnable)
         self.assert_runnable_exists(runnable)
@@ -32,6 +43,9 @@ class Command:
         if not self.logger:
             self.logger = logging.getLogger(runnable)
 
+        # only the last lines of the output are kept when set
+        self.max_captured_lines = None
+
         self.return_code = None
         self.stdout = []
         self.stderr = []
@@ -54,55 +68,120 @@ class Command:
         else:
             self.logger.debug(" ".join(command))
 
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=self.cwd,
-            env=self.env,
-        )
+        with launcher.track(os.path.basename(command[0]), command):
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.cwd,
+                env=self.env,
+            )
 
-        self._poll_process(process)
+            self._poll_process(process)
 
     def _run_with_input(self, command, input):
+        self.stdout = []
+        self.stderr = []
+
         self.logger.info(" ".join(command))
-        process = subprocess.Popen(
-            command,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=self.cwd,
-        )
-        process.communicate(input)
-
-        self._poll_process(process)
-
-    def _poll_process(self, process):
-        while process.poll() is None:
-            self._process_stdout_lines(process)
-            self._process_stderr_lines(process)
-
-        process.stdout.close()
-        process.stderr.close()
-
-        self.return_code = process.poll()
-
-    def _process_stderr_lines(self, process):
-        stderr_line = process.stderr.readline()
-        while stderr_line:
-            stderr_line = stderr_line.decode("utf-8").strip()
-            self.stderr.append(stderr_line)
-            if self.log_stderr:
-                self.logger.warning(stderr_line)
-
-            stderr_line = process.stderr.readline()
-
-    def _process_stdout_lines(self, process):
-        stdout_line = process.stdout.readline()
-        while stdout_line:
-            stdout_line = stdout_line.decode("utf-8").strip()
-            self.stdout.append(stdout_line)
-            if self.log_stdout:
-                self.logger.info(stdout_line)
-
-            stdout_line = process.stdout.readline()
+        with launcher.track(os.path.basename(command[0]), command):
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.cwd,
+            )
+
+            self._poll_process(process, input)
+
+    def _poll_process(self, process, input=None):
+        """Feed the input and read both outputs as they are produced, then wait the process"""
+        if self.max_captured_lines:
+            self.stdout = collections.deque(maxlen=self.max_captured_lines)
+            self.stderr = collections.deque(maxlen=self.max_captured_lines)
+
+        readers = {
+            process.stdout: (
+                _LineReader(self.max_line_length),
+                self._process_stdout_line,
+            ),
+            process.stderr: (
+                _LineReader(self.max_line_length),
+                self._process_stderr_line,
+            ),
+        }
+        with selectors.DefaultSelector() as selector:
+            for stream in readers:
+                selector.register(stream, selectors.EVENT_READ)
+
+            pending_input = memoryview(input or b"")
+            if process.stdin:
+                if pending_input:
+                    selector.register(process.stdin, selectors.EVENT_WRITE)
+                else:
+                    process.stdin.close()
+
+            while selector.get_map():
+                for key, _ in selector.select():
+                    if key.fileobj is process.stdin:
+                        pending_input = self._write_input(key, pending_input)
+                        if not pending_input:
+                            selector.unregister(key.fileobj)
+                            key.fileobj.close()
+                        continue
+
+                    reader, process_line = readers[key.fileobj]
+                    data = os.read(key.fd, self.read_size)
+                    for line in reader.feed(data) if data else reader.flush():
+                        process_line(line.strip())
+
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+
+        self.return_code = process.wait()
+        self.stdout = list(self.stdout)
+        self.stderr = list(self.stderr)
+
+    @staticmethod
+    def _write_input(key, pending_input):
+        # writes of up to PIPE_BUF bytes don't block once the pipe is ready
+        try:
+            written = os.write(key.fd, pending_input[: select.PIPE_BUF])
+        except BrokenPipeError:
+            # the process doesn't want more input
+            return pending_input[:0]
+        return pending_input[written:]
+
+    def _process_stderr_line(self, line):
+        self.stderr.append(line)
+        if self.log_stderr:
+            self.logger.warning(line)
+
+    def _process_stdout_line(self, line):
+        self.stdout.append(line)
+        if self.log_stdout:
+            self.logger.info(line)
+
+
+class _LineReader:
+    """Incrementally decode the data read from a pipe into lines"""
+
+    def __init__(self, max_line_length):
+        self.max_line_length = max_line_length
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+
+    def feed(self, data: bytes) -> [str]:
+        lines = (self._pending + self._decoder.decode(data)).split("\n")
+        self._pending = lines.pop()
+        if len(self._pending) > self.max_line_length:
+            lines.append(self._pending)
+            self._pending = ""
+        return lines
+
+    def flush(self) -> [str]:
+        text = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        return [text] if text else []
@@ -12,6 +12,8 @@
 
 
 import subprocess
+
+from . import launcher
 from .command import Command
 
 
@@ -23,7 +25,7 @@ class DpkgArchitecture(Command):
         return self._query("DEB_HOST_ARCH")
 
     def _query(self, var_name):
-        result = subprocess.run(
+        result = launcher.run(
             ["dpkg-architecture", "-q", var_name],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -9,9 +9,17 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
-import subprocess
+from appimagebuilder.utils.elf_cache import ElfCache
+from appimagebuilder.utils.elf_reader import ElfInfo, ElfReaderError, read_elf_info
 
-from appimagebuilder.utils import shell
+# persistent ELF facts store, see set_cache
+_cache = None
+
+
+def set_cache(cache: ElfCache = None):
+    """Make read_info use <cache>, None disables caching"""
+    global _cache
+    _cache = cache
 
 
 def has_magic_bytes(path):
@@ -23,49 +31,43 @@ def has_magic_bytes(path):
     return False
 
 
+def read_info(path) -> ElfInfo:
+    """
+    Read the ELF facts required by appimage-builder in a single pass
+
+    Raises ElfReaderError if the file is not a valid ELF.
+    """
+    if _cache:
+        return _cache.read_info(path)
+
+    return read_elf_info(path)
+
+
 def has_soname(path):
     """
     Determine if an elf is a library
 
     Elf must have a SONAME tag in the dynamic section
     """
-    command_args = shell.resolve_commands_paths(["readelf"])
-    command_args["path"] = path
-    _proc = subprocess.run(
-        "{readelf} -d {path}".format(**command_args),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        shell=True,
-    )
-
-    has_soname_tag = False
-    if _proc.returncode == 0:
-        output = _proc.stdout.decode("utf-8")
-        has_soname_tag = "SONAME" in output
-    return has_soname_tag
+    try:
+        return read_info(path).soname is not None
+    except (ElfReaderError, OSError):
+        return False
 
 
 def has_start_symbol(path):
     """
     Determine if an elf is executable
 
-    The `_start` symbol must be present in every runnable elf file.
+    The `_start` symbol must be present in every runnable elf file. Stripped
+    binaries only keep the dynamic symbols, therefore any symbol containing
+    `_start` (i.e.: `__libc_start_main`) is accepted.
     http://www.dbp-consulting.com/tutorials/debugging/linuxProgramStartup.html
     """
-    command_args = shell.resolve_commands_paths(["readelf"])
-    command_args["path"] = path
-    _proc = subprocess.run(
-        "{readelf} -s {path}".format(**command_args),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        shell=True,
-    )
-
-    has_main_method = False
-    if _proc.returncode == 0:
-        output = _proc.stdout.decode("utf-8")
-        has_main_method = "_start" in output
-    return has_main_method
+    try:
+        return read_info(path).has_start_symbol
+    except (ElfReaderError, OSError):
+        return False
 
 
 def get_arch(path):
@@ -75,19 +77,16 @@ def get_arch(path):
     https://en.wikipedia.org/wiki/Executable_and_Linkable_Format#File_header
     """
     known_architectures = {
-        b"\xB7": "aarch64",
-        b"\x28": "gnueabihf",
-        b"\x03": "i386",
-        b"\x3E": "x86_64",
+        0xB7: "aarch64",
+        0x28: "gnueabihf",
+        0x03: "i386",
+        0x3E: "x86_64",
     }
 
-    with open(path, "rb") as f:
-        f.seek(18)
-        e_machine = f.read(1)
-        if e_machine in known_architectures:
-            return known_architectures[e_machine]
-        else:
-            raise RuntimeError(
-                "Unknown instructions set architecture `%s` on: %s"
-                % (e_machine.hex(), path)
-            )
+    e_machine = read_info(path).machine
+    if e_machine in known_architectures:
+        return known_architectures[e_machine]
+    else:
+        raise RuntimeError(
+            "Unknown instructions set architecture `%x` on: %s" % (e_machine, path)
+        )
@@ -0,0 +1,214 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+
+from appimagebuilder.utils.elf_reader import ElfInfo, ElfReaderError, read_elf_info
+
+
+class ElfCache:
+    """
+    Persistent store of the facts read from ELF files
+
+    Records are addressed by the file contents hash. The file (device, inode,
+    size, mtime) tuple is used as a shortcut to the content hash so unchanged
+    files are neither hashed nor parsed again between runs. The least recently
+    used entries are dropped when the store grows over <max_size> bytes, which
+    defaults to the ABUILDER_ELF_CACHE_MAX_SIZE environment variable.
+    """
+
+    # bump when the ElfInfo fields or the stat key change to discard stale records
+    format_version = 2
+    default_max_size = 64 * 1024 * 1024
+
+    def __init__(self, path: pathlib.Path, max_size: int = None):
+        self.path = pathlib.Path(path)
+        self.max_size = (
+            max_size if max_size is not None else self.get_default_max_size()
+        )
+        self.logger = logging.getLogger("ElfCache")
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._modified = False
+        self._generation = 0
+        # "device:inode:size:mtime" -> [content hash, generation]
+        self._stat_index = {}
+        # content hash -> [ElfInfo fields or error message, generation]
+        self._records = {}
+
+    @staticmethod
+    def get_default_max_size() -> int:
+        value = os.getenv("ABUILDER_ELF_CACHE_MAX_SIZE")
+        try:
+            return max(int(value), 0) if value else ElfCache.default_max_size
+        except ValueError:
+            logging.getLogger("ElfCache").warning(
+                "Invalid ABUILDER_ELF_CACHE_MAX_SIZE value: %s" % value
+            )
+            return ElfCache.default_max_size
+
+    def read_info(self, path) -> ElfInfo:
+        stat_result = os.stat(path)
+        stat_key = "%d:%d:%d:%d" % (
+            stat_result.st_dev,
+            stat_result.st_ino,
+            stat_result.st_size,
+            stat_result.st_mtime_ns,
+        )
+
+        with self._lock:
+            self._load()
+            record = None
+            stat_entry = self._stat_index.get(stat_key)
+            if stat_entry:
+                record = self._use_record(stat_entry[0])
+                stat_entry[1] = self._generation
+
+        if record is None:
+            if not self._has_elf_magic_bytes(path):
+                # don't waste space on files that are not ELF
+                raise ElfReaderError("Not an ELF file: %s" % path)
+
+            # the file may have been inspected before under a different inode
+            digest = self._hash_file(path)
+            with self._lock:
+                record = self._use_record(digest)
+
+            if record is None:
+                record = self._read_record(path)
+                with self._lock:
+                    self._records[digest] = [record, self._generation]
+
+            with self._lock:
+                self._stat_index[stat_key] = [digest, self._generation]
+                self._modified = True
+
+        if "error" in record:
+            raise ElfReaderError(record["error"])
+        return ElfInfo(**record)
+
+    def _use_record(self, digest):
+        """Get the record data and mark it as used on this run"""
+        if digest not in self._records:
+            return None
+
+        record = self._records[digest]
+        if record[1] != self._generation:
+            record[1] = self._generation
+            self._modified = True
+        return record[0]
+
+    @staticmethod
+    def _read_record(path):
+        try:
+            info = read_elf_info(path)
+            return dict(vars(info))
+        except ElfReaderError as err:
+            return {"error": str(err)}
+
+    @staticmethod
+    def _has_elf_magic_bytes(path):
+        with open(path, "rb") as f:
+            return f.read(4) == b"\x7fELF"
+
+    @staticmethod
+    def _hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load(self):
+        if self._loaded:
+            return
+
+        self._loaded = True
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data["format_version"] != self.format_version:
+                raise ValueError("format version mismatch")
+
+            self._generation = data["generation"] + 1
+            self._stat_index = data["stat_index"]
+            self._records = data["records"]
+            self.logger.debug(
+                "Loaded %s records from %s" % (len(self._records), self.path)
+            )
+        except (ValueError, KeyError, OSError) as err:
+            self.logger.warning(
+                "Discarding invalid ELF cache %s: %s" % (self.path, err)
+            )
+            self._stat_index = {}
+            self._records = {}
+
+    def save(self):
+        with self._lock:
+            if not self._modified:
+                return
+
+            self._evict()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "format_version": self.format_version,
+                        "generation": self._generation,
+                        "stat_index": self._stat_index,
+                        "records": self._records,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self.path)
+            self._modified = False
+            self.logger.debug(
+                "Saved %s records to %s" % (len(self._records), self.path)
+            )
+
+    def _evict(self):
+        # rank the entries of both tables by last use and keep the most recent
+        # ones that fit in <max_size> once serialized
+        entries = [
+            (entry[1], self._get_serialized_size(key, entry), self._records, key)
+            for key, entry in self._records.items()
+        ]
+        # every AppDir rebuild produces new inodes, old ones go first
+        entries.extend(
+            (entry[1], self._get_serialized_size(key, entry), self._stat_index, key)
+            for key, entry in self._stat_index.items()
+        )
+        entries.sort(key=lambda item: item[0], reverse=True)
+
+        size = 0
+        for _, entry_size, table, key in entries:
+            size += entry_size
+            if size > self.max_size:
+                del table[key]
+
+        self._stat_index = {
+            k: v for k, v in self._stat_index.items() if v[0] in self._records
+        }
+
+    @staticmethod
+    def _get_serialized_size(key, entry):
+        # '"key": value, '
+        return len(key) + len(json.dumps(entry)) + 6
@@ -0,0 +1,284 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import mmap
+import struct
+
+# https://refspecs.linuxfoundation.org/elf/gabi4+/ch4.eheader.html
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+PT_LOAD = 1
+PT_DYNAMIC = 2
+PT_INTERP = 3
+
+SHT_SYMTAB = 2
+SHT_DYNSYM = 11
+
+DT_NULL = 0
+DT_NEEDED = 1
+DT_STRTAB = 5
+DT_STRSZ = 10
+DT_SONAME = 14
+DT_RPATH = 15
+DT_RUNPATH = 29
+
+
+class ElfReaderError(RuntimeError):
+    pass
+
+
+class ElfInfo:
+    """Facts about an ELF file required to bundle it"""
+
+    def __init__(
+        self,
+        elf_class: int = None,
+        machine: int = None,
+        interpreter: str = None,
+        soname: str = None,
+        needed: [str] = None,
+        rpath: str = None,
+        runpath: str = None,
+        has_start_symbol: bool = False,
+    ):
+        self.elf_class = elf_class
+        self.machine = machine
+        self.interpreter = interpreter
+        self.soname = soname
+        self.needed = needed if needed else []
+        self.rpath = rpath
+        self.runpath = runpath
+        self.has_start_symbol = has_start_symbol
+
+
+class ElfReader:
+    """
+    Reads the ELF header, program headers, dynamic section and symbol tables
+    of a file without spawning external tools.
+
+    The file is memory mapped, only the required regions are read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        self.elf_class = None
+        self.byte_order = None
+        self.machine = None
+        # (p_type, p_offset, p_vaddr, p_filesz)
+        self.segments = []
+        # (sh_name, sh_type, sh_offset, sh_size, sh_link, sh_entsize)
+        self.sections = []
+        # (d_tag, d_val, entry file offset)
+        self.dynamic = []
+
+        self._data = None
+
+    def read(self) -> ElfInfo:
+        with open(self.path, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ElfReaderError("Not an ELF file: %s" % self.path)
+
+            with data:
+                self._data = data
+                try:
+                    return self._parse()
+                except (struct.error, IndexError) as err:
+                    raise ElfReaderError("Malformed ELF file %s: %s" % (self.path, err))
+                finally:
+                    self._data = None
+
+    def _parse(self) -> ElfInfo:
+        self._read_header()
+        self._read_dynamic_section()
+
+        info = ElfInfo(elf_class=self.elf_class, machine=self.machine)
+        info.interpreter = self._read_interpreter()
+
+        for tag, value, _ in self.dynamic:
+            if tag == DT_NEEDED:
+                info.needed.append(self._read_dynamic_string(value))
+            elif tag == DT_SONAME:
+                info.soname = self._read_dynamic_string(value)
+            elif tag == DT_RPATH:
+                info.rpath = self._read_dynamic_string(value)
+            elif tag == DT_RUNPATH:
+                info.runpath = self._read_dynamic_string(value)
+
+        info.has_start_symbol = self._has_symbol_containing(b"_start")
+        return info
+
+    def _read_header(self):
+        data = self._data
+        if data[:4] != b"\x7fELF":
+            raise ElfReaderError("Not an ELF file: %s" % self.path)
+
+        self.elf_class = data[4]
+        if data[5] == ELFDATA2LSB:
+            self.byte_order = "<"
+        elif data[5] == ELFDATA2MSB:
+            self.byte_order = ">"
+        else:
+            raise ElfReaderError("Unknown ELF data encoding on: %s" % self.path)
+
+        if self.elf_class == ELFCLASS64:
+            header_format = "HHIQQQIHHHHHH"
+            segment_format = "IIQQQQQQ"
+            section_format = "IIQQQQIIQQ"
+        elif self.elf_class == ELFCLASS32:
+            header_format = "HHIIIIIHHHHHH"
+            segment_format = "IIIIIIII"
+            section_format = "IIIIIIIIII"
+        else:
+            raise ElfReaderError("Unknown ELF class on: %s" % self.path)
+
+        (
+            _,
+            self.machine,
+            _,
+            _,
+            e_phoff,
+            e_shoff,
+            _,
+            _,
+            e_phentsize,
+            e_phnum,
+            e_shentsize,
+            e_shnum,
+            _,
+        ) = struct.unpack_from(self.byte_order + header_format, data, 16)
+
+        segment_struct = struct.Struct(self.byte_order + segment_format)
+        for idx in range(e_phnum):
+            fields = segment_struct.unpack_from(data, e_phoff + idx * e_phentsize)
+            if self.elf_class == ELFCLASS64:
+                p_type, _, p_offset, p_vaddr, _, p_filesz, _, _ = fields
+            else:
+                p_type, p_offset, p_vaddr, _, p_filesz, _, _, _ = fields
+            self.segments.append((p_type, p_offset, p_vaddr, p_filesz))
+
+        section_struct = struct.Struct(self.byte_order + section_format)
+        if e_shoff + e_shnum * e_shentsize > len(data):
+            # section headers are optional, ignore them if stripped or truncated
+            e_shnum = 0
+        for idx in range(e_shnum):
+            fields = section_struct.unpack_from(data, e_shoff + idx * e_shentsize)
+            sh_name, sh_type, _, _, sh_offset, sh_size, sh_link, _, _, sh_entsize = (
+                fields
+            )
+            self.sections.append(
+                (sh_name, sh_type, sh_offset, sh_size, sh_link, sh_entsize)
+            )
+
+    def _read_interpreter(self):
+        for p_type, p_offset, _, p_filesz in self.segments:
+            if p_type == PT_INTERP:
+                return self._read_string(p_offset, p_offset + p_filesz)
+
+        return None
+
+    def _read_dynamic_section(self):
+        if self.elf_class == ELFCLASS64:
+            entry_struct = struct.Struct(self.byte_order + "qQ")
+        else:
+            entry_struct = struct.Struct(self.byte_order + "iI")
+
+        for p_type, p_offset, _, p_filesz in self.segments:
+            if p_type != PT_DYNAMIC:
+                continue
+
+            end = min(p_offset + p_filesz, len(self._data))
+            for offset in range(
+                p_offset, end - entry_struct.size + 1, entry_struct.size
+            ):
+                tag, value = entry_struct.unpack_from(self._data, offset)
+                if tag == DT_NULL:
+                    break
+                self.dynamic.append((tag, value, offset))
+            break
+
+    def get_dynamic_strings_offset(self):
+        """File offset of the dynamic section strings table"""
+        for tag, value, _ in self.dynamic:
+            if tag == DT_STRTAB:
+                return self.virtual_address_to_offset(value)
+
+        raise ElfReaderError("Missing DT_STRTAB on: %s" % self.path)
+
+    def virtual_address_to_offset(self, address):
+        for p_type, p_offset, p_vaddr, p_filesz in self.segments:
+            if p_type == PT_LOAD and p_vaddr <= address < p_vaddr + p_filesz:
+                return address - p_vaddr + p_offset
+
+        raise ElfReaderError(
+            "Address 0x%x is not mapped in the file: %s" % (address, self.path)
+        )
+
+    def _read_dynamic_string(self, string_offset):
+        offset = self.get_dynamic_strings_offset() + string_offset
+        return self._read_string(offset)
+
+    def _read_string(self, start, end=None):
+        data = self._data
+        if end is None or end > len(data):
+            end = len(data)
+
+        string_end = data.find(b"\0", start, end)
+        if string_end == -1:
+            string_end = end
+        return data[start:string_end].decode("utf-8", errors="replace")
+
+    def _has_symbol_containing(self, text: bytes):
+        """Look for symbols whose name contains <text> in .symtab and .dynsym"""
+        data = self._data
+        for _, sh_type, sh_offset, sh_size, sh_link, sh_entsize in self.sections:
+            if sh_type not in (SHT_SYMTAB, SHT_DYNSYM) or not sh_entsize:
+                continue
+            if sh_link >= len(self.sections):
+                continue
+
+            _, _, str_offset, str_size, _, _ = self.sections[sh_link]
+            str_end = min(str_offset + str_size, len(data))
+
+            # names allowed to start at those positions contain <text>
+            name_offsets = set()
+            match = data.find(text, str_offset, str_end)
+            while match != -1:
+                name_start = data.rfind(b"\0", str_offset, match) + 1
+                name_start = max(name_start, str_offset)
+                name_offsets.update(
+                    range(name_start - str_offset, match - str_offset + 1)
+                )
+                match = data.find(text, match + 1, str_end)
+
+            if not name_offsets:
+                continue
+
+            # st_name is the first field of the symbol entry on both ELF classes
+            name_struct = struct.Struct(self.byte_order + "I%dx" % (sh_entsize - 4))
+            end = min(sh_offset + sh_size, len(data))
+            count = (end - sh_offset) // sh_entsize
+            symbols = data[sh_offset : sh_offset + count * sh_entsize]
+            for (st_name,) in name_struct.iter_unpack(symbols):
+                if st_name in name_offsets:
+                    return True
+
+        return False
+
+
+def read_elf_info(path) -> ElfInfo:
+    """Read the facts of the ELF file at <path>"""
+    return ElfReader(path).read()
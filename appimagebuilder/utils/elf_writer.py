@@ -0,0 +1,243 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import mmap
+import os
+import struct
+import time
+
+from appimagebuilder.utils.elf_reader import (
+    DT_NEEDED,
+    DT_RPATH,
+    DT_RUNPATH,
+    DT_SONAME,
+    DT_STRSZ,
+    ELFCLASS64,
+    PT_INTERP,
+    SHT_DYNSYM,
+    ElfReader,
+    ElfReaderError,
+)
+
+SHT_GNU_VERDEF = 0x6FFFFFFD
+SHT_GNU_VERNEED = 0x6FFFFFFE
+
+# dynamic entries whose value is an offset in the strings table
+DYNAMIC_STRING_TAGS = (DT_NEEDED, DT_SONAME, DT_RPATH, DT_RUNPATH)
+
+
+class ElfWriter(ElfReader):
+    """
+    Rewrites the interpreter and RUNPATH of an ELF file in place
+
+    The new values are written over the old strings, therefore they must fit in
+    the space taken by them. Files requiring a layout change are not modified.
+    """
+
+    def patch(self, interpreter: str = None, run_path: str = None) -> bool:
+        """
+        Set the interpreter and/or RUNPATH, a DT_RPATH entry is turned into DT_RUNPATH
+
+        :return: False if the new values don't fit, the file is left untouched then
+        """
+        with open(self.path, "r+b") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ElfReaderError("Not an ELF file: %s" % self.path)
+
+            with data:
+                self._data = data
+                try:
+                    writes = self._plan_writes(interpreter, run_path)
+                except (struct.error, IndexError) as err:
+                    raise ElfReaderError("Malformed ELF file %s: %s" % (self.path, err))
+                finally:
+                    self._data = None
+
+            if writes is None:
+                return False
+
+            for offset, value in writes:
+                f.seek(offset)
+                f.write(value)
+
+        if writes:
+            self._bump_modification_time()
+        return True
+
+    def _plan_writes(self, interpreter, run_path):
+        self._read_header()
+        self._read_dynamic_section()
+
+        writes = []
+        if interpreter is not None:
+            interpreter_writes = self._plan_interpreter_writes(interpreter)
+            if interpreter_writes is None:
+                return None
+            writes.extend(interpreter_writes)
+
+        if run_path is not None:
+            run_path_writes = self._plan_run_path_writes(run_path)
+            if run_path_writes is None:
+                return None
+            writes.extend(run_path_writes)
+
+        return writes
+
+    def _plan_interpreter_writes(self, interpreter):
+        for p_type, p_offset, _, p_filesz in self.segments:
+            if p_type != PT_INTERP:
+                continue
+
+            # the kernel reads p_filesz bytes and requires the last one to be a NUL
+            value = interpreter.encode()
+            if len(value) + 1 > p_filesz or p_offset + p_filesz > len(self._data):
+                return None
+
+            value = value.ljust(p_filesz, b"\0")
+            if self._data[p_offset : p_offset + p_filesz] == value:
+                return []
+            return [(p_offset, value)]
+
+        return None
+
+    def _plan_run_path_writes(self, run_path):
+        entry = self._find_run_path_entry()
+        if entry is None:
+            # a new dynamic entry is required unless the RUNPATH is cleared
+            return [] if not run_path else None
+
+        tag, string_offset, entry_offset = entry
+        strings_offset = self.get_dynamic_strings_offset()
+        strings_end = strings_offset + self._get_dynamic_strings_size()
+        start = strings_offset + string_offset
+        end = self._data.find(b"\0", start, min(strings_end, len(self._data)))
+        if end == -1:
+            return None
+
+        value = run_path.encode()
+        capacity = end - start
+        if len(value) > capacity:
+            return None
+        if self._is_string_shared(string_offset, capacity, entry_offset):
+            return None
+
+        writes = []
+        value = value.ljust(capacity, b"\0")
+        if self._data[start:end] != value:
+            writes.append((start, value))
+        if tag != DT_RUNPATH:
+            tag_format = self.byte_order + (
+                "q" if self.elf_class == ELFCLASS64 else "i"
+            )
+            writes.append((entry_offset, struct.pack(tag_format, DT_RUNPATH)))
+        return writes
+
+    def _find_run_path_entry(self):
+        # DT_RUNPATH takes precedence over DT_RPATH, same as the dynamic linker
+        for wanted_tag in (DT_RUNPATH, DT_RPATH):
+            for entry in self.dynamic:
+                if entry[0] == wanted_tag:
+                    return entry
+        return None
+
+    def _get_dynamic_strings_size(self):
+        for tag, value, _ in self.dynamic:
+            if tag == DT_STRSZ:
+                return value
+
+        raise ElfReaderError("Missing DT_STRSZ on: %s" % self.path)
+
+    def _is_string_shared(self, string_offset, size, entry_offset) -> bool:
+        """Check if other names use the bytes of the string, linkers merge suffixes"""
+        if not self.sections:
+            # the symbol and version names can't be checked
+            return True
+
+        for offset in self._read_string_references(entry_offset):
+            if string_offset <= offset < string_offset + size:
+                return True
+        return False
+
+    def _read_string_references(self, excluded_entry_offset):
+        for tag, value, entry_offset in self.dynamic:
+            if tag in DYNAMIC_STRING_TAGS and entry_offset != excluded_entry_offset:
+                yield value
+
+        strings_offset = self.get_dynamic_strings_offset()
+        for _, sh_type, sh_offset, sh_size, sh_link, sh_entsize in self.sections:
+            # only the names stored on the dynamic strings table matter
+            if sh_link >= len(self.sections):
+                continue
+            if self.sections[sh_link][2] != strings_offset:
+                continue
+
+            if sh_type == SHT_DYNSYM and sh_entsize:
+                yield from self._read_symbol_names(sh_offset, sh_size, sh_entsize)
+            elif sh_type == SHT_GNU_VERNEED:
+                yield from self._read_version_needs_names(sh_offset)
+            elif sh_type == SHT_GNU_VERDEF:
+                yield from self._read_version_definitions_names(sh_offset)
+
+    def _read_symbol_names(self, offset, size, entry_size):
+        # st_name is the first field of the symbol entry on both ELF classes
+        name_struct = struct.Struct(self.byte_order + "I")
+        for entry_offset in range(offset, offset + size, entry_size):
+            yield name_struct.unpack_from(self._data, entry_offset)[0]
+
+    def _read_version_needs_names(self, offset):
+        # Elf_Verneed and Elf_Vernaux have the same layout on both ELF classes
+        need_struct = struct.Struct(self.byte_order + "HHIII")
+        aux_struct = struct.Struct(self.byte_order + "IHHII")
+        while True:
+            _, vn_cnt, vn_file, vn_aux, vn_next = need_struct.unpack_from(
+                self._data, offset
+            )
+            yield vn_file
+            aux_offset = offset + vn_aux
+            for _ in range(vn_cnt):
+                _, _, _, vna_name, vna_next = aux_struct.unpack_from(
+                    self._data, aux_offset
+                )
+                yield vna_name
+                aux_offset += vna_next
+            if not vn_next:
+                break
+            offset += vn_next
+
+    def _read_version_definitions_names(self, offset):
+        # Elf_Verdef and Elf_Verdaux have the same layout on both ELF classes
+        definition_struct = struct.Struct(self.byte_order + "HHHHIII")
+        aux_struct = struct.Struct(self.byte_order + "II")
+        while True:
+            _, _, _, vd_cnt, _, vd_aux, vd_next = definition_struct.unpack_from(
+                self._data, offset
+            )
+            aux_offset = offset + vd_aux
+            for _ in range(vd_cnt):
+                vda_name, vda_next = aux_struct.unpack_from(self._data, aux_offset)
+                yield vda_name
+                aux_offset += vda_next
+            if not vd_next:
+                break
+            offset += vd_next
+
+    def _bump_modification_time(self):
+        # file timestamps are coarse, make sure caches notice the change
+        stat_result = os.stat(self.path)
+        modification_time = max(time.time_ns(), stat_result.st_mtime_ns + 1)
+        os.utime(self.path, ns=(stat_result.st_atime_ns, modification_time))
+
+
+def patch_elf_in_place(path, interpreter: str = None, run_path: str = None) -> bool:
+    """Set the interpreter and/or RUNPATH of <path> if they fit, see ElfWriter"""
+    return ElfWriter(path).patch(interpreter, run_path)
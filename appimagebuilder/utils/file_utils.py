@@ -9,9 +9,31 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import errno
 import os
+import shutil
 import stat
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl request to share the extents of a file on copy-on-write file systems
+FICLONE = 0x40049409
+
+# errors telling that the fast copy paths are not supported for the given files
+_UNSUPPORTED_COPY_ERRORS = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EXDEV,
+    errno.EPERM,
+}
+
 
 def set_permissions_rx_all(path):
     os.chmod(
@@ -24,3 +46,58 @@ def set_permissions_rx_all(path):
         | stat.S_IXOTH
         | stat.S_IWUSR,
     )
+
+
+def copy_file(source, target):
+    """Copy <source> contents and metadata to <target> as `shutil.copy2` does
+
+    The file extents are shared (reflink) on file systems that support it,
+    otherwise the data is copied in kernel space with `copy_file_range`. Hard
+    links are never used, the copies can be modified in place safely.
+    """
+    if os.path.isdir(target):
+        target = os.path.join(target, os.path.basename(source))
+
+    if os.path.exists(target) and os.path.samefile(source, target):
+        raise shutil.SameFileError("%r and %r are the same file" % (source, target))
+
+    with open(source, "rb") as source_file, open(target, "wb") as target_file:
+        if not _clone_file(source_file, target_file):
+            _copy_file_range(source_file, target_file)
+            # copies the remaining data, if any, when copy_file_range isn't usable
+            shutil.copyfileobj(source_file, target_file)
+
+    shutil.copystat(source, target)
+    return target
+
+
+def _clone_file(source_file, target_file) -> bool:
+    if not fcntl:
+        return False
+
+    try:
+        fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+        return True
+    except OSError as err:
+        if err.errno in _UNSUPPORTED_COPY_ERRORS:
+            return False
+        raise
+
+
+def _copy_file_range(source_file, target_file):
+    if not hasattr(os, "copy_file_range"):
+        return
+
+    size = os.fstat(source_file.fileno()).st_size
+    offset = 0
+    try:
+        while offset < size:
+            copied = os.copy_file_range(
+                source_file.fileno(), target_file.fileno(), size - offset
+            )
+            if copied == 0:
+                break
+            offset += copied
+    except OSError as err:
+        if offset > 0 or err.errno not in _UNSUPPORTED_COPY_ERRORS:
+            raise
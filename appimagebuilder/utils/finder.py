@@ -13,17 +13,79 @@ import fnmatch
 import logging
 import os
 import pathlib
+import re
+import stat
 
 import appimagebuilder.utils.elf
 from appimagebuilder.utils import shell
 
 
+class InventoryEntry:
+    """Snapshot of a file system entry taken while indexing a directory"""
+
+    __slots__ = (
+        "path",
+        "rel_path",
+        "type",
+        "mode",
+        "size",
+        "mtime",
+        "inode",
+        "is_symlink",
+    )
+
+    TYPE_FILE = "file"
+    TYPE_DIR = "dir"
+    TYPE_OTHER = "other"
+
+    def __init__(self, path, rel_path, type, mode, size, mtime, inode, is_symlink):
+        self.path = path
+        self.rel_path = rel_path
+        self.type = type
+        self.mode = mode
+        self.size = size
+        self.mtime = mtime
+        self.inode = inode
+        self.is_symlink = is_symlink
+
+    @staticmethod
+    def from_dir_entry(entry: os.DirEntry, rel_path: str):
+        is_symlink = entry.is_symlink()
+        try:
+            # follow symlinks so the type matches the one reported by pathlib
+            entry_stat = entry.stat()
+        except OSError:
+            # broken symlink
+            entry_stat = entry.stat(follow_symlinks=False)
+
+        if stat.S_ISDIR(entry_stat.st_mode):
+            entry_type = InventoryEntry.TYPE_DIR
+        elif stat.S_ISREG(entry_stat.st_mode):
+            entry_type = InventoryEntry.TYPE_FILE
+        else:
+            entry_type = InventoryEntry.TYPE_OTHER
+
+        return InventoryEntry(
+            entry.path,
+            rel_path,
+            entry_type,
+            entry_stat.st_mode,
+            entry_stat.st_size,
+            entry_stat.st_mtime_ns,
+            entry_stat.st_ino,
+            is_symlink,
+        )
+
+
 class Finder:
     """
     Provides a simple interface for searching files in a directory.
 
-    Supports performing checks on the files and keeps a cache of the
-    results.
+    The directory is indexed in a single pass the first time it's queried and
+    every query is answered from that inventory. Symlinks to directories are
+    listed but not traversed. Supports performing checks on the files and keeps
+    a cache of the results. Call `invalidate` after modifying the directory
+    contents.
     """
 
     def __init__(self, base_path):
@@ -31,6 +93,58 @@ class Finder:
         self.cache = {}
         self.logger = logging.getLogger("CachedFinder")
 
+        # directories listing in the same order pathlib.rglob and os.walk visit them
+        self._dirs = None
+        self._entries_by_path = None
+        self._compiled_patterns = {}
+
+    def invalidate(self):
+        """Drop the directory inventory and the checks results"""
+        self._dirs = None
+        self._entries_by_path = None
+        self.cache = {}
+
+    def get_entry(self, path) -> InventoryEntry:
+        """Inventory entry of <path> or None if it was not indexed"""
+        self._ensure_inventory()
+        return self._entries_by_path.get(str(path))
+
+    def _ensure_inventory(self):
+        if self._dirs is not None:
+            return
+
+        self.logger.debug("Indexing %s" % self.base_path)
+        self._dirs = []
+        self._entries_by_path = {}
+
+        pending = [(str(self.base_path), "")]
+        while pending:
+            dir_path, dir_rel_path = pending.pop()
+            try:
+                with os.scandir(dir_path) as it:
+                    dir_entries = list(it)
+            except OSError:
+                continue
+
+            entries = []
+            sub_dirs = []
+            for dir_entry in dir_entries:
+                rel_path = dir_rel_path + dir_entry.name
+                entry = InventoryEntry.from_dir_entry(dir_entry, rel_path)
+                entries.append(entry)
+                self._entries_by_path[entry.path] = entry
+
+                if entry.type == InventoryEntry.TYPE_DIR and not entry.is_symlink:
+                    sub_dirs.append((entry.path, rel_path + "/"))
+
+            self._dirs.append((dir_path, entries))
+            # visit sub-directories in pre-order
+            pending.extend(reversed(sub_dirs))
+
+        self.logger.debug(
+            "Indexed %s entries in %s" % (len(self._entries_by_path), self.base_path)
+        )
+
     @staticmethod
     def is_file(path: pathlib.Path):
         return path.is_file()
@@ -87,13 +201,17 @@ class Finder:
         if excluded_patterns is None:
             excluded_patterns = []
 
-        for root, _, files in os.walk(self.base_path):
+        self._ensure_inventory()
+        for root, entries in self._dirs:
             root_path = pathlib.Path(root)
             if self.match_patterns(root_path, excluded_patterns):
                 continue
 
-            for filename in files:
-                path = root_path / filename
+            for entry in entries:
+                if entry.type == InventoryEntry.TYPE_DIR:
+                    continue
+
+                path = pathlib.Path(entry.path)
                 if not fnmatch.fnmatch(path, pattern):
                     continue
 
@@ -129,9 +247,94 @@ class Finder:
             % (pattern, " ".join(check_true_names), " ".join(check_false_names))
         )
 
-        for path in self.base_path.rglob(pattern):
-            if self.check_file(path, check_true, check_false):
-                yield path.absolute()
+        regex = self._compile_pattern(pattern)
+        self._ensure_inventory()
+        for _, entries in self._dirs:
+            for entry in entries:
+                match = regex.search(entry.rel_path)
+                if not match or not self._is_recursive_match(entry, match):
+                    continue
+
+                path = pathlib.Path(entry.path)
+                if self.check_file(path, check_true, check_false):
+                    yield path.absolute()
+
+    def _compile_pattern(self, pattern):
+        """Translates a pathlib.rglob pattern into a regex matching relative paths"""
+        if pattern in self._compiled_patterns:
+            return self._compiled_patterns[pattern]
+
+        regex = ""
+        parts = []
+        for part in pattern.split("/"):
+            # consecutive "**" match the same paths as a single one
+            if part and not (part == "**" and parts[-1:] == ["**"]):
+                parts.append(part)
+
+        for idx, part in enumerate(parts):
+            if part == "**" and idx == len(parts) - 1:
+                # a trailing "**" matches the directory itself and its sub-directories
+                if regex:
+                    regex = regex[: -len("/")] + "(?P<recursive>(?:/[^/]+)*)"
+                else:
+                    regex = "(?P<recursive>[^/]+(?:/[^/]+)*)"
+            elif part == "**":
+                regex += "(?:[^/]+/)*"
+            else:
+                regex += self._translate_pattern_part(part)
+                if idx < len(parts) - 1:
+                    regex += "/"
+
+        compiled = re.compile("(?:^|/)" + regex + r"\Z")
+        self._compiled_patterns[pattern] = compiled
+        return compiled
+
+    @staticmethod
+    def _is_recursive_match(entry: InventoryEntry, match):
+        """Patterns ending in "**" only yield directories, same as pathlib.rglob"""
+        if "recursive" not in match.re.groupindex:
+            return True
+
+        if entry.type != InventoryEntry.TYPE_DIR:
+            return False
+
+        # symlinks to directories are not traversed, only the matched one is listed
+        return not match.group("recursive") or not entry.is_symlink
+
+    @staticmethod
+    def _translate_pattern_part(part):
+        """Same as fnmatch.translate but wildcards don't match path separators"""
+        i, n = 0, len(part)
+        regex = ""
+        while i < n:
+            c = part[i]
+            i += 1
+            if c == "*":
+                regex += "[^/]*"
+            elif c == "?":
+                regex += "[^/]"
+            elif c == "[":
+                j = i
+                if j < n and part[j] == "!":
+                    j += 1
+                if j < n and part[j] == "]":
+                    j += 1
+                while j < n and part[j] != "]":
+                    j += 1
+                if j >= n:
+                    regex += "\\["
+                else:
+                    chars = part[i:j].replace("\\", "\\\\")
+                    i = j + 1
+                    if chars[0] == "!":
+                        chars = "^" + chars[1:]
+                    elif chars[0] == "^":
+                        chars = "\\" + chars
+                    regex += "(?!/)[%s]" % chars
+            else:
+                regex += re.escape(c)
+
+        return regex
 
     def check_file(self, path, check_true: [] = None, check_false: [] = None):
         if check_true is None:
@@ -153,6 +356,10 @@ class Finder:
         return True
 
     def _run_check(self, check_function, path):
+        passed = self._run_inventory_check(check_function, path)
+        if passed is not None:
+            return passed
+
         key = (path.__str__(), check_function.__name__)
         if key in self.cache:
             return self.cache[key]
@@ -160,3 +367,23 @@ class Finder:
             passed = check_function(path)
             self.cache[key] = passed
             return passed
+
+    def _run_inventory_check(self, check_function, path):
+        """Resolve file type checks using the inventory, returns None if not possible"""
+        if not self._entries_by_path:
+            return None
+
+        entry = self._entries_by_path.get(str(path))
+        if entry is None:
+            return None
+
+        if check_function is Finder.is_file:
+            return entry.type == InventoryEntry.TYPE_FILE
+
+        if check_function is Finder.is_dir:
+            return entry.type == InventoryEntry.TYPE_DIR
+
+        if check_function is Finder.is_symlink:
+            return entry.is_symlink
+
+        return None
@@ -0,0 +1,133 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import contextlib
+import logging
+import os
+import shlex
+import subprocess
+import threading
+import time
+
+from appimagebuilder.utils import profiler
+
+
+class ToolStats:
+    """Executions count and latency histogram of an external tool"""
+
+    # upper bounds in seconds of the latency histogram buckets, the last one is open
+    latency_buckets = (0.01, 0.1, 1.0, 10.0)
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(self.latency_buckets) + 1)
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+
+        bucket = 0
+        while (
+            bucket < len(self.latency_buckets)
+            and duration >= self.latency_buckets[bucket]
+        ):
+            bucket += 1
+        self.histogram[bucket] += 1
+
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def _reset_lock():
+    # the lock may be held by another thread when forking
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_lock)
+
+
+def get_tool_name(args) -> str:
+    if isinstance(args, (str, bytes)):
+        args = shlex.split(os.fsdecode(args))
+    return os.path.basename(os.fsdecode(args[0]))
+
+
+def record(tool: str, duration: float):
+    """Account an execution of <tool>, used for the ones spawned by worker processes"""
+    with _lock:
+        if tool not in _stats:
+            _stats[tool] = ToolStats()
+        _stats[tool].add(duration)
+
+
+@contextlib.contextmanager
+def track(tool: str, args=None):
+    """Account the enclosed block as an execution of <tool>
+
+    Use it around the processes that can't be launched with `run`, like the ones
+    whose output is streamed.
+    """
+    if args is not None and not isinstance(args, (str, bytes)):
+        args = " ".join(os.fsdecode(arg) for arg in args)
+
+    start = time.perf_counter()
+    try:
+        with profiler.span(tool, command=args):
+            yield
+    finally:
+        record(tool, time.perf_counter() - start)
+
+
+def run(args, tool: str = None, **kwargs) -> subprocess.CompletedProcess:
+    """Same as subprocess.run but accounting the execution"""
+    with track(tool or get_tool_name(args), args):
+        return subprocess.run(args, **kwargs)
+
+
+def get_stats() -> {str: ToolStats}:
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+def log_stats(level=logging.INFO):
+    """Print the per tool executions count and latency histogram"""
+    stats = get_stats()
+    logger = logging.getLogger("Launcher")
+    if not stats:
+        logger.log(level, "No external tools executed")
+        return
+
+    bounds = ["<%gs" % bound for bound in ToolStats.latency_buckets]
+    bounds.append(">=%gs" % ToolStats.latency_buckets[-1])
+    row_format = "%-24s %7s %9s %8s" + " %7s" * len(bounds)
+    logger.log(level, row_format, "tool", "count", "total", "max", *bounds)
+    for tool, item in sorted(
+        stats.items(), key=lambda i: i[1].total_time, reverse=True
+    ):
+        logger.log(
+            level,
+            row_format,
+            tool,
+            item.count,
+            "%.2fs" % item.total_time,
+            "%.2fs" % item.max_time,
+            *item.histogram,
+        )
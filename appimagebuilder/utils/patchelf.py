@@ -11,83 +11,148 @@
 #  all copies or substantial portions of the Software.
 import os
 
+from appimagebuilder.utils import elf
 from appimagebuilder.utils.command import Command
+from appimagebuilder.utils.elf_reader import ElfReaderError
+from appimagebuilder.utils.elf_writer import patch_elf_in_place
 
 
 class PatchElfError(RuntimeError):
     pass
 
 
+class ElfPatch:
+    """Changes to be applied to an ELF file, unset fields are left untouched"""
+
+    __slots__ = ("interpreter", "run_path")
+
+    def __init__(self, interpreter: str = None, run_path: [str] = None):
+        self.interpreter = interpreter
+        self.run_path = run_path
+
+    def merge(self, other: "ElfPatch") -> "ElfPatch":
+        """Combine both patches, the fields set in <other> take precedence"""
+        return ElfPatch(
+            other.interpreter if other.interpreter is not None else self.interpreter,
+            other.run_path if other.run_path is not None else self.run_path,
+        )
+
+    def to_args(self) -> [str]:
+        args = []
+        if self.interpreter is not None:
+            args.extend(["--set-interpreter", self.interpreter])
+        if self.run_path is not None:
+            args.extend(["--set-rpath", ":".join(self.run_path)])
+        return args
+
+
 class PatchElf(Command):
+    # max number of files patched by a single patchelf execution
+    max_batch_size = 200
+
     def __init__(self):
         super().__init__("patchelf")
+        # only used to report errors
+        self.max_captured_lines = 1000
+
+    @staticmethod
+    def _read_info(file):
+        # read-only queries are resolved in-process, no need to spawn patchelf
+        try:
+            return elf.read_info(file)
+        except (ElfReaderError, OSError) as err:
+            raise PatchElfError(str(err))
 
     def get_interpreter(self, file):
-        file = file.__str__()
-        self._run(["patchelf", "--print-interpreter", file])
-        if self.return_code != 0:
-            raise PatchElfError("\n".join(self.stderr))
+        interpreter = self._read_info(file).interpreter
+        if interpreter is None:
+            raise PatchElfError("cannot find section '.interp' on: %s" % file)
 
-        return "\n".join(self.stdout).strip()
+        return interpreter.strip()
 
     def set_interpreter(self, file, interpreter):
-        file = file.__str__()
-        self._run(["patchelf", "--set-interpreter", interpreter, file])
-
-        if self.return_code != 0:
-            raise PatchElfError("\n".join(self.stderr))
+        self._apply_one(file, ElfPatch(interpreter=interpreter))
 
     def get_needed(self, file):
-        file = file.__str__()
-        self._run(["patchelf", "--print-needed", file])
-
-        if self.return_code != 0:
-            raise PatchElfError("\n".join(self.stderr))
-
-        return self.stdout
+        return list(self._read_info(file).needed)
 
     def get_rpath(self, file):
-        file = file.__str__()
-        self._run(["patchelf", "--print-rpath", file])
-
-        if self.return_code != 0:
-            raise PatchElfError("\n".join(self.stderr))
-
-        return "".join(self.stdout).split(":")
+        info = self._read_info(file)
+        # DT_RUNPATH takes precedence over DT_RPATH, same as patchelf
+        rpath = info.runpath if info.runpath is not None else info.rpath
+        return (rpath or "").split(":")
 
     def set_rpath(self, file: str, run_paths: [str]):
-        file = file.__str__()
-        command = ["patchelf", "--set-rpath", ":".join(run_paths), file]
-        self._run(command)
-
-        if self.return_code != 0:
-            raise PatchElfError("\n".join(self.stderr))
+        self._apply_one(file, ElfPatch(run_path=run_paths))
 
     def get_soname(self, file):
-        file = file.__str__()
-        self._run(["patchelf", "--print-soname", file])
-
-        if self.return_code != 0:
-            raise PatchElfError("\n".join(self.stderr))
-
-        return self.stdout
+        soname = self._read_info(file).soname
+        return [soname] if soname else []
 
     def set(self, file, run_path=None, interpreter=None):
-        file = file.__str__()
-        command = ["patchelf"]
-        if run_path:
-            command.append("--set-rpath")
-            command.append(":".join(run_path))
-
-        if interpreter:
-            command.append("--set-interpreter")
-            command.append(interpreter)
-
-        command.append(file)
-        self._run(command)
-
-        if self.return_code != 0:
-            raise PatchElfError("\n".join(self.stderr))
+        self._apply_one(file, ElfPatch(interpreter or None, run_path or None))
+
+    def _apply_one(self, file, patch: ElfPatch):
+        errors = self.apply([(file, patch)])
+        if errors:
+            raise PatchElfError(errors[str(file)])
+
+    def apply(self, patches: [(str, ElfPatch)]) -> {str: str}:
+        """Apply the patches using as few patchelf executions as possible
+
+        The patches of the same file are merged so it's rewritten only once. Files
+        are edited in-process when the new values fit in place, the remaining ones
+        getting the same changes are patched by a single execution.
+
+        :return: error messages of the files that couldn't be patched
+        """
+        merged = {}
+        for file, patch in patches:
+            file = str(file)
+            merged[file] = merged[file].merge(patch) if file in merged else patch
+
+        groups = {}
+        for file, patch in merged.items():
+            if self._apply_in_place(file, patch):
+                continue
+
+            args = tuple(patch.to_args())
+            if args:
+                groups.setdefault(args, []).append(file)
+
+        errors = {}
+        for args, files in groups.items():
+            for idx in range(0, len(files), self.max_batch_size):
+                batch = files[idx : idx + self.max_batch_size]
+                self._run(["patchelf", *args, *batch])
+                if self.return_code != 0:
+                    errors.update(self._apply_one_by_one(args, batch))
+
+        return errors
+
+    def _apply_in_place(self, file, patch: ElfPatch) -> bool:
+        run_path = ":".join(patch.run_path) if patch.run_path is not None else None
+        try:
+            patched = patch_elf_in_place(file, patch.interpreter, run_path)
+        except (ElfReaderError, OSError) as err:
+            # let patchelf handle or report it
+            self.logger.debug("Unable to patch %s in place: %s" % (file, err))
+            return False
+
+        if patched:
+            self.logger.debug(
+                "Patched in place: %s %s" % (file, " ".join(patch.to_args()))
+            )
+        return patched
+
+    def _apply_one_by_one(self, args, files) -> {str: str}:
+        # patchelf stops at the first file it fails to patch
+        errors = {}
+        for file in files:
+            self._run(["patchelf", *args, file])
+            if self.return_code != 0:
+                errors[file] = "\n".join(self.stderr)
+        return errors
 
     def add_needed(self, file, lib_needed):
         file = file.__str__()
@@ -0,0 +1,191 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import contextlib
+import json
+import logging
+import os
+import pathlib
+import resource
+import threading
+import time
+
+
+class Profiler:
+    """
+    Record the time and resources spent by the build stages
+
+    Every stage keeps the external tools executed while it was running as child
+    spans. CPU time is measured per thread but the children usage, peak RSS and
+    written bytes are process wide counters, stages running concurrently share them.
+    """
+
+    format_version = 1
+    file_name = "build-profile.json"
+    trace_file_name = "build-profile.trace.json"
+
+    def __init__(self, output_dir: pathlib.Path, chrome_trace: bool = False):
+        self.output_dir = pathlib.Path(output_dir)
+        self.chrome_trace = chrome_trace
+        self.logger = logging.getLogger("Profiler")
+        self.stages = []
+
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Measure the enclosed block as a build stage"""
+        stage = {
+            "name": name,
+            "start": time.perf_counter() - self._origin,
+            "thread": threading.get_ident(),
+            "status": "failed",
+            "spans": [],
+        }
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        written_before = _read_written_bytes()
+        cpu_before = time.thread_time()
+
+        self._local.stage = stage
+        try:
+            yield stage
+            stage["status"] = "ok"
+        finally:
+            self._local.stage = None
+            children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            written_after = _read_written_bytes()
+
+            stage["wall_time"] = time.perf_counter() - self._origin - stage["start"]
+            stage["cpu_time"] = time.thread_time() - cpu_before
+            stage["children_cpu_time"] = _cpu_time(children_after) - _cpu_time(
+                children_before
+            )
+            # ru_maxrss is reported in KiB on Linux
+            stage["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            stage["children_peak_rss_kb"] = children_after.ru_maxrss
+            stage["children"] = len(stage["spans"])
+            stage["bytes_written"] = (
+                written_after - written_before
+                if written_before is not None and written_after is not None
+                else None
+            )
+            with self._lock:
+                self.stages.append(stage)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args):
+        """Measure the enclosed block as a child of the stage running on this thread"""
+        stage = getattr(self._local, "stage", None)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if stage is not None:
+                stage["spans"].append(
+                    {
+                        "name": name,
+                        "start": start - self._origin,
+                        "duration": time.perf_counter() - start,
+                        "args": args,
+                    }
+                )
+
+    def save(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stages = sorted(self.stages, key=lambda item: item["start"])
+
+        path = self.output_dir / self.file_name
+        with open(path, "w") as f:
+            json.dump({"format_version": self.format_version, "stages": stages}, f)
+        self.logger.info("Build profile written to %s", path)
+
+        if self.chrome_trace:
+            path = self.output_dir / self.trace_file_name
+            with open(path, "w") as f:
+                json.dump(self._to_trace_events(stages), f)
+            self.logger.info("Build trace written to %s", path)
+
+    @staticmethod
+    def _to_trace_events(stages) -> dict:
+        """Convert the stages into the Chrome trace-event format (chrome://tracing)"""
+        pid = os.getpid()
+        events = []
+        for stage in stages:
+            args = {k: v for k, v in stage.items() if k not in ("spans", "thread")}
+            events.append(
+                _trace_event(
+                    stage["name"],
+                    stage["start"],
+                    stage["wall_time"],
+                    pid,
+                    stage["thread"],
+                    args,
+                )
+            )
+            for span in stage["spans"]:
+                events.append(
+                    _trace_event(
+                        span["name"],
+                        span["start"],
+                        span["duration"],
+                        pid,
+                        stage["thread"],
+                        span["args"],
+                    )
+                )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _trace_event(name, start, duration, pid, tid, args) -> dict:
+    return {
+        "name": name,
+        "ph": "X",
+        "ts": int(start * 1e6),
+        "dur": int(duration * 1e6),
+        "pid": pid,
+        "tid": tid,
+        "args": args,
+    }
+
+
+def _cpu_time(usage) -> float:
+    return usage.ru_utime + usage.ru_stime
+
+
+def _read_written_bytes():
+    # includes the bytes written by the already reaped child processes
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "write_bytes":
+                    return int(value)
+    except OSError:
+        pass
+    return None
+
+
+_profiler = None
+
+
+def set_profiler(profiler: Profiler):
+    """Set the profiler that records the spans of the external tools executions"""
+    global _profiler
+    _profiler = profiler
+
+
+def span(name: str, **args):
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.span(name, **args)
@@ -4,6 +4,8 @@ import shutil
 import subprocess
 import tempfile
 
+from appimagebuilder.utils import launcher
+
 
 class CommandNotFoundError(RuntimeError):
     pass
@@ -55,8 +57,11 @@ def execute(script, env=None):
     with tempfile.NamedTemporaryFile() as exported_env:
         run_env["BUILDER_ENV"] = exported_env.name
 
-        _proc = subprocess.Popen(["bash", "-ve"], stdin=subprocess.PIPE, env=run_env)
-        _proc.communicate(script.encode())
+        with launcher.track("bash"):
+            _proc = subprocess.Popen(
+                ["bash", "-ve"], stdin=subprocess.PIPE, env=run_env
+            )
+            _proc.communicate(script.encode())
 
         if _proc.returncode != 0:
             raise RuntimeError("Script exited with code: %s" % _proc.returncode)
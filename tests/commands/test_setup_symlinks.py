@@ -0,0 +1,57 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder import recipe
+from appimagebuilder.commands.setup_symlinks import SetupSymlinksCommand
+from appimagebuilder.context import Context
+from appimagebuilder.utils.finder import Finder
+
+
+class TestSetupSymlinksCommand(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app_dir = pathlib.Path(self.temp_dir.name) / "AppDir"
+        (self.app_dir / "usr" / "bin").mkdir(parents=True)
+        self.context = Context(
+            pathlib.Path("AppImageBuilder.yml"),
+            None,
+            None,
+            self.app_dir,
+            pathlib.Path(self.temp_dir.name) / "cache",
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_preserved_links_are_kept(self):
+        (self.app_dir / "usr" / "bin" / "sh").symlink_to("/usr/bin/bash")
+        # a preserved link keeps its absolute target outside of the AppDir
+        host_file = pathlib.Path(self.temp_dir.name) / "python3"
+        host_file.touch()
+        (self.app_dir / "usr" / "bin" / "python3").symlink_to(host_file)
+        recipe_roamer = recipe.Roamer(
+            {"AppDir": {"runtime": {"preserve": ["usr/bin/python3"]}}}
+        )
+
+        command = SetupSymlinksCommand(
+            self.context, recipe_roamer, Finder(self.app_dir)
+        )
+        command()
+
+        self.assertEqual("bash", os.readlink(self.app_dir / "usr" / "bin" / "sh"))
+        self.assertEqual(
+            str(host_file), os.readlink(self.app_dir / "usr" / "bin" / "python3")
+        )
@@ -0,0 +1,92 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import io
+import os
+import pathlib
+import tarfile
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.apt.deb_archive import DebArchive, DebArchiveError
+
+
+def _ar_member(name: str, data: bytes):
+    header = "%-16s%-12s%-6s%-6s%-8s%-10s`\n" % (name, 0, 0, 0, 100644, len(data))
+    member = header.encode() + data
+    if len(data) % 2:
+        member += b"\n"
+    return member
+
+
+def _tar_data(compression):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:%s" % compression) as tar:
+        dir_info = tarfile.TarInfo("./usr/bin")
+        dir_info.type = tarfile.DIRTYPE
+        dir_info.mode = 0o755
+        tar.addfile(dir_info)
+
+        content = b"#!/bin/sh\n"
+        file_info = tarfile.TarInfo("./usr/bin/app")
+        file_info.size = len(content)
+        file_info.mode = 0o755
+        tar.addfile(file_info, io.BytesIO(content))
+
+        link_info = tarfile.TarInfo("./usr/bin/app-link")
+        link_info.type = tarfile.SYMTYPE
+        link_info.linkname = "app"
+        tar.addfile(link_info)
+    return buffer.getvalue()
+
+
+class TestDebArchive(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _write_deb(self, compression):
+        path = self.temp_path / "app.deb"
+        with open(path, "wb") as f:
+            f.write(b"!<arch>\n")
+            f.write(_ar_member("debian-binary", b"2.0\n"))
+            f.write(_ar_member("control.tar.gz", _tar_data("gz")))
+            f.write(_ar_member("data.tar.%s" % compression, _tar_data(compression)))
+        return path
+
+    def test_extract(self):
+        for compression in ["xz", "gz"]:
+            target = self.temp_path / compression
+            files = DebArchive(self._write_deb(compression)).extract(target)
+
+            self.assertEqual(["usr/bin/app", "usr/bin/app-link"], files)
+            self.assertTrue(os.access(target / "usr/bin/app", os.X_OK))
+            self.assertEqual("app", os.readlink(target / "usr/bin/app-link"))
+
+    def test_extract_replaces_symlinks(self):
+        target = self.temp_path / "AppDir"
+        outside_file = self.temp_path / "outside"
+        outside_file.write_text("outside")
+        (target / "usr/bin").mkdir(parents=True)
+        (target / "usr/bin/app").symlink_to(outside_file)
+
+        DebArchive(self._write_deb("xz")).extract(target)
+
+        self.assertFalse((target / "usr/bin/app").is_symlink())
+        self.assertEqual("outside", outside_file.read_text())
+
+    def test_extract_not_a_deb(self):
+        path = self.temp_path / "file.deb"
+        path.write_text("not a deb")
+        self.assertRaises(DebArchiveError, DebArchive(path).extract, self.temp_path)
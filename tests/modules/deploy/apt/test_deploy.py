@@ -11,10 +11,13 @@
 #  all copies or substantial portions of the Software.
 
 import logging
+import os
 import shutil
+import tempfile
 from pathlib import Path
 from unittest import TestCase, skipIf
 from appimagebuilder.modules.deploy.apt import Deploy
+from appimagebuilder.modules.deploy.apt.package import Package
 from appimagebuilder.modules.deploy.apt.venv import Venv
 
 
@@ -47,3 +50,82 @@ class TestDeploy(TestCase):
         apt_deploy.deploy(["perl", "util-linux"], self.appdir_path)
         self.assertTrue(next(self.appdir_path.glob("usr")))
         self.assertTrue(next(self.appdir_path.glob("runtime/compat/lib")))
+
+
+class FakeVenv:
+    architectures = ["amd64"]
+
+    def __init__(self, files):
+        self.files = files
+
+    def resolve_packages(self, packages):
+        return [Package("libc6", "2.31", "amd64")]
+
+    def extract_package(self, package, target):
+        for path in self.files[package.name]:
+            path = Path(target) / path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(package.name)
+
+        return self.files[package.name]
+
+
+class TestDeployExtractPackages(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.appdir_path = Path(self.temp_dir.name) / "AppDir"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_extract_packages(self):
+        venv = FakeVenv(
+            {
+                "libc6": ["lib/libc.so.6"],
+                "perl": ["usr/bin/perl", "usr/share/doc/common"],
+                "bash": ["usr/bin/bash", "usr/share/doc/common"],
+            }
+        )
+        packages = [
+            Package("perl", "5.32", "amd64"),
+            Package("libc6", "2.31", "amd64"),
+            Package("bash", "5.1", "amd64"),
+        ]
+
+        apt_deploy = Deploy(venv)
+        with self.assertLogs("AptPackageDeploy", level="WARNING") as logs:
+            apt_deploy._extract_packages(self.appdir_path, packages)
+
+        self.assertTrue((self.appdir_path / "usr/bin/perl").exists())
+        self.assertTrue((self.appdir_path / "usr/bin/bash").exists())
+        self.assertTrue((self.appdir_path / "runtime/compat/lib/libc.so.6").exists())
+        # packages are merged in the given order, the last one wins
+        self.assertEqual(
+            "bash", (self.appdir_path / "usr/share/doc/common").read_text()
+        )
+        self.assertEqual(1, len(logs.output))
+        self.assertIn("bash", logs.output[0])
+        self.assertIn("perl", logs.output[0])
+        self.assertEqual(["AppDir"], os.listdir(self.temp_dir.name))
+        self.assertEqual(
+            ["runtime/compat/lib/libc.so.6"],
+            apt_deploy.package_files["libc6:amd64=2.31"],
+        )
+
+    def test_extract_packages_order(self):
+        venv = FakeVenv(
+            {
+                "libc6": [],
+                "perl": ["usr/share/doc/common"],
+                "bash": ["usr/share/doc/common"],
+            }
+        )
+        packages = [Package("bash", "5.1", "amd64"), Package("perl", "5.32", "amd64")]
+
+        apt_deploy = Deploy(venv)
+        with self.assertLogs("AptPackageDeploy", level="WARNING"):
+            apt_deploy._extract_packages(self.appdir_path, packages)
+
+        self.assertEqual(
+            "perl", (self.appdir_path / "usr/share/doc/common").read_text()
+        )
@@ -0,0 +1,109 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import pickle
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.apt.package_index import PackageIndex
+
+PACKAGES_INDEX = """\
+Package: perl
+Version: 5.32.1-4+deb11u2
+Architecture: amd64
+Depends: perl-base (= 5.32.1-4+deb11u2),
+ libperl5.32 (= 5.32.1-4+deb11u2)
+Description: Larry Wall's Practical Extraction and Report Language
+ continuation line
+
+Package: perl-base
+Version: 5.32.1-4+deb11u2
+Architecture: amd64
+Provides: perlapi-5.32.1
+
+Package: perl-doc
+Version: 5.32.1-4+deb11u2
+Architecture: all
+"""
+
+
+class TestPackageIndex(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.lists_path = (
+            pathlib.Path(self.temp_dir.name) / "example.org_dists_main_Packages"
+        )
+        self.lists_path.write_text(PACKAGES_INDEX)
+        self.cache_path = pathlib.Path(self.temp_dir.name) / "packages.cache"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_from_lists(self):
+        index = PackageIndex.from_lists([self.lists_path])
+
+        self.assertEqual(3, len(index))
+        perl = index.get("perl")[0]
+        self.assertEqual("5.32.1-4+deb11u2", perl.version)
+        self.assertEqual(
+            "perl-base (= 5.32.1-4+deb11u2), libperl5.32 (= 5.32.1-4+deb11u2)",
+            perl.depends,
+        )
+        self.assertEqual(
+            ["perl-base"], [r.name for r, _ in index.get_providers("perlapi-5.32.1")]
+        )
+
+    def test_search_names(self):
+        index = PackageIndex.from_lists([self.lists_path])
+
+        self.assertEqual(["perl"], index.search_names(["perl"]))
+        self.assertEqual(
+            ["perl", "perl-base", "perl-doc"], sorted(index.search_names(["perl*"]))
+        )
+        self.assertEqual([], index.search_names(["missing"]))
+
+    def test_search_packages(self):
+        index = PackageIndex.from_lists([self.lists_path])
+
+        records = index.search_packages(["perl-*:amd64"], ["amd64"])
+        self.assertEqual(["perl-base", "perl-doc"], sorted(r.name for r in records))
+
+        records = index.search_packages(["perl=1.0"], ["amd64"])
+        self.assertEqual([], records)
+
+    def test_load_uses_cache(self):
+        index = PackageIndex.load([self.lists_path], self.cache_path)
+        self.assertEqual(3, len(index))
+        self.assertTrue(self.cache_path.exists())
+
+        # alter the cached records to make sure they are the ones loaded
+        with open(self.cache_path, "rb") as f:
+            data = pickle.load(f)
+        data["records"] = data["records"][:1]
+        with open(self.cache_path, "wb") as f:
+            pickle.dump(data, f)
+
+        index = PackageIndex.load([self.lists_path], self.cache_path)
+        self.assertEqual(1, len(index))
+
+    def test_load_discards_outdated_cache(self):
+        PackageIndex.load([self.lists_path], self.cache_path)
+
+        self.lists_path.write_text(PACKAGES_INDEX.split("\n\n")[0])
+        index = PackageIndex.load([self.lists_path], self.cache_path)
+        self.assertEqual(["perl"], list(index.names()))
+
+    def test_load_ignores_corrupted_cache(self):
+        self.cache_path.write_bytes(b"garbage")
+
+        index = PackageIndex.load([self.lists_path], self.cache_path)
+        self.assertEqual(3, len(index))
@@ -0,0 +1,153 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.apt.errors import AptDeployError
+from appimagebuilder.modules.deploy.apt.package import Package, compare_versions
+from appimagebuilder.modules.deploy.apt.package_index import PackageIndex
+from appimagebuilder.modules.deploy.apt.resolver import Resolver
+
+PACKAGES_INDEX = """\
+Package: libc6
+Version: 2.31-13
+Architecture: amd64
+Multi-Arch: same
+
+Package: libc6
+Version: 2.31-13+deb11u5
+Architecture: amd64
+Multi-Arch: same
+
+Package: libc6
+Version: 2.31-13+deb11u5
+Architecture: i386
+Multi-Arch: same
+
+Package: libfoo1
+Version: 1.0-1
+Architecture: amd64
+Multi-Arch: same
+Depends: libc6 (>= 2.28), mail-transport-agent | default-mta
+Description: test package
+ continuation line
+
+Package: foo-data
+Version: 1.0-1
+Architecture: all
+Multi-Arch: foreign
+
+Package: foo
+Version: 1.0-1
+Architecture: amd64
+Pre-Depends: foo-data
+Depends: libfoo1 (= 1.0-1),
+ python3:any
+
+Package: python3
+Version: 3.9.2-3
+Architecture: i386
+Multi-Arch: allowed
+
+Package: postfix
+Version: 3.5.6-1
+Architecture: amd64
+Provides: mail-transport-agent
+"""
+
+
+class TestResolver(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        lists_path = pathlib.Path(cls.temp_dir.name) / "example.org_dists_main_Packages"
+        lists_path.write_text(PACKAGES_INDEX)
+
+        cls.index = PackageIndex.from_lists([lists_path])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self) -> None:
+        self.resolver = Resolver(self.index, ["amd64", "i386"])
+
+    def test_search_packages(self):
+        packages = self.resolver.search_packages(["libc6"])
+        self.assertEqual(3, len(packages))
+
+        packages = self.resolver.search_packages(["libc6:i386"])
+        self.assertEqual([Package("libc6", "2.31-13+deb11u5", "i386")], packages)
+
+        packages = self.resolver.search_packages(["foo*"])
+        self.assertEqual({"foo", "foo-data"}, {package.name for package in packages})
+
+    def test_resolve_packages(self):
+        packages = self.resolver.resolve_packages(["foo"])
+
+        self.assertCountEqual(
+            [
+                Package("foo", "1.0-1", "amd64"),
+                Package("foo-data", "1.0-1", "all"),
+                Package("libfoo1", "1.0-1", "amd64"),
+                Package("libc6", "2.31-13+deb11u5", "amd64"),
+                Package("python3", "3.9.2-3", "i386"),
+                Package("postfix", "3.5.6-1", "amd64"),
+            ],
+            packages,
+        )
+
+    def test_resolve_packages_with_installed(self):
+        installed = [Package("libc6", "2.31-13", "amd64")]
+        packages = self.resolver.resolve_packages(["libfoo1"], installed)
+
+        self.assertCountEqual(
+            [
+                Package("libfoo1", "1.0-1", "amd64"),
+                Package("postfix", "3.5.6-1", "amd64"),
+            ],
+            packages,
+        )
+
+    def test_resolve_packages_provided_by_selected(self):
+        # postfix satisfies the mail-transport-agent dependency of libfoo1
+        packages = self.resolver.resolve_packages(["postfix", "libfoo1"])
+
+        self.assertCountEqual(
+            [
+                Package("postfix", "3.5.6-1", "amd64"),
+                Package("libfoo1", "1.0-1", "amd64"),
+                Package("libc6", "2.31-13+deb11u5", "amd64"),
+            ],
+            packages,
+        )
+
+    def test_resolve_packages_with_arch(self):
+        packages = self.resolver.resolve_packages(["libc6:i386"])
+
+        self.assertEqual([Package("libc6", "2.31-13+deb11u5", "i386")], packages)
+
+    def test_resolve_unknown_package(self):
+        self.assertRaises(
+            AptDeployError, self.resolver.resolve_packages, ["missing-package"]
+        )
+
+
+class TestCompareVersions(TestCase):
+    def test_compare_versions(self):
+        self.assertEqual(0, compare_versions("1.0-1", "1.0-1"))
+        self.assertLess(compare_versions("1.0~rc1", "1.0"), 0)
+        self.assertGreater(compare_versions("1:0.1", "2.0"), 0)
+        self.assertGreater(compare_versions("2.31-13+deb11u5", "2.31-13"), 0)
+        self.assertGreater(compare_versions("1.2.10", "1.2.9"), 0)
+        self.assertGreater(compare_versions("1.0a", "1.0"), 0)
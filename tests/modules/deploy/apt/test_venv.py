@@ -11,6 +11,7 @@
 #  all copies or substantial portions of the Software.
 
 import shutil
+import tempfile
 from unittest import TestCase, skipIf
 
 from appimagebuilder.modules.deploy.apt.venv import Venv
@@ -69,3 +70,32 @@ class TestVenv(TestCase):
         packages = self.apt_venv.search_packages(["tar"])
         paths = self.apt_venv.resolve_archive_paths(packages)
         self.assertTrue(paths)
+
+
+@skipIf(not shutil.which("apt-get"), reason="requires apt-get")
+class TestVenvUpdatePolicy(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.venv_path = self.temp_dir.name
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _create_venv(self, sources):
+        return Venv(self.venv_path, sources, [], ["amd64"])
+
+    def test_update_not_required_after_update(self):
+        apt_venv = self._create_venv([])
+        self.assertTrue(apt_venv.is_update_required(3600))
+
+        apt_venv.update()
+        self.assertFalse(apt_venv.is_update_required(3600))
+        self.assertTrue(apt_venv.is_update_required(-1))
+
+    def test_update_required_on_sources_change(self):
+        self._create_venv([]).update()
+
+        apt_venv = self._create_venv(
+            ["deb http://deb.debian.org/debian/ bullseye main"]
+        )
+        self.assertTrue(apt_venv.is_update_required(3600))
@@ -0,0 +1,66 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.files.deploy_helper import FileDeploy
+
+
+class TestFileDeploy(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.app_dir = self.temp_path / "AppDir"
+        self.source_dir = self.temp_path / "root"
+        for path in [
+            "usr/lib/x86_64-linux-gnu/libc.so.6",
+            "usr/lib/x86_64-linux-gnu/libfoo.so.1",
+            "usr/share/app/data/file.txt",
+        ]:
+            (self.source_dir / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.source_dir / path).write_text(path)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_deploy(self):
+        FileDeploy(str(self.app_dir)).deploy(
+            [str(self.source_dir / "**/*.so*"), str(self.source_dir / "usr/share/**")]
+        )
+
+        deployed_root = self.app_dir / str(self.source_dir).lstrip("/")
+        compat_root = self.app_dir / "runtime/compat" / str(self.source_dir).lstrip("/")
+        libfoo = deployed_root / "usr/lib/x86_64-linux-gnu/libfoo.so.1"
+        self.assertEqual("usr/lib/x86_64-linux-gnu/libfoo.so.1", libfoo.read_text())
+        self.assertTrue((compat_root / "usr/lib/x86_64-linux-gnu/libc.so.6").exists())
+        self.assertFalse(
+            (deployed_root / "usr/lib/x86_64-linux-gnu/libc.so.6").exists()
+        )
+        self.assertTrue((deployed_root / "usr/share/app/data/file.txt").exists())
+
+        # files are copied, never linked
+        source = self.source_dir / "usr/lib/x86_64-linux-gnu/libfoo.so.1"
+        self.assertNotEqual(os.stat(source).st_ino, os.stat(libfoo).st_ino)
+
+    def test_resolve_deploy_prefix(self):
+        file_deploy = FileDeploy(str(self.app_dir))
+
+        self.assertEqual(
+            str(self.app_dir) + "/runtime/compat/",
+            file_deploy._resolve_deploy_prefix("/usr/lib/gconv/UTF-16.so"),
+        )
+        self.assertEqual(
+            str(self.app_dir) + "/",
+            file_deploy._resolve_deploy_prefix("/usr/lib/libfoo.so"),
+        )
@@ -0,0 +1,89 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import glob
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.files.paths_expander import expand_paths
+
+
+class TestExpandPaths(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.temp_dir.name)
+        for path in [
+            "usr/lib/x86_64-linux-gnu/libc.so.6",
+            "usr/lib/x86_64-linux-gnu/libfoo.so",
+            "usr/lib/x86_64-linux-gnu/.libhidden.so",
+            "usr/lib/x86_64-linux-gnu/gconv/UTF-16.so",
+            "usr/lib/.hidden/libc.so.6",
+            "usr/share/doc/libc6/copyright",
+            "etc/ld.so.conf.d/x86_64-linux-gnu.conf",
+        ]:
+            (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / path).touch()
+
+        os.symlink("x86_64-linux-gnu", self.root / "usr/lib/arch")
+        os.symlink("missing", self.root / "usr/lib/broken.so")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _assert_same_as_glob(self, patterns):
+        patterns = [str(self.root / pattern) for pattern in patterns]
+        expected = set()
+        for pattern in patterns:
+            expected.update(glob.glob(pattern, recursive=True))
+        self.assertEqual(expected, expand_paths(patterns))
+
+    def test_recursive_patterns(self):
+        self._assert_same_as_glob(
+            [
+                "**/libc.so*",
+                "**/gconv/*",
+                "usr/lib/**/*.so",
+                "usr/*/x86*/**/lib*",
+                "**/doc/libc6/*",
+                "**/broken*",
+                "**/lib[a-f]*.so",
+                "**/lib[!a-f]*",
+                "**/**/UTF-1?.so",
+            ]
+        )
+
+    def test_recursive_pattern_matching_the_base_dir(self):
+        self._assert_same_as_glob(["usr/**"])
+
+    def test_trailing_recursive_pattern(self):
+        # dirs matched before a trailing `**` are listed with a trailing separator
+        self._assert_same_as_glob(["**/lib/**"])
+        self._assert_same_as_glob(["usr/lib/*/**"])
+        self._assert_same_as_glob(["**/doc/*/**", "**/gconv/**"])
+
+    def test_hidden_entries(self):
+        self._assert_same_as_glob(["**/.hidden/*", "usr/lib/**/.libhidden.so"])
+
+    def test_non_recursive_patterns(self):
+        self._assert_same_as_glob(["etc/ld.so.conf.d/*", "usr/lib/arch", "missing"])
+
+    def test_symlink_loops(self):
+        os.symlink("../..", self.root / "usr/lib/loop")
+
+        self.assertEqual(
+            {
+                str(self.root / "usr/lib/x86_64-linux-gnu/libc.so.6"),
+                str(self.root / "usr/lib/arch/libc.so.6"),
+            },
+            expand_paths([str(self.root / "**/libc.so*")]),
+        )
@@ -22,10 +22,14 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 
+import io
 import shutil
+import tarfile
+import tempfile
 from pathlib import Path
 from unittest import TestCase, skipIf
 
+from appimagebuilder.modules.deploy.pacman.package_archive import PackageArchive
 from appimagebuilder.modules.deploy.pacman.venv import Venv
 from appimagebuilder.modules.deploy.pacman.deploy import Deploy
 
@@ -57,3 +61,81 @@ class TestDeploy(TestCase):
 
         self.assertTrue(next(self.appdir_path.glob("usr")))
         self.assertTrue(next(self.appdir_path.glob("runtime/compat/usr")))
+
+
+def _write_package(path: Path, name: str, files: {str: bytes}):
+    with tarfile.open(path, mode="w:gz") as tar:
+        for file_name, content in [
+            (".PKGINFO", b"pkgname = %s\npkgver = 1.0-1\n" % name.encode()),
+            *files.items(),
+        ]:
+            info = tarfile.TarInfo(file_name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return str(path)
+
+
+class _LocalVenv:
+    """Serves already downloaded packages, pacman is not required"""
+
+    def __init__(self, package_files):
+        self.package_files = package_files
+
+    def is_update_required(self, max_age):
+        return False
+
+    def retrieve(self, packages, excluded_packages=None):
+        return self.package_files
+
+    def read_package_data(self, file):
+        return PackageArchive(file).read_info()
+
+    def extract(self, file, target):
+        return PackageArchive(file).extract(target)
+
+
+class TestDeployMerge(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.appdir_path = self.temp_path / "AppDir"
+        self.package_files = [
+            _write_package(
+                self.temp_path / "app.pkg.tar.gz",
+                "app",
+                {"usr/bin/app": b"app", "usr/share/doc/README": b"app"},
+            ),
+            _write_package(
+                self.temp_path / "lib.pkg.tar.gz",
+                "lib",
+                {"usr/lib/libx.so": b"lib", "usr/share/doc/README": b"lib"},
+            ),
+            _write_package(
+                self.temp_path / "glibc.pkg.tar.gz",
+                "glibc",
+                {"usr/lib/libc.so.6": b"libc"},
+            ),
+        ]
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_deploy(self):
+        deploy = Deploy(_LocalVenv(self.package_files))
+        deployed_packages = deploy.deploy(["app"], self.appdir_path)
+
+        self.assertEqual(["app=1.0-1", "lib=1.0-1", "glibc=1.0-1"], deployed_packages)
+        self.assertEqual(b"app", (self.appdir_path / "usr/bin/app").read_bytes())
+        self.assertEqual(b"lib", (self.appdir_path / "usr/lib/libx.so").read_bytes())
+        # files shipped by more than one package are taken from the last one
+        self.assertEqual(
+            b"lib", (self.appdir_path / "usr/share/doc/README").read_bytes()
+        )
+        self.assertTrue(
+            (self.appdir_path / "runtime/compat/usr/lib/libc.so.6").exists()
+        )
+        # the staging dirs are removed
+        self.assertEqual(
+            ["AppDir", "app.pkg.tar.gz", "glibc.pkg.tar.gz", "lib.pkg.tar.gz"],
+            sorted(path.name for path in self.temp_path.iterdir()),
+        )
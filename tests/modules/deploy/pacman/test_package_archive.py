@@ -0,0 +1,115 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import io
+import os
+import pathlib
+import shutil
+import subprocess
+import tarfile
+import tempfile
+from unittest import TestCase, skipIf
+
+from appimagebuilder.modules.deploy import tar_stream
+from appimagebuilder.modules.deploy.pacman.package_archive import (
+    PackageArchive,
+    PackageArchiveError,
+)
+
+PKGINFO = b"""# Generated by makepkg
+pkgname = app
+pkgbase = app
+pkgver = 1.0-2
+pkgdesc = An application
+depend = glibc
+"""
+
+
+def _add_file(tar, name, content: bytes, mode=0o644):
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    info.mode = mode
+    tar.addfile(info, io.BytesIO(content))
+
+
+def _write_package(path, compression="xz"):
+    with tarfile.open(path, mode="w:%s" % compression) as tar:
+        _add_file(tar, ".PKGINFO", PKGINFO)
+        _add_file(tar, ".BUILDINFO", b"format = 2\n")
+        _add_file(tar, ".MTREE", b"")
+
+        dir_info = tarfile.TarInfo("usr/bin")
+        dir_info.type = tarfile.DIRTYPE
+        dir_info.mode = 0o755
+        tar.addfile(dir_info)
+
+        _add_file(tar, "usr/bin/app", b"#!/bin/sh\n", 0o755)
+
+        link_info = tarfile.TarInfo("usr/bin/app-link")
+        link_info.type = tarfile.SYMTYPE
+        link_info.linkname = "app"
+        tar.addfile(link_info)
+    return path
+
+
+class TestPackageArchive(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_read_info(self):
+        for compression in ["xz", "gz", "bz2"]:
+            path = _write_package(self.temp_path / ("app.pkg.tar.%s" % compression))
+            self.assertEqual(("app", "1.0-2"), PackageArchive(path).read_info())
+
+    def test_read_info_missing_pkginfo(self):
+        path = self.temp_path / "app.pkg.tar"
+        with tarfile.open(path, mode="w") as tar:
+            _add_file(tar, "usr/bin/app", b"")
+
+        self.assertRaises(PackageArchiveError, PackageArchive(path).read_info)
+
+    def test_read_info_not_a_package(self):
+        path = self.temp_path / "app.pkg.tar.xz"
+        path.write_bytes(b"\xfd7zXZ\x00garbage")
+
+        self.assertRaises(PackageArchiveError, PackageArchive(path).read_info)
+
+    def test_extract(self):
+        path = _write_package(self.temp_path / "app.pkg.tar.xz")
+        target = self.temp_path / "AppDir"
+
+        files = PackageArchive(path).extract(target)
+
+        self.assertEqual(["usr/bin/app", "usr/bin/app-link"], files)
+        self.assertTrue(os.access(target / "usr/bin/app", os.X_OK))
+        self.assertEqual("app", os.readlink(target / "usr/bin/app-link"))
+        self.assertEqual(["usr"], os.listdir(target))
+
+    @skipIf(not shutil.which("zstd"), reason="requires zstd")
+    def test_zstd_fallback(self):
+        tar_path = _write_package(self.temp_path / "app.pkg.tar", "")
+        path = self.temp_path / "app.pkg.tar.zst"
+        subprocess.run(["zstd", "-q", str(tar_path), "-o", str(path)], check=True)
+
+        original_zstandard = tar_stream.zstandard
+        tar_stream.zstandard = None
+        try:
+            archive = PackageArchive(path)
+            self.assertEqual(("app", "1.0-2"), archive.read_info())
+            files = archive.extract(self.temp_path / "AppDir")
+        finally:
+            tar_stream.zstandard = original_zstandard
+
+        self.assertEqual(["usr/bin/app", "usr/bin/app-link"], files)
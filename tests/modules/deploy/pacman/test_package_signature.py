@@ -0,0 +1,95 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase, skipIf
+
+from appimagebuilder.modules.deploy.pacman.package_signature import (
+    PackageSignatureError,
+    PackageSignatureVerifier,
+)
+
+
+@skipIf(not shutil.which("gpg"), "gpg is required")
+class TestPackageSignatureVerifier(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.gpg_dir = self.temp_path / "gnupg"
+        self.gpg_dir.mkdir(mode=0o700)
+        self._gpg("--passphrase", "", "--quick-gen-key", "Packager <p@example.com>")
+
+        self.package_path = self.temp_path / "app-1.0-1-x86_64.pkg.tar.zst"
+        self.package_path.write_bytes(b"package contents")
+        self.signature = self._gpg(
+            "--detach-sign", "--output", "-", str(self.package_path)
+        )
+        self.verifier = PackageSignatureVerifier(self.gpg_dir)
+
+    def tearDown(self) -> None:
+        subprocess.run(
+            ["gpgconf", "--homedir", str(self.gpg_dir), "--kill", "gpg-agent"],
+            stderr=subprocess.DEVNULL,
+        )
+        self.temp_dir.cleanup()
+
+    def _gpg(self, *args) -> bytes:
+        return subprocess.run(
+            ["gpg", "--homedir", str(self.gpg_dir), "--batch", "--yes", *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        ).stdout
+
+    def test_verify(self):
+        self.verifier.verify(self.package_path, self.signature)
+
+    def test_verify_modified_package(self):
+        self.package_path.write_bytes(b"tampered contents")
+
+        self.assertRaises(
+            PackageSignatureError,
+            self.verifier.verify,
+            self.package_path,
+            self.signature,
+        )
+
+    def test_verify_unknown_key(self):
+        verifier = PackageSignatureVerifier(self.temp_path)
+
+        self.assertRaises(
+            PackageSignatureError, verifier.verify, self.package_path, self.signature
+        )
+
+    def test_verify_untrusted_key(self):
+        fingerprint = self._gpg("--with-colons", "--list-keys").decode()
+        fingerprint = [
+            line.split(":")[9]
+            for line in fingerprint.splitlines()
+            if line.startswith("fpr:")
+        ][0]
+        subprocess.run(
+            ["gpg", "--homedir", str(self.gpg_dir), "--batch", "--import-ownertrust"],
+            input=("%s:2:\n" % fingerprint).encode(),
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+
+        self.assertRaisesRegex(
+            PackageSignatureError,
+            "untrusted key",
+            self.verifier.verify,
+            self.package_path,
+            self.signature,
+        )
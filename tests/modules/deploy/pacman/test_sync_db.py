@@ -0,0 +1,169 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import io
+import pathlib
+import tarfile
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.pacman.sync_db import (
+    PackageRecord,
+    Relation,
+    Resolver,
+    SyncDatabase,
+    SyncDbError,
+    compare_versions,
+)
+
+
+def _desc(name, version, depends=(), provides=(), groups=()):
+    fields = [
+        ("NAME", [name]),
+        ("VERSION", [version]),
+        ("FILENAME", ["%s-%s-x86_64.pkg.tar.zst" % (name, version)]),
+        ("CSIZE", ["1024"]),
+        ("SHA256SUM", ["0" * 64]),
+        ("PGPSIG", ["c2lnbmF0dXJl"]),
+        ("DEPENDS", list(depends)),
+        ("PROVIDES", list(provides)),
+        ("GROUPS", list(groups)),
+    ]
+    return "".join(
+        "%%%s%%\n%s\n\n" % (key, "\n".join(values)) for key, values in fields if values
+    )
+
+
+def _write_db(path, packages):
+    with tarfile.open(path, mode="w:gz") as tar:
+        for name, version, kwargs in packages:
+            content = _desc(name, version, **kwargs).encode()
+            info = tarfile.TarInfo("%s-%s/desc" % (name, version))
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return path
+
+
+def _record(name, version="1.0-1", repository="core", **kwargs):
+    return PackageRecord(name, version, repository, "%s.pkg.tar.zst" % name, **kwargs)
+
+
+class TestCompareVersions(TestCase):
+    def test_compare_versions(self):
+        self.assertEqual(0, compare_versions("1.0-1", "1.0-1"))
+        self.assertEqual(-1, compare_versions("1.0-1", "1.0.1-1"))
+        self.assertEqual(-1, compare_versions("1.0alpha-1", "1.0-1"))
+        self.assertEqual(-1, compare_versions("1.0-2", "1.0-10"))
+        self.assertEqual(1, compare_versions("1:1.0-1", "2.0-1"))
+        # releases are ignored when missing in one of the sides
+        self.assertEqual(0, compare_versions("1.0", "1.0-3"))
+
+    def test_relation(self):
+        relation = Relation.parse("glibc>=2.35")
+        self.assertEqual(
+            ("glibc", ">=", "2.35"), (relation.name, relation.op, relation.version)
+        )
+        self.assertTrue(relation.is_satisfied_by("2.36-1"))
+        self.assertFalse(relation.is_satisfied_by("2.34-2"))
+
+        relation = Relation.parse("sh: for scripts")
+        self.assertEqual(("sh", None), (relation.name, relation.op))
+
+
+class TestSyncDatabase(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.paths = [
+            _write_db(
+                self.temp_path / "core.db",
+                [
+                    ("glibc", "2.36-1", {}),
+                    ("bash", "5.1-1", {"depends": ["glibc"], "provides": ["sh"]}),
+                ],
+            ),
+            _write_db(
+                self.temp_path / "extra.db",
+                [("bash", "5.2-1", {}), ("app", "1.0-1", {"groups": ["apps"]})],
+            ),
+        ]
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_from_files(self):
+        database = SyncDatabase.from_files(self.paths)
+
+        self.assertEqual(4, len(database))
+        bash = database.get("bash")
+        self.assertEqual(("5.1-1", "core"), (bash.version, bash.repository))
+        self.assertEqual("5.2-1", database.get("bash", "extra").version)
+        self.assertEqual(("glibc",), bash.depends)
+        self.assertEqual(1024, bash.size)
+        self.assertEqual("c2lnbmF0dXJl", bash.pgpsig)
+        self.assertEqual("bash-5.1-1-x86_64.pkg.tar.zst", bash.file_name)
+        self.assertEqual([bash], [record for record, _ in database.get_providers("sh")])
+        self.assertEqual(
+            ["app"], [record.name for record in database.get_group("apps")]
+        )
+
+    def test_load_cache(self):
+        cache_path = self.temp_path / "sync-db.cache"
+        SyncDatabase.load(self.paths, cache_path)
+        self.assertTrue(cache_path.exists())
+
+        database = SyncDatabase.load(self.paths, cache_path)
+        self.assertEqual("5.1-1", database.get("bash").version)
+
+    def test_malformed_database(self):
+        path = self.temp_path / "broken.db"
+        path.write_bytes(b"\x1f\x8bnot a database")
+
+        self.assertRaises(SyncDbError, SyncDatabase.from_files, [path])
+
+
+class TestResolver(TestCase):
+    def setUp(self) -> None:
+        self.database = SyncDatabase(
+            [
+                _record("glibc", "2.36-1"),
+                _record(
+                    "bash", "5.1-1", depends=["glibc", "readline>=8.0"], provides=["sh"]
+                ),
+                _record("readline", "8.1-1", depends=["glibc"]),
+                _record("app", depends=["sh", "libfoo.so=1-64", "ncurses"]),
+                _record("foo", provides=["libfoo.so=1-64"]),
+                _record("ncurses", depends=["glibc"]),
+            ]
+        )
+        self.resolver = Resolver(self.database)
+
+    def _resolve(self, targets, excluded=None):
+        return [record.name for record in self.resolver.resolve(targets, excluded)]
+
+    def test_resolve(self):
+        self.assertEqual(
+            ["app", "bash", "foo", "ncurses", "glibc", "readline"],
+            self._resolve(["app"]),
+        )
+
+    def test_resolve_excluded(self):
+        self.assertEqual(
+            ["app", "foo", "ncurses"], self._resolve(["app"], ["bash", "glibc"])
+        )
+
+    def test_resolve_unsatisfied_version(self):
+        self.database.add(_record("old", depends=["glibc>=3.0"]))
+
+        self.assertRaises(SyncDbError, self.resolver.resolve, ["old"])
+
+    def test_resolve_missing_target(self):
+        self.assertRaises(SyncDbError, self.resolver.resolve, ["missing"])
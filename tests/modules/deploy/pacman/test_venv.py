@@ -23,10 +23,11 @@
 #  all copies or substantial portions of the Software.
 
 import shutil
+import tempfile
 from pathlib import Path
 from unittest import TestCase, skipIf
 
-from appimagebuilder.modules.deploy.pacman.venv import Venv
+from appimagebuilder.modules.deploy.pacman.venv import Venv, read_config_servers
 
 
 @skipIf(not shutil.which("pacman"), reason="requires pacman")
@@ -70,3 +71,76 @@ class TestVenv(TestCase):
             ["bash"], ["tzdata", "filesystem", "linux-api-headers"]
         )
         self.assertTrue(self.pacman_venv.read_package_data(files[0]))
+
+
+class TestReadConfigServers(TestCase):
+    def test_read_config_servers(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            mirror_list = temp_path / "mirrorlist"
+            mirror_list.write_text(
+                "# mirrors\n"
+                "Server = https://mirror.one/$repo/os/$arch\n"
+                "#Server = https://disabled/$repo/os/$arch\n"
+                "Server = https://mirror.two/$repo/os/$arch\n"
+            )
+            config = temp_path / "pacman.conf"
+            config.write_text(
+                "[options]\n"
+                "Architecture = auto\n"
+                "Include = %s\n"
+                "[core]\n"
+                "Include = %s\n"
+                "[custom]\n"
+                "Server = file:///srv/custom\n" % (mirror_list, mirror_list)
+            )
+
+            servers = read_config_servers(config)
+
+        self.assertEqual(["core", "custom"], list(servers))
+        self.assertEqual(
+            [
+                "https://mirror.one/$repo/os/$arch",
+                "https://mirror.two/$repo/os/$arch",
+            ],
+            servers["core"],
+        )
+        self.assertEqual(["file:///srv/custom"], servers["custom"])
+
+
+@skipIf(not shutil.which("pacman"), reason="requires pacman")
+class TestVenvFreshness(TestCase):
+    repositories = {"core": ["https://mirror.rackspace.com/archlinux/$repo/os/$arch"]}
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.venv_path = Path(self.temp_dir.name) / "pacman"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _create_venv(self, repositories):
+        return Venv(self.venv_path, repositories=repositories, architecture="auto")
+
+    def test_update_not_required_after_update(self):
+        pacman_venv = self._create_venv(self.repositories)
+        self.assertTrue(pacman_venv.is_update_required(3600))
+
+        pacman_venv.update()
+        self.assertFalse(pacman_venv.is_update_required(3600))
+        self.assertTrue(pacman_venv.is_update_required(-1))
+
+    def test_update_required_on_repositories_change(self):
+        self._create_venv(self.repositories).update()
+
+        repositories = dict(self.repositories)
+        repositories["extra"] = self.repositories["core"]
+        self.assertTrue(self._create_venv(repositories).is_update_required(3600))
+
+    def test_keyring_populated_once(self):
+        self._create_venv(self.repositories)
+        stamp_path = self.venv_path / "gnupg" / "keyring.stamp"
+        stamp_time = stamp_path.stat().st_mtime_ns
+
+        self._create_venv(self.repositories)
+        self.assertEqual(stamp_time, stamp_path.stat().st_mtime_ns)
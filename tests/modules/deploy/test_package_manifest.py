@@ -0,0 +1,61 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.package_manifest import PackageManifest
+
+
+class TestPackageManifest(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app_dir = pathlib.Path(self.temp_dir.name)
+
+        self.manifest = PackageManifest(self.app_dir, "apt")
+        self._deploy("foo=1.0", ["usr/lib/libfoo.so.1", "usr/share/foo/data"])
+        self._deploy("bar=1.0", ["usr/lib/libbar.so.1", "usr/share/doc/copyright"])
+        self._deploy("baz=1.0", ["usr/share/doc/copyright"])
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _deploy(self, package_id, files):
+        for file in files:
+            path = self.app_dir / file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+        self.manifest.set_files(package_id, files)
+
+    def test_save_and_load(self):
+        self.manifest.save()
+
+        manifest = PackageManifest(self.app_dir, "apt")
+        manifest.load()
+        self.assertEqual(self.manifest.packages, manifest.packages)
+
+    def test_is_deployed(self):
+        self.assertTrue(self.manifest.is_deployed("foo=1.0"))
+        self.assertFalse(self.manifest.is_deployed("foo=2.0"))
+
+        (self.app_dir / "usr/share/foo/data").unlink()
+        self.assertFalse(self.manifest.is_deployed("foo=1.0"))
+
+    def test_remove_packages_except(self):
+        self.manifest.remove_packages_except(["baz=1.0"])
+
+        self.assertEqual(["baz=1.0"], list(self.manifest.packages))
+        self.assertFalse((self.app_dir / "usr/lib/libfoo.so.1").exists())
+        self.assertFalse((self.app_dir / "usr/share/foo").exists())
+        # files shipped by kept packages are preserved
+        self.assertTrue((self.app_dir / "usr/share/doc/copyright").exists())
+        self.assertTrue(self.app_dir.exists())
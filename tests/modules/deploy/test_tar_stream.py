@@ -0,0 +1,99 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import io
+import os
+import pathlib
+import stat
+import tarfile
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy import tar_stream
+
+
+def _write_tar(path, members):
+    with tarfile.open(path, mode="w") as tar:
+        for name, kind, value in members:
+            info = tarfile.TarInfo(name)
+            info.mtime = 1000000
+            if kind == "dir":
+                info.type = tarfile.DIRTYPE
+                info.mode = value
+                tar.addfile(info)
+            elif kind == "symlink":
+                info.type = tarfile.SYMTYPE
+                info.linkname = value
+                tar.addfile(info)
+            else:
+                info.size = len(value)
+                info.mode = 0o755
+                tar.addfile(info, io.BytesIO(value))
+    return path
+
+
+class TestExtractMembers(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.target = self.temp_path / "target"
+        self.target.mkdir()
+        self.outside = self.temp_path / "outside"
+        self.outside.mkdir(mode=0o700)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _extract(self, members):
+        path = _write_tar(self.temp_path / "archive.tar", members)
+        with tarfile.open(path, mode="r|") as tar:
+            return tar_stream.extract_members(tar, str(self.target), path)
+
+    def test_extract(self):
+        files = self._extract(
+            [
+                ("usr/bin", "dir", 0o755),
+                ("usr/bin/app", "file", b"app"),
+                ("usr/bin/app-link", "symlink", "app"),
+            ]
+        )
+
+        self.assertEqual(["usr/bin/app", "usr/bin/app-link"], files)
+        app_stat = os.stat(self.target / "usr/bin/app")
+        self.assertEqual(0o755, stat.S_IMODE(app_stat.st_mode))
+        self.assertEqual(1000000, app_stat.st_mtime)
+
+    def test_refuse_members_below_archive_symlinks(self):
+        members = [
+            ("lib", "symlink", str(self.outside)),
+            ("lib/evil", "file", b"evil"),
+        ]
+
+        self.assertRaises(tar_stream.TarStreamError, self._extract, members)
+        self.assertEqual([], os.listdir(self.outside))
+
+    def test_refuse_members_below_existing_symlinks(self):
+        (self.target / "usr").symlink_to(self.outside)
+
+        self.assertRaises(
+            tar_stream.TarStreamError,
+            self._extract,
+            [("usr/bin/evil", "file", b"evil")],
+        )
+        self.assertEqual([], os.listdir(self.outside))
+
+    def test_dirs_replace_existing_symlinks(self):
+        (self.target / "usr").symlink_to(self.outside)
+
+        self._extract([("usr", "dir", 0o755)])
+
+        self.assertFalse((self.target / "usr").is_symlink())
+        self.assertEqual(0o700, stat.S_IMODE(os.stat(self.outside).st_mode))
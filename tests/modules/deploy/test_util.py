@@ -0,0 +1,68 @@
+#   Copyright  2022 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.util import merge_tree
+
+
+class TestMergeTree(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.source = self.temp_path / "source"
+        self.appdir = self.temp_path / "AppDir"
+        self.host = self.temp_path / "host"
+        for path in [self.source / "lib", self.appdir / "usr" / "lib", self.host]:
+            path.mkdir(parents=True)
+        (self.source / "lib" / "libfoo.so").write_text("foo")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_merge_tree_follows_relative_links(self):
+        (self.appdir / "lib").symlink_to("usr/lib")
+
+        merge_tree(self.source, self.appdir, "foo", {})
+
+        self.assertTrue((self.appdir / "lib").is_symlink())
+        self.assertEqual("foo", (self.appdir / "usr/lib/libfoo.so").read_text())
+
+    def test_merge_tree_replaces_absolute_links(self):
+        (self.appdir / "lib").symlink_to(self.host)
+
+        with self.assertLogs("Deploy", level="WARNING"):
+            merge_tree(self.source, self.appdir, "foo", {})
+
+        self.assertFalse((self.appdir / "lib").is_symlink())
+        self.assertEqual("foo", (self.appdir / "lib/libfoo.so").read_text())
+        self.assertEqual([], list(self.host.iterdir()))
+
+    def test_merge_tree_replaces_links_escaping_the_root(self):
+        (self.appdir / "lib").symlink_to("../host")
+
+        with self.assertLogs("Deploy", level="WARNING"):
+            merge_tree(self.source, self.appdir, "foo", {})
+
+        self.assertFalse((self.appdir / "lib").is_symlink())
+        self.assertEqual([], list(self.host.iterdir()))
+
+    def test_merge_tree_root(self):
+        compat = self.appdir / "runtime" / "compat"
+        compat.mkdir(parents=True)
+        (compat / "lib").symlink_to("../../usr/lib")
+
+        merge_tree(self.source, compat, "foo", {}, root=self.appdir)
+
+        self.assertTrue((compat / "lib").is_symlink())
+        self.assertTrue((self.appdir / "usr/lib/libfoo.so").exists())
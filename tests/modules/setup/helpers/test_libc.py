@@ -0,0 +1,61 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase, skipIf
+
+from appimagebuilder.modules.setup.helpers.libc import LibC
+from appimagebuilder.utils.finder import Finder
+
+
+@skipIf(
+    not shutil.which("bash") or not shutil.which("patchelf"),
+    "bash and patchelf are required",
+)
+class TestLibC(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app_dir = pathlib.Path(self.temp_dir.name)
+        self.bin_path = self.app_dir / "usr" / "bin" / "bash"
+        self.bin_path.parent.mkdir(parents=True)
+        shutil.copy2(shutil.which("bash"), self.bin_path)
+        self.interpreter = (
+            subprocess.run(
+                ["patchelf", "--print-interpreter", str(self.bin_path)],
+                stdout=subprocess.PIPE,
+                check=True,
+            )
+            .stdout.decode()
+            .strip()
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _patch_executables_interpreter(self):
+        libc = LibC(self.app_dir, Finder(self.app_dir))
+        libc._patch_executables_interpreter([])
+        return libc
+
+    def test_patch_executables_interpreter(self):
+        libc = self._patch_executables_interpreter()
+
+        self.assertEqual({self.interpreter.lstrip("/")}, libc.interpreters)
+
+    def test_already_relative_interpreter(self):
+        # binaries kept from a previous build are already patched
+        self._patch_executables_interpreter()
+
+        libc = self._patch_executables_interpreter()
+        self.assertEqual({self.interpreter.lstrip("/")}, libc.interpreters)
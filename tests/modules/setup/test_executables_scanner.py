@@ -21,10 +21,17 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import pathlib
+import shutil
 import tempfile
 from unittest import TestCase
 
+from appimagebuilder.modules.setup.executables import (
+    BinaryExecutable,
+    InterpretedExecutable,
+)
 from appimagebuilder.modules.setup.executables_scanner import ExecutablesScanner
+from appimagebuilder.utils.finder import Finder
 
 
 class TestExecutablesScanner(TestCase):
@@ -61,3 +68,57 @@ class TestExecutablesScanner(TestCase):
 
             shebang = ExecutablesScanner.read_shebang(shebang_script.name)
             self.assertEqual(shebang, ["/usr/bin/env", "/bin/bash"])
+
+
+class CountingFinder(Finder):
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self.lookups = []
+
+    def find_one(self, pattern="*", check_true: [] = None, check_false: [] = None):
+        self.lookups.append(pattern)
+        return super().find_one(pattern, check_true, check_false)
+
+
+class TestExecutablesScannerScanFiles(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app_dir = pathlib.Path(self.temp_dir.name)
+        bin_dir = self.app_dir / "usr" / "bin"
+        bin_dir.mkdir(parents=True)
+        shutil.copy(shutil.which("bash"), bin_dir / "bash")
+
+        self.scripts = []
+        for name in ["c", "a", "b"]:
+            path = bin_dir / name
+            path.write_text("#!/bin/bash\necho %s\n" % name)
+            path.chmod(0o755)
+            self.scripts.append(path)
+        self.broken_script = bin_dir / "broken"
+        self.broken_script.write_text("#!/usr/bin/python3\n")
+
+        self.finder = CountingFinder(self.app_dir)
+        self.scanner = ExecutablesScanner(self.app_dir, self.finder)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_scan_files(self):
+        files = [*self.scripts, self.broken_script, self.app_dir / "usr/bin/bash"]
+        executables = self.scanner.scan_files(files)
+
+        # every script followed by its interpreter, in the given order
+        expected = []
+        for script in self.scripts:
+            expected.extend([script, "bash"])
+        expected.append("bash")
+        self.assertEqual(
+            expected,
+            [
+                e.path if isinstance(e, InterpretedExecutable) else "bash"
+                for e in executables
+            ],
+        )
+        self.assertIsInstance(executables[0].interpreter, BinaryExecutable)
+        # each interpreter is looked up once
+        self.assertEqual(["bash", "python3"], sorted(self.finder.lookups))
@@ -0,0 +1,55 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.setup.generator import RuntimeGenerator
+
+
+class TestRuntimeGenerator(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.appdir_path = pathlib.Path(self.temp_dir.name) / "AppDir"
+        self.appdir_path.mkdir()
+
+        # only the paths are required to link the interpreters
+        self.generator = object.__new__(RuntimeGenerator)
+        self.generator.appdir_path = self.appdir_path
+        self.generator.default_runtime_path = self.appdir_path / "runtime" / "default"
+        self.generator.compat_runtime_path = self.appdir_path / "runtime" / "compat"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_link_interpreters_from_runtimes_rerun(self):
+        interpreters = {str(self.appdir_path / "usr/bin/script"): "bin/sh"}
+        self.generator._link_interpreters_from_runtimes(interpreters)
+        self.generator._link_interpreters_from_runtimes(interpreters)
+
+        for runtime in ["default", "compat"]:
+            link = self.appdir_path / "runtime" / runtime / "bin/sh"
+            self.assertEqual("/bin/sh", os.readlink(link))
+
+    def test_link_interpreters_from_runtimes_replaces_links(self):
+        interpreters = {str(self.appdir_path / "usr/bin/script"): "bin/sh"}
+        self.generator._link_interpreters_from_runtimes(interpreters)
+
+        # the interpreter is bundled on the next run
+        (self.appdir_path / "bin").mkdir()
+        (self.appdir_path / "bin/sh").touch()
+        self.generator._link_interpreters_from_runtimes(interpreters)
+
+        for runtime in ["default", "compat"]:
+            link = self.appdir_path / "runtime" / runtime / "bin/sh"
+            self.assertEqual("../../../bin/sh", os.readlink(link))
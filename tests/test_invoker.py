@@ -0,0 +1,321 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from appimagebuilder.build_state import BuildState
+from appimagebuilder.commands.apt_deploy import AptDeployCommand
+from appimagebuilder.commands.command import Command
+from appimagebuilder.context import Context
+from appimagebuilder.commands.pacman_deploy import PacmanDeployCommand
+from appimagebuilder.invoker import Invoker, _conflicts
+from appimagebuilder.utils.profiler import Profiler
+
+
+class FakeCommand(Command):
+    def __init__(self, context, name, inputs=None, output_file=None):
+        super().__init__(context, name)
+        self.name = name
+        self.inputs = inputs
+        self.output_file = output_file
+        self.runs = 0
+
+    def id(self):
+        return self.name
+
+    def fingerprint(self):
+        if self.inputs is None:
+            return None
+        return self._hash_inputs(self.inputs)
+
+    def __call__(self, *args, **kwargs):
+        self.runs += 1
+        self.context.record[self.name] = {"runs": self.runs}
+        if self.output_file:
+            (self.context.app_dir / self.output_file).write_text(str(self.runs))
+
+
+class FailingCommand(Command):
+    def __init__(self, context):
+        super().__init__(context, "failing")
+
+    def id(self):
+        return "failing"
+
+    def __call__(self, *args, **kwargs):
+        raise RuntimeError("failed")
+
+
+class TestIncrementalInvoker(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        app_dir = pathlib.Path(self.temp_dir.name) / "AppDir"
+        app_dir.mkdir()
+        self.context = Context(
+            pathlib.Path("AppImageBuilder.yml"),
+            None,
+            None,
+            app_dir,
+            pathlib.Path(self.temp_dir.name) / "cache",
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _build(self, commands):
+        self.context.record = {}
+        Invoker(BuildState(self.context.app_dir, self.context.cache_dir)).execute(
+            commands
+        )
+
+    def test_unchanged_commands_are_skipped(self):
+        deploy = FakeCommand(self.context, "deploy", ["pkg"], "file")
+        setup = FakeCommand(self.context, "setup", ["recipe"])
+        self._build([deploy, setup])
+        self._build([deploy, setup])
+
+        self.assertEqual(1, deploy.runs)
+        self.assertEqual(1, setup.runs)
+        # records of skipped commands are restored
+        self.assertEqual({"runs": 1}, self.context.record["deploy"])
+
+    def test_changed_command_invalidates_the_following_ones(self):
+        deploy = FakeCommand(self.context, "deploy", ["pkg"])
+        setup = FakeCommand(self.context, "setup", ["recipe"])
+        self._build([deploy, setup])
+
+        deploy.inputs = ["other-pkg"]
+        self._build([deploy, setup])
+
+        self.assertEqual(2, deploy.runs)
+        self.assertEqual(2, setup.runs)
+
+    def test_commands_without_inputs_always_run(self):
+        script = FakeCommand(self.context, "script")
+        setup = FakeCommand(self.context, "setup", ["recipe"])
+        self._build([script, setup])
+        self._build([script, setup])
+
+        self.assertEqual(2, script.runs)
+        self.assertEqual(1, setup.runs)
+
+        # the script modifies the AppDir now
+        script.output_file = "file"
+        self._build([script, setup])
+        self.assertEqual(2, setup.runs)
+
+    def test_inputs_refreshed_by_the_command(self):
+        stamp_path = pathlib.Path(self.temp_dir.name) / "update.stamp"
+
+        class UpdatingCommand(FakeCommand):
+            def fingerprint(self):
+                return self._hash_inputs(
+                    self.inputs, self._read_update_stamp(stamp_path, 3600)
+                )
+
+            def __call__(self, *args, **kwargs):
+                super().__call__(*args, **kwargs)
+                stamp_path.write_text('{"fingerprint": "x", "time": %s}' % time.time())
+
+        deploy = UpdatingCommand(self.context, "deploy", ["pkg"])
+        self._build([deploy])
+        # the stamp written by the first build is part of the stored inputs
+        self._build([deploy])
+        self.assertEqual(1, deploy.runs)
+
+        # expired stamps trigger a new run
+        stamp_path.write_text('{"fingerprint": "x", "time": 0}')
+        self._build([deploy])
+        self.assertEqual(2, deploy.runs)
+
+    def test_modified_app_dir_is_rebuilt(self):
+        setup = FakeCommand(self.context, "setup", ["recipe"])
+        self._build([setup])
+
+        (self.context.app_dir / "new-file").touch()
+        self._build([setup])
+
+        self.assertEqual(2, setup.runs)
+
+    def test_failed_build_invalidates_state(self):
+        setup = FakeCommand(self.context, "setup", ["recipe"])
+        self._build([setup])
+
+        self.assertRaises(
+            RuntimeError, self._build, [setup, FailingCommand(self.context)]
+        )
+        self.assertFalse(
+            BuildState(self.context.app_dir, self.context.cache_dir).path.exists()
+        )
+
+
+class ScheduledCommand(Command):
+    def __init__(self, context, name, events, reads=None, writes=None, action=None):
+        super().__init__(context, name)
+        self.name = name
+        self.events = events
+        self._reads = reads
+        self._writes = writes
+        self.action = action
+
+    def id(self):
+        return self.name
+
+    def reads(self):
+        return self._reads
+
+    def writes(self):
+        return self._writes
+
+    def __call__(self, *args, **kwargs):
+        self.events.append("start " + self.name)
+        if self.action:
+            self.action()
+        self.events.append("end " + self.name)
+
+
+class TestParallelInvoker(TestCase):
+    def setUp(self) -> None:
+        self.context = Context(
+            pathlib.Path("AppImageBuilder.yml"),
+            None,
+            None,
+            pathlib.Path("AppDir"),
+            pathlib.Path("cache"),
+        )
+        self.events = []
+
+    def test_independent_commands_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        commands = [
+            ScheduledCommand(
+                self.context, "a", self.events, set(), {"cache:a"}, barrier.wait
+            ),
+            ScheduledCommand(
+                self.context, "b", self.events, set(), {"cache:b"}, barrier.wait
+            ),
+        ]
+
+        # a broken barrier raises if the commands didn't run at the same time
+        Invoker(jobs=2).execute(commands)
+        self.assertEqual({"end a", "end b"}, set(self.events[2:]))
+
+    def test_conflicting_commands_keep_their_order(self):
+        commands = [
+            ScheduledCommand(self.context, "deploy", self.events, set(), {"appdir"}),
+            ScheduledCommand(self.context, "fetch", self.events, set(), {"cache"}),
+            ScheduledCommand(self.context, "setup", self.events, {"appdir"}, {"cache"}),
+            ScheduledCommand(self.context, "script", self.events),
+            ScheduledCommand(self.context, "bundle", self.events, {"appdir"}, set()),
+        ]
+        Invoker(jobs=4).execute(commands)
+
+        def index(event):
+            return self.events.index(event)
+
+        self.assertLess(index("end deploy"), index("start setup"))
+        self.assertLess(index("end fetch"), index("start setup"))
+        self.assertLess(index("end setup"), index("start script"))
+        self.assertLess(index("end script"), index("start bundle"))
+
+    def test_nested_resources(self):
+        barrier = threading.Barrier(2, timeout=5)
+        commands = [
+            ScheduledCommand(
+                self.context, "deploy", self.events, set(), {"appdir:packages"}
+            ),
+            ScheduledCommand(
+                self.context,
+                "runtime",
+                self.events,
+                {"appdir:packages"},
+                {"appdir:runtime"},
+                barrier.wait,
+            ),
+            ScheduledCommand(
+                self.context,
+                "app-info",
+                self.events,
+                {"appdir:packages"},
+                {"appdir:app-info"},
+                barrier.wait,
+            ),
+            ScheduledCommand(self.context, "bundle", self.events, {"appdir"}, set()),
+        ]
+        Invoker(jobs=4).execute(commands)
+
+        def index(event):
+            return self.events.index(event)
+
+        self.assertLess(index("end deploy"), index("start runtime"))
+        self.assertLess(index("end deploy"), index("start app-info"))
+        self.assertLess(index("end runtime"), index("start bundle"))
+        self.assertLess(index("end app-info"), index("start bundle"))
+
+    def test_package_deploys_conflict(self):
+        # both deploys merge files into the same AppDir dirs
+        apt_deploy = AptDeployCommand(self.context, ["bash"])
+        pacman_deploy = PacmanDeployCommand(self.context, ["bash"], [], "auto", {}, {})
+
+        self.assertTrue(_conflicts(apt_deploy, pacman_deploy))
+
+    def test_failures_are_propagated(self):
+        def fail():
+            raise RuntimeError("failed")
+
+        commands = [
+            ScheduledCommand(self.context, "a", self.events, set(), {"x"}, fail),
+            ScheduledCommand(self.context, "b", self.events, {"x"}, set()),
+        ]
+
+        self.assertRaises(RuntimeError, Invoker(jobs=2).execute, commands)
+        self.assertNotIn("start b", self.events)
+
+
+class TestProfiledInvoker(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = pathlib.Path(self.temp_dir.name) / "cache"
+        self.context = Context(
+            pathlib.Path("AppImageBuilder.yml"),
+            None,
+            None,
+            pathlib.Path(self.temp_dir.name) / "AppDir",
+            self.cache_dir,
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_commands_are_profiled(self):
+        profiler = Profiler(self.cache_dir)
+        commands = [
+            FakeCommand(self.context, "deploy"),
+            FakeCommand(self.context, "setup"),
+        ]
+        Invoker(profiler=profiler).execute(commands)
+
+        self.assertEqual(["deploy", "setup"], [s["name"] for s in profiler.stages])
+        self.assertTrue((self.cache_dir / Profiler.file_name).exists())
+
+    def test_profile_saved_on_failure(self):
+        profiler = Profiler(self.cache_dir)
+        commands = [FakeCommand(self.context, "deploy"), FailingCommand(self.context)]
+        self.assertRaises(
+            RuntimeError, Invoker(jobs=2, profiler=profiler).execute, commands
+        )
+
+        self.assertEqual(["ok", "failed"], [s["status"] for s in profiler.stages])
+        self.assertTrue((self.cache_dir / Profiler.file_name).exists())
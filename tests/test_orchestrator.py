@@ -0,0 +1,117 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import argparse
+import os
+import pathlib
+import tempfile
+from unittest import TestCase, mock
+
+from appimagebuilder import recipe
+from appimagebuilder.commands.file_deploy import FileDeployCommand
+from appimagebuilder.commands.run_shell_script import RunShellScriptCommand
+from appimagebuilder.invoker import Invoker
+from appimagebuilder.orchestrator import Orchestrator
+
+RECIPE = """\
+version: 1
+script:
+  - rm -rf ./AppDir || true
+  - mkdir -p ./AppDir/usr/bin
+  - echo run >> ./script-runs.log
+  - echo "GREETING=hello" >> $BUILDER_ENV
+
+AppDir:
+  path: ./AppDir
+  app_info:
+    id: org.example.app
+    name: app
+    icon: app
+    version: 1.0.0
+    exec: usr/bin/app
+  files:
+    include:
+      - {data_file}
+
+AppImage:
+  arch: x86_64
+"""
+
+
+class TestIncrementalBuild(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.data_file = self.temp_path / "data.txt"
+        self.data_file.write_text("data")
+        self.recipe_path = self.temp_path / "AppImageBuilder.yml"
+        self.recipe_path.write_text(RECIPE.format(data_file=self.data_file))
+
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_path)
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        os.environ.pop("GREETING", None)
+        self.temp_dir.cleanup()
+
+    def _build(self):
+        args = argparse.Namespace(
+            recipe=str(self.recipe_path),
+            incremental=True,
+            no_elf_cache=True,
+            profile=False,
+            skip_script=False,
+            skip_build=False,
+            skip_tests=True,
+            skip_appimage=True,
+        )
+        recipe_roamer = recipe.Roamer(recipe.Loader().load(self.recipe_path))
+        orchestrator = Orchestrator()
+        commands = orchestrator.process(recipe_roamer, args)
+        # the runtime setup requires network access, the script and the deploy
+        # are the steps that modify the AppDir here
+        commands = [
+            command
+            for command in commands
+            if isinstance(command, (RunShellScriptCommand, FileDeployCommand))
+        ]
+        Invoker(orchestrator.build_state).execute(commands)
+
+    def test_unchanged_recipe_is_skipped(self):
+        self._build()
+        deployed_file = self.temp_path / "AppDir" / str(self.data_file).lstrip("/")
+        self.assertTrue(deployed_file.exists())
+        os.environ.pop("GREETING")
+
+        with mock.patch.object(FileDeployCommand, "__call__") as file_deploy:
+            self._build()
+            file_deploy.assert_not_called()
+
+        # the script removing the AppDir is skipped too, its exports are restored
+        self.assertEqual("run\n", (self.temp_path / "script-runs.log").read_text())
+        self.assertEqual("hello", os.environ.get("GREETING"))
+        self.assertTrue(deployed_file.exists())
+        # the build state is not bundled
+        self.assertFalse(list((self.temp_path / "AppDir").glob("*.json")))
+
+    def test_changed_script_rebuilds(self):
+        self._build()
+        self.recipe_path.write_text(
+            self.recipe_path.read_text().replace("echo run", "echo again")
+        )
+
+        self._build()
+        self.assertEqual(
+            "run\nagain\n", (self.temp_path / "script-runs.log").read_text()
+        )
+        deployed_file = self.temp_path / "AppDir" / str(self.data_file).lstrip("/")
+        self.assertTrue(deployed_file.exists())
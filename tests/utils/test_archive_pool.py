@@ -0,0 +1,187 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock
+
+from appimagebuilder.utils.archive_pool import (
+    ArchiveDownload,
+    ArchivePool,
+    ArchivePoolError,
+)
+
+
+class TestArchivePool(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.pool = ArchivePool(self.temp_path / "pool", max_connections=2)
+
+        self.sources_path = self.temp_path / "sources"
+        self.sources_path.mkdir()
+        self.downloads = []
+        for name in ["a.deb", "b.deb", "c.deb"]:
+            path = self.sources_path / name
+            path.write_bytes(name.encode() * 100)
+            checksum = "SHA256:" + hashlib.sha256(path.read_bytes()).hexdigest()
+            self.downloads.append(
+                ArchiveDownload(path.as_uri(), name, path.stat().st_size, checksum)
+            )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_fetch(self):
+        target_dir = self.temp_path / "archives"
+        self.pool.fetch(self.downloads, target_dir)
+
+        for download in self.downloads:
+            target = target_dir / download.file_name
+            self.assertEqual(download.file_name.encode() * 100, target.read_bytes())
+            self.assertTrue(
+                os.path.samefile(self.pool.get_path(download.checksum), target)
+            )
+
+    def test_fetch_reuses_pooled_archives(self):
+        self.pool.fetch(self.downloads, self.temp_path / "project-a")
+        for path in self.sources_path.iterdir():
+            path.unlink()
+
+        # archives are no longer reachable, they must be taken from the pool
+        self.pool.fetch(self.downloads, self.temp_path / "project-b")
+        self.assertTrue((self.temp_path / "project-b" / "a.deb").exists())
+
+    def test_fetch_replaces_damaged_pooled_archives(self):
+        self.pool.fetch(self.downloads, self.temp_path / "project-a")
+        for download in self.downloads[:2]:
+            pooled_path = self.pool.get_path(download.checksum)
+            pooled_path.unlink()
+            pooled_path.write_bytes(b"damaged")
+        # same size, different contents
+        self.pool.get_path(self.downloads[1].checksum).write_bytes(
+            b"x" * self.downloads[1].size
+        )
+
+        target_dir = self.temp_path / "project-b"
+        self.pool.fetch(self.downloads, target_dir)
+        for download in self.downloads:
+            self.assertEqual(
+                download.file_name.encode() * 100,
+                (target_dir / download.file_name).read_bytes(),
+            )
+
+    def test_fetch_skips_hashing_verified_archives(self):
+        self.pool.fetch(self.downloads, self.temp_path / "project-a")
+
+        with mock.patch("hashlib.new", wraps=hashlib.new) as hash_new:
+            self.pool.fetch(self.downloads, self.temp_path / "project-b")
+            hash_new.assert_not_called()
+
+        # a changed file status makes the archive be hashed again
+        pooled_path = self.pool.get_path(self.downloads[0].checksum)
+        os.utime(pooled_path, ns=(0, 0))
+        with mock.patch("hashlib.new", wraps=hashlib.new) as hash_new:
+            self.pool.fetch(self.downloads, self.temp_path / "project-c")
+            self.assertEqual(1, hash_new.call_count)
+
+    def test_fetch_verify_failure_discarded_archive(self):
+        download = self.downloads[0]
+
+        def verify(path):
+            # another process discarded the archive meanwhile
+            os.unlink(path)
+            raise RuntimeError("bad signature")
+
+        download.verify = verify
+        self.assertRaises(
+            RuntimeError, self.pool.fetch, [download], self.temp_path / "archives"
+        )
+        self.assertEqual(
+            [], list(self.pool.get_path(download.checksum).parent.iterdir())
+        )
+
+    def test_fetch_checksum_mismatch(self):
+        download = self.downloads[0]
+        download.checksum = "SHA256:" + "0" * 64
+
+        self.assertRaises(
+            ArchivePoolError, self.pool.fetch, [download], self.temp_path / "archives"
+        )
+        self.assertFalse(self.pool.contains(download.checksum))
+        self.assertEqual(
+            [], list(self.pool.get_path(download.checksum).parent.iterdir())
+        )
+
+    def test_fetch_verify_failure(self):
+        download = self.downloads[0]
+
+        def verify(path):
+            self.assertEqual(self.pool.get_path(download.checksum), path)
+            raise RuntimeError("bad signature")
+
+        download.verify = verify
+        target_dir = self.temp_path / "archives"
+
+        self.assertRaises(RuntimeError, self.pool.fetch, [download], target_dir)
+        self.assertFalse((target_dir / download.file_name).exists())
+        self.assertFalse(self.pool.contains(download.checksum))
+
+    def test_fetch_mirror_failover(self):
+        download = self.downloads[0]
+        download.mirrors = [download.url]
+        download.url = (self.temp_path / "missing" / "a.deb").as_uri()
+
+        self.pool.fetch([download], self.temp_path / "archives")
+        self.assertTrue((self.temp_path / "archives" / "a.deb").exists())
+
+    def test_fetch_all_mirrors_fail(self):
+        download = self.downloads[0]
+        download.url = "http://127.0.0.1:9/a.deb"
+        download.mirrors = [(self.temp_path / "missing" / "a.deb").as_uri()]
+
+        self.assertRaises(
+            ArchivePoolError, self.pool.fetch, [download], self.temp_path / "archives"
+        )
+
+    def test_host_connections_limit(self):
+        pool = _ConcurrencyTrackingPool(
+            self.temp_path / "pool", max_connections=4, max_host_connections=1
+        )
+        pool.fetch(self.downloads, self.temp_path / "archives")
+
+        self.assertEqual(1, pool.max_active)
+
+    def test_unsupported_checksum(self):
+        self.assertRaises(ArchivePoolError, self.pool.get_path, "CRC32:1234")
+
+
+class _ConcurrencyTrackingPool(ArchivePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.active = 0
+        self.max_active = 0
+        self.counter_lock = threading.Lock()
+
+    def _download_url(self, url: str, checksum: str):
+        with self.counter_lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        try:
+            super()._download_url(url, checksum)
+        finally:
+            with self.counter_lock:
+                self.active -= 1
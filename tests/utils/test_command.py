@@ -0,0 +1,76 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+from unittest import TestCase
+
+from appimagebuilder.utils.command import Command
+
+
+class ShellCommand(Command):
+    def __init__(self):
+        super().__init__("sh")
+        self.log_command = False
+        self.log_stdout = False
+        self.log_stderr = False
+
+    def run(self, script):
+        self._run(["sh", "-c", script])
+
+    def run_with_input(self, script, input):
+        self._run_with_input(["sh", "-c", script], input)
+
+
+class TestCommand(TestCase):
+    def setUp(self) -> None:
+        self.command = ShellCommand()
+
+    def test_run(self):
+        self.command.run("echo out; echo err >&2; printf 'last'; exit 3")
+
+        self.assertEqual(["out", "last"], self.command.stdout)
+        self.assertEqual(["err"], self.command.stderr)
+        self.assertEqual(3, self.command.return_code)
+
+    def test_run_filling_both_pipes(self):
+        # a process blocked writing stderr would never close stdout
+        self.command.run(
+            "seq 1 100000 >&2; seq 1 100000; printf 'x%.0s' $(seq 1 20000) >&2"
+        )
+
+        self.assertEqual(100000, len(self.command.stdout))
+        self.assertEqual("100000", self.command.stdout[-1])
+        self.assertEqual(100001, len(self.command.stderr))
+        self.assertEqual("x" * 20000, self.command.stderr[-1])
+
+    def test_run_with_input(self):
+        data = b"".join(b"%d\n" % i for i in range(100000))
+        self.command.run_with_input("cat", data)
+
+        self.assertEqual(100000, len(self.command.stdout))
+        self.assertEqual("99999", self.command.stdout[-1])
+        self.assertEqual(0, self.command.return_code)
+
+    def test_run_with_input_ignored(self):
+        self.command.run_with_input("echo done", b"x" * 1000000)
+
+        self.assertEqual(["done"], self.command.stdout)
+
+    def test_max_captured_lines(self):
+        self.command.max_captured_lines = 10
+        self.command.run("seq 1 1000")
+
+        self.assertEqual([str(i) for i in range(991, 1001)], self.command.stdout)
+
+    def test_multibyte_characters_split_across_reads(self):
+        self.command.read_size = 1
+        self.command.run("printf 'ñandú\\n'")
+
+        self.assertEqual(["ñandú"], self.command.stdout)
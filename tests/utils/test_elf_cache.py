@@ -0,0 +1,104 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import shutil
+import tempfile
+from unittest import TestCase, skipIf, mock
+
+from appimagebuilder.utils.elf_cache import ElfCache
+from appimagebuilder.utils.elf_reader import ElfReaderError
+
+
+@skipIf(not shutil.which("bash"), "bash is required")
+class TestElfCache(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_path = pathlib.Path(self.temp_dir.name)
+        self.cache_path = self.base_path / "elf-cache.json"
+        self.bin_path = self.base_path / "bash"
+        shutil.copy2(shutil.which("bash"), self.bin_path)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_read_info_from_saved_cache(self):
+        cache = ElfCache(self.cache_path)
+        info = cache.read_info(self.bin_path)
+        cache.save()
+
+        cache = ElfCache(self.cache_path)
+        with mock.patch("appimagebuilder.utils.elf_cache.read_elf_info") as reader:
+            cached_info = cache.read_info(self.bin_path)
+            reader.assert_not_called()
+
+        self.assertEqual(vars(info), vars(cached_info))
+
+    def test_read_info_of_copied_file(self):
+        cache = ElfCache(self.cache_path)
+        cache.read_info(self.bin_path)
+
+        copy_path = self.base_path / "bash-copy"
+        shutil.copy(self.bin_path, copy_path)
+        with mock.patch("appimagebuilder.utils.elf_cache.read_elf_info") as reader:
+            cache.read_info(copy_path)
+            reader.assert_not_called()
+
+    def test_read_info_not_elf(self):
+        script_path = self.base_path / "script.sh"
+        script_path.write_text("#!/bin/sh\n")
+
+        cache = ElfCache(self.cache_path)
+        self.assertRaises(ElfReaderError, cache.read_info, script_path)
+
+    def test_stat_key_includes_device(self):
+        cache = ElfCache(self.cache_path)
+        cache.read_info(self.bin_path)
+
+        stat_result = os.stat(self.bin_path)
+        self.assertEqual(
+            [
+                "%d:%d:%d:%d"
+                % (
+                    stat_result.st_dev,
+                    stat_result.st_ino,
+                    stat_result.st_size,
+                    stat_result.st_mtime_ns,
+                )
+            ],
+            list(cache._stat_index),
+        )
+
+    def test_evict(self):
+        cache = ElfCache(self.cache_path)
+        cache.read_info(self.bin_path)
+        cache.save()
+        # room for one record and one stat entry, plus the size digit the
+        # appended byte may add
+        max_size = self.cache_path.stat().st_size + 1
+
+        cache = ElfCache(self.cache_path, max_size=max_size)
+        with open(self.bin_path, "ab") as f:
+            f.write(b"\0")
+        cache.read_info(self.bin_path)
+        cache.save()
+
+        self.assertEqual(1, len(cache._records))
+        self.assertEqual(1, len(cache._stat_index))
+
+    def test_default_max_size(self):
+        with mock.patch.dict(os.environ, {"ABUILDER_ELF_CACHE_MAX_SIZE": "1024"}):
+            self.assertEqual(1024, ElfCache(self.cache_path).max_size)
+        with mock.patch.dict(os.environ, {"ABUILDER_ELF_CACHE_MAX_SIZE": "x"}):
+            self.assertEqual(
+                ElfCache.default_max_size, ElfCache(self.cache_path).max_size
+            )
@@ -0,0 +1,47 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os.path
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+
+from appimagebuilder.utils.elf_reader import read_elf_info, ElfReaderError
+
+
+class TestElfReader(TestCase):
+    @skipIf(
+        not os.path.isfile("/lib/x86_64-linux-gnu/libc.so.6"),
+        "/lib/x86_64-linux-gnu/libc.so.6 required",
+    )
+    def test_read_shared_lib(self):
+        info = read_elf_info("/lib/x86_64-linux-gnu/libc.so.6")
+        self.assertEqual("libc.so.6", info.soname)
+        self.assertEqual(0x3E, info.machine)
+
+    @skipIf(not shutil.which("bash"), "bash is required")
+    def test_read_executable(self):
+        info = read_elf_info(shutil.which("bash"))
+        self.assertIsNone(info.soname)
+        self.assertIn("libc.so.6", info.needed)
+        self.assertTrue(info.interpreter.startswith("/"))
+        self.assertTrue(info.has_start_symbol)
+
+    def test_read_not_elf(self):
+        with tempfile.NamedTemporaryFile("w+") as file:
+            file.write("#!/bin/sh")
+            file.flush()
+
+            self.assertRaises(ElfReaderError, read_elf_info, file.name)
+
+    def test_read_empty_file(self):
+        with tempfile.NamedTemporaryFile() as file:
+            self.assertRaises(ElfReaderError, read_elf_info, file.name)
@@ -0,0 +1,77 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase, skipUnless
+
+from appimagebuilder.utils.elf_reader import read_elf_info
+from appimagebuilder.utils.elf_writer import patch_elf_in_place
+
+
+class TestElfWriter(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name) / "true"
+        shutil.copy(shutil.which("true"), self.path)
+        self.interpreter = read_elf_info(self.path).interpreter
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_set_relative_interpreter(self):
+        size = self.path.stat().st_size
+        mtime = self.path.stat().st_mtime_ns
+
+        self.assertTrue(patch_elf_in_place(self.path, self.interpreter.lstrip("/")))
+
+        self.assertEqual(
+            self.interpreter.lstrip("/"), read_elf_info(self.path).interpreter
+        )
+        self.assertEqual(size, self.path.stat().st_size)
+        self.assertGreater(self.path.stat().st_mtime_ns, mtime)
+        # the interpreter is resolved relative to the working dir
+        result = subprocess.run([str(self.path)], cwd="/")
+        self.assertEqual(0, result.returncode)
+
+    def test_set_interpreter_not_fitting(self):
+        original = self.path.read_bytes()
+
+        self.assertFalse(patch_elf_in_place(self.path, "/" + "x" * 200))
+        self.assertEqual(original, self.path.read_bytes())
+
+    def test_set_run_path_without_entry(self):
+        self.assertFalse(patch_elf_in_place(self.path, run_path="$ORIGIN"))
+        self.assertTrue(patch_elf_in_place(self.path, run_path=""))
+
+    @skipUnless(shutil.which("patchelf"), "patchelf not available")
+    def test_set_run_path(self):
+        subprocess.run(["patchelf", "--set-rpath", "$ORIGIN/../lib", self.path])
+
+        self.assertTrue(patch_elf_in_place(self.path, run_path="$ORIGIN"))
+        self.assertEqual("$ORIGIN", read_elf_info(self.path).runpath)
+        self.assertFalse(patch_elf_in_place(self.path, run_path="$ORIGIN/../../lib"))
+        self.assertEqual("$ORIGIN", read_elf_info(self.path).runpath)
+
+    @skipUnless(shutil.which("patchelf"), "patchelf not available")
+    def test_rpath_turned_into_run_path(self):
+        subprocess.run(
+            ["patchelf", "--force-rpath", "--set-rpath", "$ORIGIN/lib", self.path]
+        )
+
+        self.assertTrue(patch_elf_in_place(self.path, "lib/ld.so", "$ORIGIN"))
+
+        info = read_elf_info(self.path)
+        self.assertIsNone(info.rpath)
+        self.assertEqual("$ORIGIN", info.runpath)
+        self.assertEqual("lib/ld.so", info.interpreter)
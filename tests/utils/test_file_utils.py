@@ -0,0 +1,61 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import shutil
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.utils import file_utils
+
+
+class TestCopyFile(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.source = self.temp_path / "source"
+        self.source.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+        os.chmod(self.source, 0o751)
+        os.utime(self.source, (1000000000, 1000000000))
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_copy_file(self):
+        target = self.temp_path / "target"
+        file_utils.copy_file(self.source, target)
+
+        self.assertEqual(self.source.read_bytes(), target.read_bytes())
+        self.assertEqual(0o751, target.stat().st_mode & 0o777)
+        self.assertEqual(1000000000, target.stat().st_mtime)
+        # copies must be safe to modify in place
+        self.assertNotEqual(self.source.stat().st_ino, target.stat().st_ino)
+
+    def test_copy_file_overwrites_target(self):
+        target = self.temp_path / "target"
+        target.write_bytes(b"x" * 10 * 1024 * 1024)
+
+        file_utils.copy_file(self.source, target)
+        self.assertEqual(self.source.read_bytes(), target.read_bytes())
+
+    def test_copy_file_into_dir(self):
+        target_dir = self.temp_path / "target"
+        target_dir.mkdir()
+
+        target = file_utils.copy_file(self.source, target_dir)
+        self.assertEqual(str(target_dir / "source"), str(target))
+        self.assertEqual(self.source.read_bytes(), (target_dir / "source").read_bytes())
+
+    def test_copy_file_same_file(self):
+        self.assertRaises(
+            shutil.SameFileError, file_utils.copy_file, self.source, self.source
+        )
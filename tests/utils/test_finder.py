@@ -24,6 +24,7 @@
 import fnmatch
 import os.path
 import pathlib
+import tempfile
 from unittest import TestCase, skipIf
 
 from appimagebuilder.utils.finder import Finder
@@ -116,3 +117,70 @@ class TestFinder(TestCase):
         )
         results = list(results)
         self.assertNotIn(pathlib.Path("/lib/x86_64-linux-gnu"), results)
+
+
+class TestFinderInventory(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_path = pathlib.Path(self.temp_dir.name)
+        (self.base_path / "usr" / "lib" / "gtk-3.0").mkdir(parents=True)
+        (self.base_path / "usr" / "lib" / "libfoo.so.1").touch()
+        (self.base_path / "usr" / "bin").mkdir(parents=True)
+        (self.base_path / "usr" / "bin" / "app").touch()
+        (self.base_path / "lib").symlink_to("usr/lib")
+
+        self.finder = Finder(self.base_path)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_find_matches_rglob(self):
+        for pattern in ["*", "*.so.*", "usr/**/gtk-?.0", "**/bin/*", "usr/*"]:
+            expected = [path.absolute() for path in self.base_path.rglob(pattern)]
+            self.assertEqual(expected, list(self.finder.find(pattern)), pattern)
+
+    def test_find_trailing_recursive_wildcard(self):
+        for pattern in ["usr/**", "usr/lib/**", "usr/**/"]:
+            expected = [path.absolute() for path in self.base_path.rglob(pattern)]
+            self.assertEqual(
+                sorted(expected), sorted(self.finder.find(pattern)), pattern
+            )
+
+        # the base dir is not listed and symlinked dirs are not traversed
+        self.assertEqual(
+            sorted(
+                [
+                    self.base_path / "usr",
+                    self.base_path / "usr/lib",
+                    self.base_path / "usr/lib/gtk-3.0",
+                    self.base_path / "usr/bin",
+                ]
+            ),
+            sorted(self.finder.find("**")),
+        )
+        self.assertEqual(
+            sorted(
+                [
+                    self.base_path / "lib",
+                    self.base_path / "usr/lib",
+                    self.base_path / "usr/lib/gtk-3.0",
+                ]
+            ),
+            sorted(self.finder.find("lib/**")),
+        )
+
+    def test_find_symlink(self):
+        results = list(self.finder.find("lib", [Finder.is_symlink, Finder.is_dir]))
+        self.assertEqual([self.base_path / "lib"], results)
+
+    def test_invalidate(self):
+        self.assertIsNone(self.finder.find_one("new_file"))
+
+        (self.base_path / "usr" / "bin" / "new_file").touch()
+        self.assertIsNone(self.finder.find_one("new_file"))
+
+        self.finder.invalidate()
+        self.assertEqual(
+            self.base_path / "usr" / "bin" / "new_file",
+            self.finder.find_one("new_file", [Finder.is_file]),
+        )
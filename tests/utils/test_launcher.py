@@ -0,0 +1,66 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import logging
+import subprocess
+from unittest import TestCase
+
+from appimagebuilder.utils import launcher
+from appimagebuilder.utils.launcher import ToolStats
+
+
+class TestLauncher(TestCase):
+    def setUp(self) -> None:
+        launcher.reset_stats()
+
+    def tearDown(self) -> None:
+        launcher.reset_stats()
+
+    def test_run(self):
+        proc = launcher.run(["/bin/echo", "hello"], stdout=subprocess.PIPE)
+        launcher.run("true", shell=True)
+        launcher.run("exit 1", tool="sh", shell=True)
+
+        self.assertEqual(b"hello\n", proc.stdout)
+        stats = launcher.get_stats()
+        self.assertEqual({"echo", "true", "sh"}, set(stats))
+        self.assertEqual(1, stats["echo"].count)
+        self.assertEqual(1, sum(stats["echo"].histogram))
+
+    def test_track_failures(self):
+        with self.assertRaises(RuntimeError):
+            with launcher.track("tool"):
+                raise RuntimeError()
+
+        self.assertEqual(1, launcher.get_stats()["tool"].count)
+
+    def test_histogram(self):
+        stats = ToolStats()
+        for duration in [0.001, 0.05, 0.05, 0.5, 20.0]:
+            stats.add(duration)
+
+        self.assertEqual([1, 2, 1, 0, 1], stats.histogram)
+        self.assertEqual(5, stats.count)
+        self.assertEqual(20.0, stats.max_time)
+
+    def test_get_tool_name(self):
+        self.assertEqual("apt-get", launcher.get_tool_name(["/usr/bin/apt-get", "-y"]))
+        self.assertEqual("apt-get", launcher.get_tool_name("/usr/bin/apt-get update"))
+
+    def test_log_stats(self):
+        launcher.record("patchelf", 0.02)
+        launcher.record("patchelf", 0.03)
+
+        with self.assertLogs("Launcher", logging.INFO) as logs:
+            launcher.log_stats()
+
+        self.assertEqual(2, len(logs.output))
+        self.assertIn("patchelf", logs.output[1])
@@ -0,0 +1,113 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+from appimagebuilder.utils import launcher
+from appimagebuilder.utils.patchelf import ElfPatch, PatchElf
+
+
+class TestElfPatch(TestCase):
+    def test_merge(self):
+        patch = ElfPatch(interpreter="lib/ld.so").merge(ElfPatch(run_path=["$ORIGIN"]))
+
+        self.assertEqual("lib/ld.so", patch.interpreter)
+        self.assertEqual(["$ORIGIN"], patch.run_path)
+        self.assertEqual(
+            ["--set-interpreter", "lib/ld.so", "--set-rpath", "$ORIGIN"],
+            patch.to_args(),
+        )
+
+
+@skipUnless(shutil.which("patchelf"), "patchelf not available")
+class TestPatchElf(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_path = pathlib.Path(self.temp_dir.name)
+        self.binaries = []
+        for name in ["a", "b", "c"]:
+            path = self.base_path / name
+            shutil.copy(shutil.which("true"), path)
+            self.binaries.append(path)
+
+        self.patch_elf = PatchElf()
+        self.patch_elf.log_command = False
+        self.patch_elf.log_stderr = False
+        launcher.reset_stats()
+
+    def tearDown(self) -> None:
+        launcher.reset_stats()
+        self.temp_dir.cleanup()
+
+    def test_apply(self):
+        a, b, c = self.binaries
+        errors = self.patch_elf.apply(
+            [
+                (a, ElfPatch(interpreter="lib64/ld.so")),
+                (b, ElfPatch(interpreter="lib64/ld.so")),
+                (a, ElfPatch(run_path=["$ORIGIN/../lib"])),
+                (c, ElfPatch(run_path=["$ORIGIN/../lib"])),
+            ]
+        )
+
+        self.assertEqual({}, errors)
+        self.assertEqual("lib64/ld.so", self.patch_elf.get_interpreter(a))
+        self.assertEqual(["$ORIGIN/../lib"], self.patch_elf.get_rpath(a))
+        self.assertEqual("lib64/ld.so", self.patch_elf.get_interpreter(b))
+        self.assertEqual(["$ORIGIN/../lib"], self.patch_elf.get_rpath(c))
+        # adding a RUNPATH requires patchelf, a gets both changes at once and
+        # b is patched in place
+        self.assertEqual(2, launcher.get_stats()["patchelf"].count)
+
+    def test_apply_in_place(self):
+        a, b, _ = self.binaries
+        self.patch_elf.apply(
+            [(a, ElfPatch(run_path=["$ORIGIN/../lib"])), (b, ElfPatch(run_path=[]))]
+        )
+        launcher.reset_stats()
+
+        errors = self.patch_elf.apply(
+            [
+                (a, ElfPatch(interpreter="lib64/ld.so", run_path=["$ORIGIN"])),
+                (b, ElfPatch(run_path=[])),
+            ]
+        )
+
+        self.assertEqual({}, errors)
+        self.assertEqual({}, launcher.get_stats())
+        self.assertEqual("lib64/ld.so", self.patch_elf.get_interpreter(a))
+        self.assertEqual(["$ORIGIN"], self.patch_elf.get_rpath(a))
+
+    def test_apply_batches(self):
+        # too long to be written in place
+        interpreter = "/opt/" + "x" * 100 + "/ld.so"
+        self.patch_elf.apply(
+            [(path, ElfPatch(interpreter=interpreter)) for path in self.binaries]
+        )
+
+        self.assertEqual(1, launcher.get_stats()["patchelf"].count)
+        for path in self.binaries:
+            self.assertEqual(interpreter, self.patch_elf.get_interpreter(path))
+
+    def test_apply_reports_failed_files(self):
+        not_elf = self.base_path / "not_elf"
+        not_elf.write_text("text")
+        files = [self.binaries[0], not_elf, self.binaries[1]]
+
+        errors = self.patch_elf.apply(
+            [(path, ElfPatch(interpreter="lib64/ld.so")) for path in files]
+        )
+
+        self.assertEqual([str(not_elf)], list(errors))
+        self.assertEqual("lib64/ld.so", self.patch_elf.get_interpreter(files[2]))
@@ -0,0 +1,73 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import json
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.utils import profiler, shell
+from appimagebuilder.utils.profiler import Profiler
+
+
+class TestProfiler(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = pathlib.Path(self.temp_dir.name) / "cache"
+        self.profiler = Profiler(self.output_dir, chrome_trace=True)
+        profiler.set_profiler(self.profiler)
+
+    def tearDown(self) -> None:
+        profiler.set_profiler(None)
+        self.temp_dir.cleanup()
+
+    def test_stage_records_tool_spans(self):
+        with self.profiler.stage("script"):
+            shell.execute("true")
+            shell.execute("true")
+
+        stage = self.profiler.stages[0]
+        self.assertEqual("script", stage["name"])
+        self.assertEqual("ok", stage["status"])
+        self.assertEqual(2, stage["children"])
+        self.assertEqual(["bash", "bash"], [span["name"] for span in stage["spans"]])
+        self.assertGreaterEqual(stage["wall_time"], stage["spans"][0]["duration"])
+        self.assertGreater(stage["peak_rss_kb"], 0)
+
+    def test_failed_stage(self):
+        with self.assertRaises(RuntimeError):
+            with self.profiler.stage("script"):
+                shell.execute("exit 1")
+
+        self.assertEqual("failed", self.profiler.stages[0]["status"])
+
+    def test_spans_outside_stages_are_ignored(self):
+        shell.execute("true")
+        with self.profiler.stage("empty"):
+            pass
+
+        self.assertEqual([], self.profiler.stages[0]["spans"])
+
+    def test_save(self):
+        with self.profiler.stage("script"):
+            shell.execute("true")
+        self.profiler.save()
+
+        with open(self.output_dir / Profiler.file_name) as f:
+            report = json.load(f)
+        self.assertEqual(["script"], [stage["name"] for stage in report["stages"]])
+
+        with open(self.output_dir / Profiler.trace_file_name) as f:
+            trace = json.load(f)
+        self.assertEqual(
+            ["script", "bash"], [event["name"] for event in trace["traceEvents"]]
+        )
+        self.assertTrue(all(event["ph"] == "X" for event in trace["traceEvents"]))